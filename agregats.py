@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+# Cube d'agrégats : les opérations sont regroupées en une seule passe selon
+# le fonds, le palier, la catégorie de bénéficiaire, la thématique et les
+# critères des sections 8 et 9 (instruments financiers, opérations de plus de
+# 10 M€). Chaque cellule contient le nombre d'opérations et la somme des
+# montants ; les graphiques lisent ensuite des sous-totaux de ce cube.
+
+import json
+
+import numpy as np
+import pandas as pd
+
+# 'Palier' est la colonne du CSV, palier publié avec la liste : le cube
+# s'additionne partition par partition (ingestion.py, flux.py), ce que ne
+# permettent pas des seuils calculés sur toute la liste. Les paliers
+# recalculés des graphiques et de /sql/paliers viennent de paliers.py.
+DIMENSIONS = ['Fonds', 'Palier', 'catbeneficiaire', 'themeprojet', 'Instrument financier ?', "Catégorie d'instrument financier", 'Plus de 10 M€']
+MESURES = ['Montant UE programmé', 'Total des dépenses éligibles']
+SEUIL_GRANDES_OPERATIONS = 10000000
+TAILLE_BLOC = 1 << 20
+
+
+class Cube:
+
+    def __init__(self, axes, valeurs):
+        # axes : modalités de chaque dimension (None pour les valeurs
+        # manquantes) ; valeurs : tableaux de forme (len(axe) for axe in axes),
+        # un par mesure, plus 'nombre'.
+        self.axes = axes
+        self.valeurs = valeurs
+
+    def aligner(self, axes):
+        # Même cube exprimé sur des axes plus larges (cellules ajoutées à
+        # zéro).
+        positions = np.ix_(*[[axes[dimension].index(modalite) for modalite in axe] for dimension, axe in self.axes.items()])
+        valeurs = {}
+        for mesure, tableau in self.valeurs.items():
+            valeurs[mesure] = np.zeros(tuple(len(axe) for axe in axes.values()), dtype=tableau.dtype)
+            valeurs[mesure][positions] = tableau
+        return Cube(axes, valeurs)
+
+    def _combiner(self, autre, signe):
+        axes = {dimension: _reunir(axe, autre.axes[dimension]) for dimension, axe in self.axes.items()}
+        gauche, droite = self.aligner(axes), autre.aligner(axes)
+        return Cube(axes, {mesure: gauche.valeurs[mesure] + signe * droite.valeurs[mesure] for mesure in self.valeurs})
+
+    def __add__(self, autre):
+        return self._combiner(autre, 1)
+
+    def __sub__(self, autre):
+        return self._combiner(autre, -1)
+
+    def enregistrer(self, chemin):
+        with open(chemin, 'wb') as fichier:
+            np.savez(fichier, axes=np.array(json.dumps(self.axes)), **self.valeurs)
+
+    @classmethod
+    def charger(cls, chemin):
+        with np.load(chemin, allow_pickle=False) as archive:
+            axes = json.loads(str(archive['axes']))
+            return cls(axes, {mesure: archive[mesure] for mesure in archive.files if mesure != 'axes'})
+
+    def _reduire(self, mesure, garder, filtres):
+        tableau = self.valeurs[mesure]
+        dimensions = list(self.axes)
+        for dimension, valeur in (filtres or {}).items():
+            if dimension in garder:
+                raise ValueError('{} est à la fois filtrée et conservée'.format(dimension))
+            retenues = valeur if isinstance(valeur, (list, tuple, set, frozenset)) else [valeur]
+            indices = [i for i, modalite in enumerate(self.axes[dimension]) if modalite in retenues]
+            tableau = np.take(tableau, indices, axis=dimensions.index(dimension))
+        sommees = tuple(i for i, dimension in enumerate(dimensions) if dimension not in garder)
+        tableau = tableau.sum(axis=sommees)
+        restantes = [dimension for dimension in dimensions if dimension in garder]
+        return np.transpose(tableau, [restantes.index(dimension) for dimension in garder])
+
+    def serie(self, mesure, par, filtres=None):
+        return pd.Series(self._reduire(mesure, [par], filtres), index=pd.Index(self.axes[par], name=par), name=mesure)
+
+    def tableau(self, mesure, lignes, colonnes, filtres=None):
+        return pd.DataFrame(self._reduire(mesure, [lignes, colonnes], filtres),
+                            index=pd.Index(self.axes[lignes], name=lignes),
+                            columns=pd.Index(self.axes[colonnes], name=colonnes))
+
+
+def _reunir(axe, autre):
+    # Les modalités restent triées, None (valeurs manquantes) en dernier.
+    reunion = set(axe) | set(autre)
+    return sorted(reunion - {None}) + ([None] if None in reunion else [])
+
+
+def _axe(operations, dimension):
+    # Modalités d'une dimension ; la dernière (None) reçoit les valeurs
+    # manquantes.
+    if dimension in operations.modalites:
+        return operations.modalites[dimension].liste() + [None]
+    return [False, True]
+
+
+def _codes(operations, dimension, axe, selection):
+    if dimension == 'Plus de 10 M€':
+        return (operations['Montant UE programmé'][selection] > SEUIL_GRANDES_OPERATIONS).astype(np.intp)
+    valeurs = operations[dimension][selection]
+    if dimension in operations.modalites:
+        return np.where(valeurs < 0, len(axe) - 1, valeurs).astype(np.intp)
+    return valeurs.astype(np.intp)
+
+
+def construire_cube(operations, taille_bloc=TAILLE_BLOC, lignes=None):
+    # Une seule passe par bloc de lignes : le code de cellule est calculé à
+    # partir des codes des modalités puis réduit avec np.bincount. La mémoire
+    # temporaire est bornée par la taille du bloc, pas par celle des données.
+    # lignes : indices des opérations retenues (toutes par défaut).
+    axes = {dimension: _axe(operations, dimension) for dimension in DIMENSIONS}
+    forme = tuple(len(axe) for axe in axes.values())
+    taille = int(np.prod(forme))
+    valeurs = {mesure: np.zeros(taille) for mesure in MESURES}
+    valeurs['nombre'] = np.zeros(taille, dtype=np.int64)
+    nombre_lignes = len(operations) if lignes is None else len(lignes)
+    for debut in range(0, nombre_lignes, taille_bloc):
+        fin = min(debut + taille_bloc, nombre_lignes)
+        selection = slice(debut, fin) if lignes is None else lignes[debut:fin]
+        cellules = np.ravel_multi_index([_codes(operations, dimension, axe, selection) for dimension, axe in axes.items()], forme)
+        valeurs['nombre'] += np.bincount(cellules, minlength=taille)
+        for mesure in MESURES:
+            poids = np.nan_to_num(np.asarray(operations[mesure][selection], dtype=float))
+            valeurs[mesure] += np.bincount(cellules, weights=poids, minlength=taille)
+    return Cube(axes, {mesure: tableau.reshape(forme) for mesure, tableau in valeurs.items()})
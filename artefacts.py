@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+
+# Artefacts précalculés : les figures et l'arbre app.layout sont construits une
+# fois hors ligne puis relus au démarrage des workers, sans pandas ni lecture
+# du CSV. Chaque version est rangée dans son propre dossier, nommé d'après les
+# empreintes des données d'entrée et du code qui les calcule. Le lien
+# symbolique artefacts/courant désigne la version publiée : il est remplacé
+# atomiquement une fois la nouvelle version entièrement écrite, et les
+# workers en cours d'exécution passent à celle-ci sans redémarrer
+# (rechargement.py).
+#
+#   python artefacts.py [--dossier artefacts] [--conserver 3] [--sans-publier]
+
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import shutil
+import time
+from importlib import metadata
+
+from fichiers import ecrire_json, empreinte_fichier, empreinte_source, fichiers_sources, lire_json
+
+DOSSIER_ARTEFACTS = 'artefacts'
+LIEN_COURANT = 'courant'
+# Modules dont dépend le contenu des artefacts : figures (geometrie.py pour
+# les contours du graphique 7), leur forme compactée (serialisation.py) et
+# la mise en page. Les mesures (instrumentation.py) et l'ordonnancement des
+# calculs (taches.py) n'en changent pas le résultat.
+MODULES_CALCUL = ['agregats.py', 'artefacts.py', 'donnees.py', 'figures.py', 'filtres.py', 'geometrie.py', 'ingestion.py', 'lorenz.py', 'mise_en_page.py', 'paliers.py', 'pipeline.py', 'profil_mensuel.py', 'recherche.py', 'serialisation.py', 'textes.py']
+# Données livrées avec le code : tableaux saisis à la main (figures.py) et
+# contours des régions (geometrie.py).
+DONNEES_LIVREES = ['investissements-entreprises.csv', 'regions-2015.json']
+
+RACINE = os.path.dirname(os.path.abspath(__file__))
+
+
+def version_attendue(dossier=DOSSIER_ARTEFACTS):
+    # Lève FileNotFoundError si une des données d'entrée est absente.
+    entrees = fichiers_sources()
+    empreintes = {
+        'entrees': {fichier: empreinte_source(fichier, os.path.join(dossier, 'index.json')) for fichier in entrees},
+        'code': {module: empreinte_fichier(os.path.join(RACINE, module)) for module in MODULES_CALCUL + DONNEES_LIVREES},
+        'plotly': metadata.version('plotly'),
+    }
+    return hashlib.sha256(json.dumps(empreintes, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def composant_depuis_json(noeud):
+    if isinstance(noeud, list):
+        return [composant_depuis_json(element) for element in noeud]
+    if isinstance(noeud, dict) and {'type', 'namespace', 'props'} <= noeud.keys():
+        classe = getattr(importlib.import_module(noeud['namespace']), noeud['type'])
+        props = {cle: composant_depuis_json(valeur) if cle == 'children' else valeur for cle, valeur in noeud['props'].items()}
+        return classe(**props)
+    return noeud
+
+
+_version = None
+
+
+def fixer_version(version):
+    # Version servie par ce processus, jusqu'au prochain rechargement.
+    global _version
+    _version = version
+
+
+def version_publiee(dossier=DOSSIER_ARTEFACTS):
+    try:
+        return os.path.basename(os.readlink(os.path.join(dossier, LIEN_COURANT)))
+    except OSError:
+        return None
+
+
+def publier(version, dossier=DOSSIER_ARTEFACTS):
+    # Un nouveau lien remplace l'ancien par rename(), atomique : un lecteur
+    # voit l'une ou l'autre version, jamais un lien absent.
+    provisoire = os.path.join(dossier, '{}.{}.tmp'.format(LIEN_COURANT, os.getpid()))
+    if os.path.lexists(provisoire):
+        os.remove(provisoire)
+    os.symlink(version, provisoire)
+    os.replace(provisoire, os.path.join(dossier, LIEN_COURANT))
+
+
+def version_courante(dossier=DOSSIER_ARTEFACTS):
+    if _version is not None and dossier == DOSSIER_ARTEFACTS:
+        return _version
+    version = version_publiee(dossier)
+    if version is not None:
+        return version
+    try:
+        return version_attendue(dossier)
+    except FileNotFoundError:
+        # Sans les données d'entrée (déploiement ne contenant que les
+        # artefacts), la dernière version construite fait foi.
+        return (lire_json(os.path.join(dossier, 'dernier.json')) or {}).get('version')
+
+
+def dossier_courant(dossier=DOSSIER_ARTEFACTS, version=None):
+    version = version or version_courante(dossier)
+    if version is None:
+        return None
+    chemin = os.path.join(dossier, version)
+    return chemin if os.path.exists(os.path.join(chemin, 'manifeste.json')) else None
+
+
+def charger_layout(dossier=DOSSIER_ARTEFACTS, differe=False, version=None):
+    # differe : figures remplacées par des substituts (figures_differees.py).
+    chemin = dossier_courant(dossier, version)
+    layout = lire_json(os.path.join(chemin, 'layout.json')) if chemin else None
+    if layout is None:
+        # Artefacts absents ou périmés : calcul direct, comme avant la
+        # précompilation.
+        layout = calculer_figures_et_layout()[1]
+        if not differe:
+            return layout
+        from plotly.utils import PlotlyJSONEncoder
+
+        layout = json.loads(json.dumps(layout, cls=PlotlyJSONEncoder))
+    if differe:
+        from figures_differees import differer
+
+        layout = differer(layout)
+    return composant_depuis_json(layout)
+
+
+def charger_gabarits(dossier=DOSSIER_ARTEFACTS, version=None):
+    # Thèmes plotly référencés par les figures compactées (serialisation.py).
+    chemin = dossier_courant(dossier, version)
+    gabarits = lire_json(os.path.join(chemin, 'gabarits.json')) if chemin else None
+    return gabarits if gabarits is not None else calculer_figures_et_layout()[2]
+
+
+def charger_figure(nom, dossier=DOSSIER_ARTEFACTS, version=None):
+    chemin = dossier_courant(dossier, version)
+    figure = lire_json(os.path.join(chemin, 'figures', nom + '.json')) if chemin else None
+    return figure if figure is not None else calculer_figures_et_layout()[0][nom]
+
+
+_calcul = None
+
+
+def calculer_figures_et_layout():
+    # Calculé au plus une fois par processus. Importés ici pour que le chemin
+    # des artefacts n'importe ni pandas ni plotly.graph_objects.
+    global _calcul
+    if _calcul is not None:
+        return _calcul
+
+    from plotly.utils import PlotlyJSONEncoder
+
+    from donnees import operations
+    from figures import construire_figures
+    from filtres import options_filtres
+    from ingestion import cube_courant
+    from instrumentation import phase
+    from mise_en_page import construire_layout
+    from paliers import paliers
+    from recherche import options_recherche
+    from serialisation import compacter_figure
+
+    with phase('chargement'):
+        liste = operations()
+        cube = cube_courant()
+    figures = construire_figures(liste, cube)
+    gabarits = {}
+    with phase('serialisation'):
+        figures = {nom: compacter_figure(json.loads(json.dumps(figure, cls=PlotlyJSONEncoder)), gabarits)
+                   for nom, figure in figures.items()}
+    with phase('mise_en_page'):
+        options = dict(options_filtres(liste), recherche=options_recherche(liste), seuils=paliers(liste).seuils())
+        _calcul = figures, construire_layout(figures, options), gabarits
+    return _calcul
+
+
+def construire(dossier=DOSSIER_ARTEFACTS, conserver=3, publication=True):
+    # publication=False : la version est écrite mais pas encore servie
+    # (rechargement.py la publie après avoir préparé le reste).
+    from plotly.utils import PlotlyJSONEncoder
+
+    from donnees import operations
+    from instrumentation import PHASES
+
+    version = version_attendue(dossier)
+    destination = os.path.join(dossier, version)
+    if os.path.exists(os.path.join(destination, 'manifeste.json')):
+        if publication:
+            publier(version, dossier)
+        return version, destination
+
+    debut = time.perf_counter()
+    figures, layout, gabarits = calculer_figures_et_layout()
+    duree_calcul = time.perf_counter() - debut
+
+    provisoire = '{}.{}.tmp'.format(destination, os.getpid())
+    shutil.rmtree(provisoire, ignore_errors=True)
+    os.makedirs(os.path.join(provisoire, 'figures'))
+    try:
+        for nom, figure in figures.items():
+            with open(os.path.join(provisoire, 'figures', nom + '.json'), 'w', encoding='utf-8') as fichier:
+                json.dump(figure, fichier, cls=PlotlyJSONEncoder)
+        with open(os.path.join(provisoire, 'layout.json'), 'w', encoding='utf-8') as fichier:
+            json.dump(layout, fichier, cls=PlotlyJSONEncoder)
+        ecrire_json(os.path.join(provisoire, 'gabarits.json'), gabarits)
+        ecrire_json(os.path.join(provisoire, 'manifeste.json'), {
+            'version': version,
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'figures': sorted(figures),
+            # Cache des opérations dont les figures sont calculées, ouvert
+            # par les workers avec cette version.
+            'operations': operations().dossier,
+            'duree_calcul': duree_calcul,
+            'durees_taches': {nom[len('figures/'):]: duree for nom, duree in PHASES.items() if nom.startswith('figures/')},
+        })
+        os.rename(provisoire, destination)
+    finally:
+        shutil.rmtree(provisoire, ignore_errors=True)
+    ecrire_json(os.path.join(dossier, 'dernier.json'), {'version': version})
+    if publication:
+        publier(version, dossier)
+    nettoyer(dossier, conserver)
+    return version, destination
+
+
+def nettoyer(dossier=DOSSIER_ARTEFACTS, conserver=3):
+    # La version publiée est toujours conservée : des workers peuvent encore
+    # la servir.
+    publiee = version_publiee(dossier)
+    versions = [os.path.join(dossier, nom) for nom in os.listdir(dossier)
+                if nom != publiee and not os.path.islink(os.path.join(dossier, nom)) and os.path.isfile(os.path.join(dossier, nom, 'manifeste.json'))]
+    versions.sort(key=os.path.getmtime, reverse=True)
+    for ancienne in versions[max(conserver - (publiee is not None), 0):]:
+        shutil.rmtree(ancienne, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Construit les artefacts (figures et layout) servis au démarrage de l’application.')
+    parser.add_argument('--dossier', default=DOSSIER_ARTEFACTS)
+    parser.add_argument('--conserver', type=int, default=3, help='nombre de versions conservées')
+    parser.add_argument('--sans-publier', action='store_true', help='écrit la version sans la servir')
+    args = parser.parse_args()
+    debut = time.perf_counter()
+    version, destination = construire(args.dossier, args.conserver, publication=not args.sans_publier)
+    print('Artefacts {} écrits dans {} ({:.1f} s)'.format(version, destination, time.perf_counter() - debut))
+
+
+if __name__ == '__main__':
+    main()
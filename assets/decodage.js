@@ -0,0 +1,79 @@
+/* Décodage des figures compactées par serialisation.py.
+ *
+ * Les réponses _dash-layout et _dash-update-component sont interceptées avant
+ * d'être lues par le renderer Dash : chaque référence {"_ref": i} d'une
+ * figure est remplacée par le tableau typé décodé depuis sa table
+ * "_tableaux", et chaque {"_gabarit": cle} par le thème correspondant de
+ * window.gabaritsFigures, inséré dans la page. Les scripts de assets/ sont
+ * chargés avant le démarrage du renderer, qui appelle window.fetch au moment
+ * de ses requêtes.
+ */
+(function () {
+    var TYPES = {
+        i1: Int8Array,
+        i2: Int16Array,
+        i4: Int32Array,
+        f4: Float32Array,
+        f8: Float64Array
+    };
+    var ADRESSES = /_dash-(layout|update-component)$/;
+
+    function tableauType(code) {
+        var binaire = window.atob(code.bdata);
+        var octets = new Uint8Array(binaire.length);
+        for (var i = 0; i < binaire.length; i++) {
+            octets[i] = binaire.charCodeAt(i);
+        }
+        return new TYPES[code.dtype](octets.buffer);
+    }
+
+    function decoder(noeud, tableaux) {
+        if (Array.isArray(noeud)) {
+            for (var i = 0; i < noeud.length; i++) {
+                noeud[i] = decoder(noeud[i], tableaux);
+            }
+            return noeud;
+        }
+        if (noeud === null || typeof noeud !== 'object') {
+            return noeud;
+        }
+        if (tableaux && typeof noeud._ref === 'number' && Object.keys(noeud).length === 1) {
+            return tableaux[noeud._ref];
+        }
+        if (typeof noeud._gabarit === 'string' && Object.keys(noeud).length === 1) {
+            // Thème absent : plotly.js garde ses valeurs par défaut.
+            return (window.gabaritsFigures || {})[noeud._gabarit] || {};
+        }
+        if (Array.isArray(noeud._tableaux)) {
+            tableaux = noeud._tableaux.map(tableauType);
+            delete noeud._tableaux;
+        }
+        for (var cle in noeud) {
+            if (Object.prototype.hasOwnProperty.call(noeud, cle)) {
+                noeud[cle] = decoder(noeud[cle], tableaux);
+            }
+        }
+        return noeud;
+    }
+
+    window.decoderFigures = decoder;
+
+    var fetchOrigine = window.fetch;
+    if (!fetchOrigine) {
+        return;
+    }
+    window.fetch = function () {
+        return fetchOrigine.apply(this, arguments).then(function (reponse) {
+            if (!reponse.ok || !ADRESSES.test((reponse.url || '').split('?')[0])) {
+                return reponse;
+            }
+            var lireJson = reponse.json.bind(reponse);
+            reponse.json = function () {
+                return lireJson().then(function (contenu) {
+                    return decoder(contenu, null);
+                });
+            };
+            return reponse;
+        });
+    };
+})();
@@ -0,0 +1,52 @@
+/* Chargement des figures différées (figures_differees.py).
+ *
+ * Chaque graphique différé est suivi d'un élément caché dont l'identifiant
+ * est "differe-" suivi de celui du graphique. Quand le graphique approche de
+ * la zone visible, un clic sur cet élément déclenche le callback qui renvoie
+ * la figure. Sans IntersectionObserver, toutes les figures sont demandées
+ * dès l'affichage de la page.
+ */
+(function () {
+    var PREFIXE = 'differe-';
+    var MARGE = '400px 0px';
+    var vus = {};
+
+    var observateur = window.IntersectionObserver ? new IntersectionObserver(function (entrees) {
+        entrees.forEach(function (entree) {
+            if (!entree.isIntersecting) {
+                return;
+            }
+            observateur.unobserve(entree.target);
+            var sentinelle = document.getElementById(PREFIXE + entree.target.id);
+            if (sentinelle) {
+                sentinelle.click();
+            }
+        });
+    }, {rootMargin: MARGE}) : null;
+
+    function rechercher() {
+        var sentinelles = document.querySelectorAll('[id^="' + PREFIXE + '"]');
+        for (var i = 0; i < sentinelles.length; i++) {
+            var sentinelle = sentinelles[i];
+            if (vus[sentinelle.id]) {
+                continue;
+            }
+            var graphique = document.getElementById(sentinelle.id.slice(PREFIXE.length));
+            if (!graphique) {
+                continue;
+            }
+            vus[sentinelle.id] = true;
+            if (observateur) {
+                observateur.observe(graphique);
+            } else {
+                sentinelle.click();
+            }
+        }
+    }
+
+    // Le renderer Dash construit la page après le chargement de ce script.
+    document.addEventListener('DOMContentLoaded', function () {
+        new MutationObserver(rechercher).observe(document.body, {childList: true, subtree: true});
+        rechercher();
+    });
+})();
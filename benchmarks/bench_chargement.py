@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+# Compare le démarrage à froid du chargement des opérations : lecture directe
+# du CSV (chemin historique) et lecture du cache colonne par colonne.
+#
+#   python benchmarks/bench_chargement.py [--csv france-2014-2020-feder-fse.csv] [--repetitions 5]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = '''
+import sys, time
+sys.path.insert(0, {racine!r})
+import donnees
+debut = time.perf_counter()
+if {mode!r} == 'csv':
+    data = donnees.pd.read_csv({csv!r}, dtype=donnees.dtype_colonnes, parse_dates=donnees.colonnes_dates)
+else:
+    data = donnees.charger_operations({csv!r}, {cache!r})
+print(time.perf_counter() - debut, len(data))
+'''
+
+
+def mesurer(mode, csv, cache, repetitions):
+    durees, durees_processus = [], []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        sortie = subprocess.run([sys.executable, '-c', SCRIPT.format(racine=RACINE, mode=mode, csv=csv, cache=cache)],
+                                check=True, capture_output=True, text=True).stdout.split()
+        durees_processus.append(time.perf_counter() - debut)
+        durees.append(float(sortie[0]))
+    return durees, durees_processus, int(sortie[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--csv', default=os.path.join(RACINE, 'france-2014-2020-feder-fse.csv'))
+    parser.add_argument('--cache', default=os.path.join(RACINE, 'cache', 'operations'))
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    # Premier passage : construit le cache s'il n'existe pas encore.
+    mesurer('cache', args.csv, args.cache, 1)
+
+    print('{:<8} {:>8} {:>14} {:>14}'.format('mode', 'lignes', 'chargement (s)', 'processus (s)'))
+    for mode in ('csv', 'cache'):
+        durees, durees_processus, lignes = mesurer(mode, args.csv, args.cache, args.repetitions)
+        print('{:<8} {:>8} {:>14.3f} {:>14.3f}'.format(mode, lignes, statistics.median(durees), statistics.median(durees_processus)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+# Résolution des bénéficiaires (entites.py) sur des listes synthétiques de
+# 1, 10 et 30 fois la taille de la liste 2014-2020 : chaque bénéficiaire
+# tiré a un code postal et jusqu'à quatre graphies (casse, accents, forme
+# juridique déplacée ou retirée, « Ville de » pour « Commune de », « St »
+# pour « Saint », faute de frappe). Durée de la résolution, et précision et
+# rappel des paires de graphies réunies par rapport aux bénéficiaires tirés.
+#
+#   python benchmarks/bench_entites.py [--facteurs 1 10 30] [--graine 0]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import unicodedata
+
+import numpy as np
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from benchmarks.generer_operations import TAILLE_REFERENCE, generer  # noqa: E402
+from donnees import Operations, ecrire_cache  # noqa: E402
+from entites import COLONNE_CODE_POSTAL, COLONNE_NOM, resoudre  # noqa: E402
+
+SYLLABES = ['ker', 'lan', 'mor', 'bel', 'ville', 'mont', 'ro', 'cha', 'teau', 'neuf', 'sur', 'val', 'bourg', 'ga', 'ri', 'gny', 'ac', 'é',
+            'lès', 'tour', 'mar', 'tin', 'pla', 'lo', 'ir', 'ber', 'nay', 'dun', 'vic', 'ham']
+FORMES = ['Commune de {}', 'Association {}', 'SARL {}', 'Mission locale de {}', 'Université de {}', 'Conseil régional {}', 'Département de {}',
+          'SAS {}', 'Saint-{} Tourisme', 'GRETA {}']
+VARIANTES = [('Commune de ', 'Ville de '), ('Commune de ', 'Mairie de '), ('Conseil régional ', 'Région '), ('Département de ', 'Conseil départemental de '),
+             ('Saint-', 'St '), ('Université de ', 'Univ. ')]
+
+
+def _sans_accents(texte):
+    return ''.join(c for c in unicodedata.normalize('NFKD', texte) if not unicodedata.combining(c))
+
+
+def _graphie(rng, nom, lieu):
+    transformation = rng.integers(0, 6)
+    if transformation == 0:
+        return nom.upper()
+    if transformation == 1:
+        return _sans_accents(nom)
+    if transformation == 2:
+        for forme in ('SARL ', 'SAS '):
+            if nom.startswith(forme):
+                return nom[len(forme):] + ('' if rng.random() < 0.5 else ' ' + forme.strip())
+    if transformation == 3:
+        for avant, apres in VARIANTES:
+            if avant in nom:
+                return nom.replace(avant, apres)
+    if transformation == 4 and len(lieu) > 6:
+        # Faute de frappe : une lettre du nom de lieu omise ou doublée.
+        i = int(rng.integers(1, len(lieu) - 1))
+        return nom.replace(lieu, lieu[:i] + lieu[i + 1:] if rng.random() < 0.5 else lieu[:i] + lieu[i] + lieu[i:])
+    return nom
+
+
+def beneficiaires(rng, nombre):
+    """Nom, bénéficiaire tiré et code postal de chaque opération."""
+    bases = max(200, nombre // 20)
+    # Noms de lieux distincts : deux bénéficiaires tirés n'ont jamais le même
+    # nom.
+    lieux = {}
+    while len(lieux) < bases:
+        lieux.setdefault(''.join(rng.choice(SYLLABES, rng.integers(3, 6))).capitalize())
+    lieux = list(lieux)
+    noms = [FORMES[i % len(FORMES)].format(lieu) for i, lieu in enumerate(lieux)]
+    graphies = [[nom] + [_graphie(rng, nom, lieu) for _ in range(rng.integers(0, 4))] for nom, lieu in zip(noms, lieux)]
+    codes = np.char.zfill(rng.integers(1000, 97600, bases).astype(str), 5)
+    tires = rng.integers(0, bases, nombre)
+    choix = rng.random(nombre)
+    noms_lignes = np.array([graphies[b][int(c * len(graphies[b]))] for b, c in zip(tires.tolist(), choix.tolist())], dtype=object)
+    # Un code postal sur vingt diffère de celui du bénéficiaire.
+    codes_lignes = np.where(rng.random(nombre) < 0.05, np.char.zfill(rng.integers(1000, 97600, nombre).astype(str), 5), codes[tires])
+    return noms_lignes, tires, codes_lignes
+
+
+def _paires(comptes):
+    return int((comptes * (comptes - 1) // 2).sum())
+
+
+def qualite(noms, tires, entites):
+    """Précision et rappel des paires de graphies distinctes."""
+    _, premieres = np.unique(noms, return_index=True)
+    vraies, predites = tires[premieres].astype(np.int64), entites[premieres].astype(np.int64)
+    _, communes = np.unique(vraies * (predites.max() + 1) + predites, return_counts=True)
+    justes = _paires(communes)
+    trouvees = _paires(np.unique(predites, return_counts=True)[1])
+    attendues = _paires(np.unique(vraies, return_counts=True)[1])
+    return justes / max(trouvees, 1), justes / max(attendues, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--facteurs', type=float, nargs='+', default=[1, 10, 30])
+    parser.add_argument('--graine', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        for facteur in args.facteurs:
+            rng = np.random.default_rng(args.graine)
+            data = generer(int(TAILLE_REFERENCE * facteur), args.graine)
+            noms, tires, codes = beneficiaires(rng, len(data))
+            data[COLONNE_NOM] = noms
+            data[COLONNE_CODE_POSTAL] = codes
+            destination = os.path.join(dossier, 'x{}'.format(facteur))
+            ecrire_cache(data, destination)
+            debut = time.perf_counter()
+            entites, _, _, statistiques = resoudre(Operations(destination))
+            duree = time.perf_counter() - debut
+            precision, rappel = qualite(noms, tires, entites)
+            print('×{:g} : {} opérations, {} graphies, {} bénéficiaires tirés, {} entités, {} paires candidates, {:.2f} s, '
+                  'précision {:.3f}, rappel {:.3f}'.format(facteur, len(data), statistiques['noms'], len(np.unique(tires)), statistiques['entites'],
+                                                          statistiques['candidates'], duree, precision, rappel))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+# Compare le site statique exporté (export_statique.py, servi ici par
+# http.server) et le serveur Dash (gunicorn s'il est installé, sinon le
+# serveur de développement Flask) :
+#
+# - requêtes par seconde sur les réponses demandées à chaque visite
+#   (page, _dash-layout, _dash-dependencies) ;
+# - délai de chargement critique : page, scripts et feuilles de style
+#   bloquants puis _dash-layout, téléchargés par un client à froid avec six
+#   connexions parallèles comme un navigateur. Faute de navigateur, c'est
+#   l'approximation retenue du délai avant le premier rendu.
+#
+#   python benchmarks/bench_export_statique.py [--duree 10] [--clients 8]
+
+import argparse
+import os
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def port_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def attendre(url, delai=60):
+    fin = time.time() + delai
+    while time.time() < fin:
+        try:
+            urllib.request.urlopen(url).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('serveur indisponible : ' + url)
+
+
+def lire(url):
+    with urllib.request.urlopen(url) as reponse:
+        return reponse.read()
+
+
+def demarrer_dash(port):
+    try:
+        import gunicorn  # noqa: F401
+        commande = [sys.executable, '-m', 'gunicorn', '-w', '1', '-b', '127.0.0.1:{}'.format(port), 'app:server']
+    except ImportError:
+        commande = [sys.executable, '-c', 'from app import server; server.run(port={}, threaded=True)'.format(port)]
+    return subprocess.Popen(commande, cwd=os.getcwd(), env=dict(os.environ, PYTHONPATH=RACINE), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def demarrer_statique(port, dossier):
+    return subprocess.Popen([sys.executable, '-m', 'http.server', str(port), '--bind', '127.0.0.1', '--directory', dossier],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def urls_visite(base):
+    page = lire(base + '/').decode('utf-8')
+    config = re.search(r'"requests_pathname_prefix": "([^"]*)"', page).group(1)
+    return [base + '/', base + config + '_dash-layout', base + config + '_dash-dependencies'], page, config
+
+
+def requetes_par_seconde(urls, duree, clients):
+    compteur = [0]
+    verrou = threading.Lock()
+    fin = time.time() + duree
+
+    def client():
+        n = 0
+        while time.time() < fin:
+            for url in urls:
+                lire(url)
+                n += 1
+        with verrou:
+            compteur[0] += n
+
+    fils = [threading.Thread(target=client) for _ in range(clients)]
+    for fil in fils:
+        fil.start()
+    for fil in fils:
+        fil.join()
+    return compteur[0] / duree
+
+
+def chargement_critique(base, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        page = lire(base + '/').decode('utf-8')
+        config = re.search(r'"requests_pathname_prefix": "([^"]*)"', page).group(1)
+        ressources = re.findall(r'<(?:script src|link rel="stylesheet" href)="([^"]+)"', page)
+        with ThreadPoolExecutor(6) as pool:
+            list(pool.map(lambda chemin: lire(base + chemin), ressources))
+        lire(base + config + '_dash-layout')
+        durees.append(time.perf_counter() - debut)
+    return statistics.median(durees)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--duree', type=float, default=10)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--repetitions', type=int, default=10)
+    args = parser.parse_args()
+
+    sys.path.insert(0, RACINE)
+    from app import app
+    from export_statique import exporter
+
+    dossier = tempfile.mkdtemp()
+    exporter(app, dossier)
+
+    port_dash, port_statique = port_libre(), port_libre()
+    serveurs = [demarrer_dash(port_dash), demarrer_statique(port_statique, dossier)]
+    try:
+        print('{:<10} {:>14} {:>24}'.format('serveur', 'requêtes/s', 'chargement critique (s)'))
+        for nom, port in (('dash', port_dash), ('statique', port_statique)):
+            base = 'http://127.0.0.1:{}'.format(port)
+            attendre(base + '/')
+            urls, _, _ = urls_visite(base)
+            critique = chargement_critique(base, args.repetitions)
+            rps = requetes_par_seconde(urls, args.duree, args.clients)
+            print('{:<10} {:>14.1f} {:>24.3f}'.format(nom, rps, critique))
+    finally:
+        for serveur in serveurs:
+            serveur.terminate()
+            serveur.wait()
+        shutil.rmtree(dossier, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+# Mémoire maximale (RSS) et durée de la lecture complète du CSV
+# (donnees.lire_csv) et de l'ingestion en flux (flux.agreger_csv), sur la
+# liste des opérations répétée 1, 4 et 16 fois. Chaque mesure est faite dans
+# un processus neuf.
+#
+#   python benchmarks/bench_flux.py [--chemin liste.csv] [--repetitions 1 4 16]
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = '''
+import resource, sys, time
+sys.path.insert(0, {racine!r})
+debut = time.perf_counter()
+if {methode!r} == 'complet':
+    from donnees import lire_csv
+    lignes = len(lire_csv({chemin!r}))
+else:
+    from flux import agreger_csv
+    lignes = agreger_csv({chemin!r})[2]
+print(lignes, time.perf_counter() - debut, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+'''
+
+
+def repeter(chemin, repetitions, destination):
+    with open(chemin, 'rb') as source:
+        entete = source.readline()
+        corps = source.read()
+    if not corps.endswith(b'\n'):
+        corps += b'\n'
+    with open(destination, 'wb') as fichier:
+        fichier.write(entete)
+        for _ in range(repetitions):
+            fichier.write(corps)
+
+
+def mesurer(methode, chemin):
+    sortie = subprocess.run([sys.executable, '-c', SCRIPT.format(racine=RACINE, methode=methode, chemin=chemin)],
+                            check=True, capture_output=True, text=True).stdout.split()
+    return int(sortie[0]), float(sortie[1]), float(sortie[2])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chemin', default='france-2014-2020-feder-fse.csv')
+    parser.add_argument('--repetitions', type=int, nargs='+', default=[1, 4, 16])
+    args = parser.parse_args()
+
+    print('{:>12} {:>10} {:>10} {:>10} {:>10}'.format('opérations', 'complet s', 'Mo', 'flux s', 'Mo'))
+    with tempfile.TemporaryDirectory() as dossier:
+        for repetitions in args.repetitions:
+            chemin = os.path.join(dossier, 'operations-{}.csv'.format(repetitions))
+            repeter(args.chemin, repetitions, chemin)
+            lignes, duree_complet, memoire_complet = mesurer('complet', chemin)
+            _, duree_flux, memoire_flux = mesurer('flux', chemin)
+            print('{:>12} {:>10.2f} {:>10.0f} {:>10.2f} {:>10.0f}'.format(lignes, duree_complet, memoire_complet, duree_flux, memoire_flux))
+            os.remove(chemin)
+
+
+if __name__ == '__main__':
+    main()
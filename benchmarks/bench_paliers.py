@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+# Seuils et paliers des projets « d'ampleur » (paliers.py) sur le cache des
+# opérations répété 1, 10 et 100 fois : regroupement des montants par
+# fonds, seuils de la liste complète et d'une région (premier calcul puis
+# lecture du cache), classement de toutes les opérations et parts des
+# catégories de bénéficiaires de la section 4. Chaque seuil est comparé au
+# montant de même rang obtenu par un tri complet ; s'arrête avec un code
+# d'erreur s'il diffère.
+#
+#   python benchmarks/bench_paliers.py [--facteurs 1 10 100] [--repetitions 20]
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from donnees import Operations, fusionner_caches, operations  # noqa: E402
+from figures import calculer_parts_paliers  # noqa: E402
+from filtres import normaliser_filtres, options_filtres, selection  # noqa: E402
+from lorenz import rang_quantile  # noqa: E402
+from paliers import COLONNE_MONTANT, FONDS, QUANTILE_AMPLEUR, Paliers  # noqa: E402
+
+REGION = 'Bretagne'
+
+
+def mesurer(repetitions, fonction):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction()
+        durees.append(time.perf_counter() - debut)
+    return resultat, statistics.median(durees) * 1000
+
+
+def seuil_trie(liste, fonds, lignes=None):
+    # Référence : tri complet des montants du fonds.
+    montants = np.asarray(liste[COLONNE_MONTANT], dtype=float)
+    retenues = liste.masque('Fonds', fonds)
+    if lignes is not None:
+        montants, retenues = montants[lignes], retenues[lignes]
+    valeurs = np.sort(montants[retenues & ~np.isnan(montants)])
+    return float(valeurs[rang_quantile(len(valeurs), QUANTILE_AMPLEUR)])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--facteurs', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repetitions', type=int, default=20)
+    args = parser.parse_args()
+
+    reference = operations()
+    differences = []
+    with tempfile.TemporaryDirectory() as dossier:
+        for facteur in args.facteurs:
+            liste = Operations(fusionner_caches([reference.dossier] * facteur, os.path.join(dossier, 'x{}'.format(facteur)))) if facteur > 1 else reference
+            lignes = selection(liste, normaliser_filtres(options_filtres(liste), regions=[REGION]))
+            paliers, duree_regroupement = mesurer(1, lambda: Paliers(liste))
+            durees = {}
+            # Premier calcul de chaque seuil (cache vidé), puis lecture du
+            # cache.
+            seuils, durees['seuils'] = mesurer(args.repetitions, lambda: (paliers.cache.clear(), paliers.seuils())[1])
+            _, durees['seuils en cache'] = mesurer(args.repetitions, paliers.seuils)
+            seuils_region, durees['seuils {}'.format(REGION)] = mesurer(args.repetitions, lambda: (paliers.cache.clear(), paliers.seuils(lignes, REGION))[1])
+            _, durees['classement'] = mesurer(args.repetitions, paliers.classer)
+            _, durees['tri complet'] = mesurer(max(1, args.repetitions // 4), lambda: [seuil_trie(liste, fonds) for fonds in FONDS])
+            print('×{} : {} opérations, montants regroupés en {:.1f} ms, seuils {}'.format(
+                facteur, len(liste), duree_regroupement, ', '.join('{} {:,.0f} €'.format(fonds, seuil).replace(',', ' ') for fonds, seuil in seuils.items())))
+            for nom, duree in durees.items():
+                print('  {:<20} {:>9.3f} ms'.format(nom, duree))
+            _, duree_parts = mesurer(max(1, args.repetitions // 4), lambda: calculer_parts_paliers(liste, 'FSE'))
+            print('  {:<20} {:>9.3f} ms'.format('parts section 4', duree_parts))
+            for fonds in FONDS:
+                for nom, obtenu, attendu in (('', seuils[fonds], seuil_trie(liste, fonds)),
+                                             (REGION, seuils_region[fonds], seuil_trie(liste, fonds, lignes))):
+                    if obtenu != attendu:
+                        differences.append('×{} {} {} : {} au lieu de {}'.format(facteur, fonds, nom, obtenu, attendu))
+    for difference in differences:
+        print(difference)
+    print('seuils identiques à ceux du tri complet' if not differences else '{} différence(s)'.format(len(differences)))
+    sys.exit(1 if differences else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+# Compare le temps processeur par requête du serveur Dash avec et sans les
+# réponses précompressées (precompression.py) : page d'accueil,
+# _dash-layout, _dash-dependencies et scripts demandés à chaque visite par
+# un navigateur acceptant Brotli et gzip, puis les mêmes requêtes
+# conditionnelles (If-None-Match) d'un navigateur qui a déjà la page en
+# cache. Les requêtes passent par le client de test de Flask, dans le
+# processus de l'application : seul le travail du serveur est mesuré.
+#
+#   python benchmarks/bench_precompression.py [--requetes 200]
+
+import argparse
+import os
+import subprocess
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = '''
+import re, sys, time
+sys.path.insert(0, {racine!r})
+from app import app
+client = app.server.test_client()
+page = client.get('/').get_data(as_text=True)
+urls = ['/', '/_dash-layout', '/_dash-dependencies'] + re.findall(r'<script src="([^"]+)"', page)
+entetes = {{'Accept-Encoding': 'br, gzip'}}
+for url in urls:
+    client.get(url, headers=entetes).get_data()
+etags = {{url: client.get(url, headers=entetes).headers.get('ETag') for url in urls}}
+for conditionnelle in (False, True):
+    for url in urls:
+        en_tetes = dict(entetes, **({{'If-None-Match': etags[url]}} if conditionnelle and etags[url] else {{}}))
+        debut = time.process_time()
+        for _ in range({requetes}):
+            reponse = client.get(url, headers=en_tetes)
+            taille = len(reponse.get_data())
+        print(int(conditionnelle), url.split('?')[0], reponse.status_code, taille, (time.process_time() - debut) / {requetes})
+'''
+
+
+def mesurer(precompression, requetes):
+    sortie = subprocess.run([sys.executable, '-c', SCRIPT.format(racine=RACINE, requetes=requetes)], check=True,
+                            capture_output=True, text=True, env=dict(os.environ, PRECOMPRESSION=precompression)).stdout
+    return {(ligne.split()[0], ligne.split()[1]): ligne.split()[2:] for ligne in sortie.splitlines()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requetes', type=int, default=200, help='requêtes par URL')
+    args = parser.parse_args()
+
+    # Premier passage : remplit cache/compression.
+    mesurer('1', 1)
+    sans, avec = mesurer('0', args.requetes), mesurer('1', args.requetes)
+
+    print('{:<62} {:>22} {:>22}'.format('', 'Flask-Compress', 'précompressé'))
+    print('{:<62} {:>6} {:>8} {:>6} {:>6} {:>8} {:>6}'.format('requête', 'statut', 'octets', 'ms', 'statut', 'octets', 'ms'))
+    totaux = [0.0, 0.0]
+    for cle in avec:
+        conditionnelle, url = cle
+        libelle = ('(304) ' if conditionnelle == '1' else '') + (os.path.basename(url) or url)[:56]
+        ligne = [libelle]
+        for i, mesures in enumerate((sans, avec)):
+            statut, taille, duree = mesures[cle]
+            totaux[i] += float(duree)
+            ligne += [statut, taille, float(duree) * 1000]
+        print('{:<62} {:>6} {:>8} {:>6.2f} {:>6} {:>8} {:>6.2f}'.format(*ligne))
+    print('{:<62} {:>22.2f} {:>22.2f}'.format('total (ms de processeur par visite)', totaux[0] * 1000, totaux[1] * 1000))
+
+
+if __name__ == '__main__':
+    main()
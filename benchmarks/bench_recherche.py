@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+# Durée des recherches (recherche.py) sur le cache des opérations répété 1
+# et 10 fois : construction de l'index, puis médiane de plusieurs requêtes
+# (mots complets, mot complété, facettes, page éloignée), du texte saisi à
+# la page de résultats et aux comptes des facettes. Puis les pages du
+# début, du milieu et de la fin de la liste complète triée par montant
+# décroissant, dont la durée ne doit pas dépendre de la position.
+#
+#   python benchmarks/bench_recherche.py [--facteurs 1 10] [--repetitions 50]
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from donnees import Operations, fusionner_caches, operations  # noqa: E402
+from recherche import TAILLE_PAGE, ouvrir_index, ouvrir_ordres, rechercher  # noqa: E402
+
+REQUETES = [
+    ('pole emploi', {}, 0, None),
+    ('develop', {}, 0, None),
+    ('formation', {'fonds': ['FSE'], 'themes': ['Formation']}, 0, None),
+    ('', {'regions': ['Bretagne']}, 0, None),
+    ('association', {}, 40, None),
+    ('association', {}, 40, ('Montant UE programmé', True)),
+]
+TRI = ('Montant UE programmé', True)
+
+
+def mesurer(repetitions, *arguments, **options):
+    rechercher(*arguments, **options)
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = rechercher(*arguments, **options)
+        durees.append(time.perf_counter() - debut)
+    return resultat, statistics.median(durees) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--facteurs', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--repetitions', type=int, default=50)
+    args = parser.parse_args()
+
+    reference = operations()
+    with tempfile.TemporaryDirectory() as dossier:
+        for facteur in args.facteurs:
+            destination = os.path.join(dossier, 'x{}'.format(facteur))
+            liste = Operations(fusionner_caches([reference.dossier] * facteur, destination)) if facteur > 1 else reference
+            debut = time.perf_counter()
+            index = ouvrir_index(liste, os.path.join(dossier, 'index'))
+            ordres = ouvrir_ordres(liste, os.path.join(dossier, 'index'))
+            print('×{} : {} opérations, index et ordres construits en {:.2f} s'.format(facteur, len(liste), time.perf_counter() - debut))
+            for texte, choix, page, tri in REQUETES:
+                resultat, duree = mesurer(args.repetitions, liste, index, texte, choix, page, ordres=ordres, tri=tri)
+                libelle = repr(texte) + (' ' + str(choix) if choix else '') + (' p.{}'.format(page) if page else '') + (' trié' if tri else '')
+                print('  {:<60} {:>9} résultats {:>8.2f} ms'.format(libelle, resultat['total'], duree))
+            derniere = (len(liste) - 1) // TAILLE_PAGE
+            for page in (0, derniere // 2, derniere):
+                _, duree = mesurer(args.repetitions, liste, index, '', {}, page, ordres=ordres, tri=TRI)
+                print('  {:<60} {:>27.2f} ms'.format('liste complète triée, page {}'.format(page), duree))
+
+
+if __name__ == '__main__':
+    main()
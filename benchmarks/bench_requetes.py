@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+# Requêtes nommées de requetes.py sur le cache des opérations répété 1 et 10
+# fois : durée de construction de la base SQLite, médiane de chaque requête
+# sans et avec filtres, et comparaison des résultats avec ceux du cube
+# d'agrégats utilisés par les graphiques (sections 3, 8 et 9) et avec les
+# paliers de paliers.py (section 4). S'arrête avec un code d'erreur si un
+# résultat diffère.
+#
+#   python benchmarks/bench_requetes.py [--facteurs 1 10] [--repetitions 10]
+
+import argparse
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from agregats import construire_cube  # noqa: E402
+from donnees import Operations, fusionner_caches, operations  # noqa: E402
+from figures import calculer_contributions_10m, calculer_instruments_financiers, calculer_pivot  # noqa: E402
+from paliers import FONDS, PALIERS, paliers  # noqa: E402
+from requetes import REQUETES, Base, executer_requete, preparer_base  # noqa: E402
+
+FILTRES = {'fonds': 'FSE', 'region': 'Bretagne', 'debut': '2016-01-01'}
+
+
+def mesurer(repetitions, base, liste, nom, valeurs):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = executer_requete(base, nom, valeurs, liste)
+        durees.append(time.perf_counter() - debut)
+    return resultat, statistics.median(durees) * 1000
+
+
+def attendus(cube, liste):
+    # {requête: {clé de ligne: valeurs}} calculés à partir du cube et des
+    # paliers.
+    contributions = calculer_contributions_10m(cube)
+    pivot = calculer_pivot(cube).stack()
+    classes = paliers(liste).classer()
+    fonds = np.asarray(liste['Fonds'])
+    categories = np.asarray(liste['catbeneficiaire'])
+    modalites = liste.modalites['catbeneficiaire'].liste() + [None]
+    nombres = Counter()
+    for nom in FONDS:
+        retenues = (fonds == liste.modalites['Fonds'].code(nom)) & (classes >= 0)
+        for (palier, categorie), nombre in Counter(zip(classes[retenues].tolist(), categories[retenues].tolist())).items():
+            nombres[nom, PALIERS[palier], modalites[categorie]] += nombre
+    return {
+        'paliers': {cle: [nombre] for cle, nombre in nombres.items()},
+        'contributions_10m': {(theme,): list(ligne) for theme, ligne in zip(contributions.index, contributions.itertuples(index=False))},
+        'instruments_financiers': {(categorie,): [montant] for categorie, montant in calculer_instruments_financiers(cube).items()},
+        'beneficiaires_thematiques': {cle: [montant] for cle, montant in pivot.items() if montant},
+    }
+
+
+def ecarts(nom, resultat, attendu):
+    # Les premières colonnes du résultat forment la clé de ligne.
+    largeur = len(next(iter(attendu.values()), []))
+    obtenu = {tuple(ligne[:-largeur]): ligne[-largeur:] for ligne in resultat['lignes'] if any(ligne[-largeur:])}
+    for cle in sorted(set(obtenu) | set(attendu), key=str):
+        a, o = attendu.get(cle), obtenu.get(cle)
+        if a is None or o is None or not all(math.isclose(x, y, rel_tol=1e-9) for x, y in zip(a, o)):
+            yield '{} {} : {} au lieu de {}'.format(nom, cle, o, a)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--facteurs', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--repetitions', type=int, default=10)
+    args = parser.parse_args()
+
+    reference = operations()
+    differences = []
+    with tempfile.TemporaryDirectory() as dossier:
+        for facteur in args.facteurs:
+            liste = Operations(fusionner_caches([reference.dossier] * facteur, os.path.join(dossier, 'x{}'.format(facteur)))) if facteur > 1 else reference
+            debut = time.perf_counter()
+            base = Base(preparer_base(liste, os.path.join(dossier, 'sql')))
+            print('×{} : {} opérations, base construite en {:.2f} s ({:.0f} Mo)'.format(
+                facteur, len(liste), time.perf_counter() - debut, os.path.getsize(base.chemin) / 2**20))
+            for nom in REQUETES:
+                resultat, duree = mesurer(args.repetitions, base, liste, nom, {})
+                _, duree_filtree = mesurer(args.repetitions, base, liste, nom, FILTRES)
+                print('  {:<30} {:>6} lignes {:>9.2f} ms {:>9.2f} ms filtrée'.format(nom, len(resultat['lignes']), duree, duree_filtree))
+            for nom, attendu in attendus(construire_cube(liste), liste).items():
+                differences += list(ecarts('×{} {}'.format(facteur, nom), executer_requete(base, nom, operations=liste), attendu))
+    for difference in differences[:20]:
+        print(difference)
+    print('résultats identiques à ceux du cube et des paliers' if not differences else '{} différence(s)'.format(len(differences)))
+    sys.exit(1 if differences else 0)
+
+
+if __name__ == '__main__':
+    main()
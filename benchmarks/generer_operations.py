@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+# Listes d'opérations synthétiques de même schéma que la liste publiée
+# (colonnes et types de donnees.dtype_colonnes, mêmes modalités pour les
+# fonds, thématiques, catégories de bénéficiaires et régions), de taille
+# multiple de la liste 2014-2020. Les montants suivent une loi log-normale ;
+# le palier P2 regroupe, comme dans la liste publiée, le dixième décile des
+# montants de chaque fonds (seuil de paliers.py). Les intitulés et noms de bénéficiaires sont tirés
+# dans des réservoirs dont la taille croît avec la liste.
+#
+#   python benchmarks/generer_operations.py [--facteur 10] [--graine 0] [--sortie operations.csv]
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from donnees import colonnes_dates, dtype_colonnes  # noqa: E402
+from figures import ordre_catbeneficiaires, ordre_themeprojet  # noqa: E402
+from paliers import seuil_montants  # noqa: E402
+from pipeline import ORDRE_CATEGORIES_REGION, REGIONS_PRE_NOTRE  # noqa: E402
+
+TAILLE_REFERENCE = 38532
+REGIONS_OPERATION = ['Auvergne-Rhône-Alpes', 'Bourgogne-Franche-Comté', 'Bretagne', 'Centre-Val de Loire', 'Corse', 'Grand Est', 'Guadeloupe', 'Guyane',
+                     'Hauts-de-France', 'Île-de-France', 'La Réunion', 'Martinique', 'Mayotte', 'Normandie', 'Nouvelle-Aquitaine', 'Occitanie',
+                     'Pays de la Loire', "Provence-Alpes-Côte d'Azur"]
+CATEGORIES_INSTRUMENTS = ['Prêt', 'Garantie', 'Participation', 'Fonds de fonds']
+MOTS = ['projet', 'accompagnement', 'emploi', 'formation', 'jeunes', 'méthanisation', 'chaufferie', 'bois', 'hôtel', 'tourisme', 'investissement',
+        'matériel', 'recherche', 'innovation', 'réseau', 'très', 'haut', 'débit', 'insertion', 'rénovation', 'thermique', 'école', 'littoral',
+        'développement', 'PME', 'équipement', 'numérique', 'mobilité', 'santé', 'agriculture', 'énergie', 'logement', 'transport', 'culture']
+FORMES_BENEFICIAIRES = ['Commune de {}', 'Association {}', 'SARL {}', 'Mission locale {}', 'GRETA {}', 'Université de {}', 'Département {}', 'SAS {}']
+
+
+def _reservoir(rng, taille, fabriquer):
+    return np.array([fabriquer(i) for i in range(taille)], dtype=object)
+
+
+def generer(nombre, graine=0):
+    rng = np.random.default_rng(graine)
+    fonds = rng.choice(['FEDER', 'FSE'], nombre, p=[0.39, 0.61])
+    montants = np.round(np.exp(rng.normal(11, 1.6, nombre)), 2)
+    grandes = rng.choice(nombre, max(1, nombre // 320), replace=False)
+    montants[grandes] = np.round(rng.uniform(1e7, 8e7, len(grandes)), 2)
+    taux = np.round(rng.uniform(0.2, 1.0, nombre), 4)
+    durees = rng.integers(1, 96, nombre)
+    debuts = np.datetime64('2013-06-01') + rng.integers(0, 8 * 365, nombre).astype('timedelta64[D]')
+    fins = debuts + (durees * 30).astype('timedelta64[D]')
+    regions = rng.choice(REGIONS_PRE_NOTRE + ['Programme national'], nombre)
+    categories_region = rng.choice(ORDRE_CATEGORIES_REGION, len(REGIONS_PRE_NOTRE) + 1)
+    instruments = rng.random(nombre) < 0.002
+    palier = np.full(nombre, 'P1', dtype=object)
+    for nom in ('FEDER', 'FSE'):
+        selection = fonds == nom
+        if selection.any():
+            palier[selection & (montants >= seuil_montants(montants[selection]))] = 'P2'
+
+    intitules = _reservoir(rng, max(1000, nombre // 8), lambda i: ' '.join(rng.choice(MOTS, rng.integers(3, 7))))
+    beneficiaires = _reservoir(rng, max(200, nombre // 20), lambda i: FORMES_BENEFICIAIRES[i % len(FORMES_BENEFICIAIRES)].format(i))
+    codes_postaux = np.char.zfill(rng.integers(1000, 97600, nombre).astype(str), 5)
+    colonnes = {
+        'Région (pre-NOTRe)': regions,
+        'Catégorie de région': categories_region[np.searchsorted(sorted(set(regions)), regions)],
+        'Intitulé du projet': intitules[rng.integers(0, len(intitules), nombre)],
+        'Nom du bénéficiaire': beneficiaires[rng.integers(0, len(beneficiaires), nombre)],
+        'Instrument financier ?': instruments,
+        "Catégorie d'instrument financier": np.where(instruments, rng.choice(CATEGORIES_INSTRUMENTS, nombre), None),
+        'Code postal du bénéficaire': codes_postaux,
+        "Code postal de l'opération": codes_postaux,
+        'Zone': rng.choice(['Métropole', 'Outre-mer'], nombre, p=[0.9, 0.1]),
+        "Département de l'opération": np.char.zfill(rng.integers(1, 96, nombre).astype(str), 2),
+        "Région de l'opération": rng.choice(REGIONS_OPERATION, nombre),
+        'Fonds': fonds,
+        'Montant UE programmé': montants,
+        'Total des dépenses éligibles': np.round(montants / taux, 2),
+        'Taux de cofinancement': taux,
+        "Date de début de l'opération": debuts,
+        "Date de fin de l'opération": fins,
+        'Durée, en mois': durees,
+        'Montant UE par mois': montants / durees,
+        'Total éligible par mois': montants / taux / durees,
+        'catbeneficiaire': rng.choice(ordre_catbeneficiaires, nombre),
+        'themeprojet': rng.choice(ordre_themeprojet, nombre),
+        'Palier': palier,
+    }
+    assert set(colonnes) == set(dtype_colonnes) | set(colonnes_dates)
+    return pd.DataFrame(colonnes)
+
+
+def ecrire(chemin, facteur=1, graine=0):
+    data = generer(int(TAILLE_REFERENCE * facteur), graine)
+    data.to_csv(chemin, index=False, date_format='%Y-%m-%d')
+    return len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Écrit une liste d’opérations synthétique.')
+    parser.add_argument('--facteur', type=float, default=1)
+    parser.add_argument('--graine', type=int, default=0)
+    parser.add_argument('--sortie', default='operations-synthetiques.csv')
+    args = parser.parse_args()
+    print('{} opérations écrites dans {}'.format(ecrire(args.sortie, args.facteur, args.graine), args.sortie))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+# Mémoire des workers gunicorn avec 1, 4 et 8 workers : RSS, PSS (part des
+# pages partagées imputée à chaque processus) et pages privées, lues dans
+# /proc/<pid>/smaps_rollup (Linux).
+#
+#   python benchmarks/mesure_memoire.py [--workers 1 4 8] [--sans-preload]
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def port_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def memoire(pid):
+    valeurs = {}
+    with open('/proc/{}/smaps_rollup'.format(pid)) as fichier:
+        for ligne in fichier:
+            champs = ligne.split()
+            if len(champs) == 3 and champs[2] == 'kB':
+                valeurs[champs[0].rstrip(':')] = int(champs[1]) / 1024
+    return valeurs['Rss'], valeurs['Pss'], valeurs.get('Private_Clean', 0) + valeurs.get('Private_Dirty', 0)
+
+
+def enfants(pid):
+    with open('/proc/{0}/task/{0}/children'.format(pid)) as fichier:
+        return [int(enfant) for enfant in fichier.read().split()]
+
+
+def mesurer(workers, preload):
+    port = port_libre()
+    # Sans preload : configuration vide, chaque worker charge l'application.
+    configuration = os.path.join(RACINE, 'gunicorn.conf.py') if preload else os.path.join(tempfile.mkdtemp(), 'vide.py')
+    if not preload:
+        open(configuration, 'w').close()
+    commande = [sys.executable, '-m', 'gunicorn', '-c', configuration,
+                '-w', str(workers), '-b', '127.0.0.1:{}'.format(port), 'app:server']
+    maitre = subprocess.Popen(commande, env=dict(os.environ, PYTHONPATH=RACINE), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        fin = time.time() + 120
+        while time.time() < fin:
+            if len(enfants(maitre.pid)) >= workers:
+                try:
+                    urllib.request.urlopen('http://127.0.0.1:{}/'.format(port)).read()
+                    break
+                except OSError:
+                    pass
+            time.sleep(0.5)
+        # Chaque worker doit avoir servi quelques requêtes.
+        for _ in range(4 * workers):
+            urllib.request.urlopen('http://127.0.0.1:{}/_dash-layout'.format(port)).read()
+        return memoire(maitre.pid), [memoire(pid) for pid in enfants(maitre.pid)]
+    finally:
+        maitre.terminate()
+        maitre.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--sans-preload', action='store_true')
+    args = parser.parse_args()
+
+    print('{:>8} {:>10} {:>16} {:>16} {:>16} {:>14}'.format('workers', 'processus', 'RSS (Mo)', 'PSS (Mo)', 'privée (Mo)', 'PSS total'))
+    for workers in args.workers:
+        maitre, processus = mesurer(workers, not args.sans_preload)
+        total = maitre[1] + sum(pss for _, pss, _ in processus)
+        print('{:>8} {:>10} {:>16.1f} {:>16.1f} {:>16.1f} {:>14.1f}'.format(workers, 'maître', *maitre, total))
+        for rss, pss, privee in processus:
+            print('{:>8} {:>10} {:>16.1f} {:>16.1f} {:>16.1f}'.format('', 'worker', rss, pss, privee))
+
+
+if __name__ == '__main__':
+    main()
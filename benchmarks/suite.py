@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+# Suite de mesures sur des listes synthétiques de 1, 10 et 100 fois la
+# taille de la liste 2014-2020 (generer_operations.py) : durée de chaque
+# phase du calcul des artefacts (conversion du CSV en cache, chaque agrégat
+# et chaque figure du graphe de taches.py, sérialisation des figures, mise
+# en page et sa sérialisation JSON) et mémoire maximale du processus.
+#
+# Chaque taille est calculée dans un dossier neuf, par un processus neuf :
+# aucun cache (opérations, étapes de pipeline.py) n'est réutilisé. Un second
+# processus mesure ensuite l'ouverture du cache déjà construit.
+#
+#   python benchmarks/suite.py [--facteurs 1 10 100] [--sortie mesures.json]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from benchmarks.generer_operations import ecrire  # noqa: E402
+from fichiers import FICHIER_OPERATIONS  # noqa: E402
+
+SCRIPT = '''
+import json, resource, sys, time
+sys.path.insert(0, {racine!r})
+from instrumentation import PHASES, phase
+if {froid!r}:
+    from plotly.utils import PlotlyJSONEncoder
+    from artefacts import calculer_figures_et_layout
+    figures, layout, gabarits = calculer_figures_et_layout()
+    with phase('serialisation_layout'):
+        json.dumps(layout, cls=PlotlyJSONEncoder)
+else:
+    from donnees import operations
+    with phase('chargement'):
+        operations()
+PHASES['memoire'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps(PHASES))
+'''
+
+
+def mesurer(dossier, froid):
+    sortie = subprocess.run([sys.executable, '-c', SCRIPT.format(racine=RACINE, froid=froid)], cwd=dossier, check=True, capture_output=True, text=True).stdout
+    return json.loads(sortie.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--facteurs', type=float, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--graine', type=int, default=0)
+    parser.add_argument('--sortie', help='fichier JSON où ajouter les mesures')
+    args = parser.parse_args()
+
+    mesures = {}
+    for facteur in args.facteurs:
+        with tempfile.TemporaryDirectory() as dossier:
+            debut = time.perf_counter()
+            lignes = ecrire(os.path.join(dossier, FICHIER_OPERATIONS), facteur, args.graine)
+            print('×{:g} : {} opérations générées en {:.1f} s'.format(facteur, lignes, time.perf_counter() - debut), file=sys.stderr)
+            froid = mesurer(dossier, True)
+            chaud = mesurer(dossier, False)
+            froid['chargement (cache)'] = chaud['chargement']
+            mesures['×{:g}'.format(facteur)] = dict(froid, lignes=lignes)
+
+    colonnes = list(mesures)
+    phases = [phase for phase in mesures[colonnes[0]] if phase not in ('lignes', 'memoire')]
+    print('{:<40}'.format('phase (s)') + ''.join('{:>12}'.format(colonne) for colonne in colonnes))
+    for phase in phases:
+        print('{:<40}'.format(phase) + ''.join('{:>12.3f}'.format(mesures[colonne].get(phase, float('nan'))) for colonne in colonnes))
+    print('{:<40}'.format('mémoire maximale (Mo)') + ''.join('{:>12.0f}'.format(mesures[colonne]['memoire']) for colonne in colonnes))
+
+    if args.sortie:
+        historique = []
+        if os.path.exists(args.sortie):
+            with open(args.sortie, encoding='utf-8') as fichier:
+                historique = json.load(fichier)
+        historique.append({'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'mesures': mesures})
+        with open(args.sortie, 'w', encoding='utf-8') as fichier:
+            json.dump(historique, fichier, ensure_ascii=False, indent=1)
+
+
+if __name__ == '__main__':
+    main()
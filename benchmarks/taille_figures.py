@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+# Vérifie la taille des figures envoyées au navigateur (JSON compacté par
+# serialisation.py) par rapport à un budget par figure. La taille ne doit
+# pas dépendre du nombre d'opérations : un dépassement signale une série
+# envoyée point par point ou un tableau qui n'est plus encodé.
+# Code de sortie 1 en cas de dépassement.
+#
+#   python benchmarks/taille_figures.py
+
+import json
+import os
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from artefacts import calculer_figures_et_layout  # noqa: E402
+
+# Octets de JSON compact, avec une marge pour les modalités des données
+# complètes. fig1 : au plus 2 × 400 points (lorenz.NB_POINTS_MAX) ; fig7 :
+# contours simplifiés des régions (geometrie.TOLERANCE).
+BUDGETS = {
+    'fig1': 9000,
+    'fig2': 8000,
+    'fig4a': 3000,
+    'fig4b': 3000,
+    'fig5': 9000,
+    'fig5_entreprises': 1500,
+    'fig6': 3500,
+    'fig7': 30000,
+    'fig8': 2500,
+    'fig9': 1500,
+    'fig10a': 5000,
+    'fig10b': 2000,
+    'fig10c': 1000,
+    'fig10d': 1000,
+}
+BUDGET_GABARITS = 10000
+
+
+def main():
+    figures, _, gabarits = calculer_figures_et_layout()
+    tailles = {nom: len(json.dumps(figure, separators=(',', ':'))) for nom, figure in figures.items()}
+    tailles['(thèmes)'] = len(json.dumps(gabarits, separators=(',', ':')))
+    budgets = dict(BUDGETS, **{'(thèmes)': BUDGET_GABARITS})
+
+    depassements = []
+    print('{:<18} {:>8} {:>8}'.format('figure', 'octets', 'budget'))
+    for nom, taille in tailles.items():
+        budget = budgets.get(nom)
+        print('{:<18} {:>8} {:>8}{}'.format(nom, taille, budget or '-', '  DÉPASSEMENT' if budget and taille > budget else ''))
+        if budget is None or taille > budget:
+            depassements.append(nom)
+    print('{:<18} {:>8}'.format('total', sum(tailles.values())))
+    if depassements:
+        print('Budget dépassé ou absent :', ', '.join(depassements))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+# Vérifie que les figures sont celles du rapport d'origine : mêmes traces,
+# mêmes titres et mêmes axes, les nombres à la tolérance relative près. Les
+# instantanés livrés (benchmarks/instantanes/<figure>.json) ont été
+# enregistrés une fois à partir du code d'origine (app.py du commit
+# REFERENCE), exécuté sur la liste synthétique de graine fixe
+# (generer_operations.py) ; les figures courantes sont calculées sur la même
+# liste. Seuls les traces (y compris celles des boutons de fig5), le titre
+# et les axes sont conservés.
+#
+# Les figures dont le code d'origine recopiait des valeurs de la liste
+# publiée (FIGURES_PUBLIEES) ne se comparent que sur cette liste :
+# --liste DOSSIER exécute alors le code d'origine sur le CSV du dossier et
+# compare toutes les figures, sans instantanés. --enregistrer réécrit les
+# instantanés ; --liste et --enregistrer lisent le code d'origine avec git.
+#
+#   python benchmarks/verifier_instantanes.py [--liste DOSSIER] [--enregistrer] [--tolerance 1e-9]
+
+import argparse
+import json
+import math
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from fichiers import FICHIER_OPERATIONS  # noqa: E402
+
+DOSSIER_INSTANTANES = os.path.join(RACINE, 'benchmarks', 'instantanes')
+# Commit du rapport publié, avant tout recalcul des figures.
+REFERENCE = 'b7e4ae0'
+FICHIERS_REFERENCE = ['app.py', 'data_montants_mois.csv']
+TOLERANCE = 1e-9
+# Liste synthétique des instantanés livrés.
+TAILLE_SYNTHETIQUE = 4000
+GRAINE = 0
+# Valeurs saisies à partir de la liste publiée dans le code d'origine
+# (fig6, lignes de fig10b, fig10c, fig10d) ou lues dans
+# data_montants_mois.csv (fig10a).
+FIGURES_PUBLIEES = {'fig6', 'fig10a', 'fig10b', 'fig10c', 'fig10d'}
+# Courbes dont seuls quelques points sont tracés (lorenz.py) : chaque point
+# doit se trouver sur la courbe d'origine, et celle-ci à moins de
+# lorenz.TOLERANCE de la ligne brisée tracée. La courbe d'origine associait
+# le k-ième point au rang k + 1 ; elle est relue à ce rang.
+COURBES = {'fig1'}
+TOLERANCE_COURBE = 1e-5
+# Écarts voulus : couleurs de fig8 associées aux thématiques par leur nom et
+# non par leur rang, faute de frappe corrigée dans les libellés de fig6.
+ECARTS_VOULUS = {
+    'fig6': {'.data[].y'},
+    'fig8': {'.data[].marker.color'},
+}
+# Nombre maximal de différences affichées par figure.
+DIFFERENCES_AFFICHEES = 10
+
+SCRIPT_REFERENCE = '''
+import json
+from plotly.utils import PlotlyJSONEncoder
+import app
+print(json.dumps({nom: getattr(app, nom) for nom in dir(app) if nom.startswith('fig')}, cls=PlotlyJSONEncoder))
+'''
+
+
+def reduire(figure):
+    # Traces, titre et axes ; ni modèle (layout.template) ni mise en forme.
+    # Les boutons (updatemenus) portent les séries de fig5.
+    layout = figure.get('layout', {})
+    return {
+        'data': figure.get('data', []),
+        'layout': {cle: valeur for cle, valeur in layout.items() if cle in ('title', 'updatemenus') or re.match(r'([xy]axis|polar)\d*$', cle)},
+    }
+
+
+def figures_courantes(liste):
+    # Caches dans un dossier temporaire : le résultat ne dépend ni du dossier
+    # courant ni d'un calcul antérieur.
+    from plotly.utils import PlotlyJSONEncoder
+
+    from donnees import operations
+    from figures import construire_figures
+
+    courant = os.getcwd()
+    with tempfile.TemporaryDirectory() as dossier:
+        os.symlink(os.path.abspath(liste), os.path.join(dossier, FICHIER_OPERATIONS))
+        os.chdir(dossier)
+        try:
+            figures = construire_figures(operations())
+            return {nom: reduire(json.loads(json.dumps(figure, cls=PlotlyJSONEncoder))) for nom, figure in figures.items()}
+        finally:
+            os.chdir(courant)
+
+
+def figures_reference(liste):
+    with tempfile.TemporaryDirectory() as dossier:
+        for fichier in FICHIERS_REFERENCE:
+            contenu = subprocess.run(['git', 'show', '{}:{}'.format(REFERENCE, fichier)], cwd=RACINE, check=True, capture_output=True).stdout
+            with open(os.path.join(dossier, fichier), 'wb') as sortie:
+                sortie.write(contenu)
+        os.symlink(os.path.abspath(liste), os.path.join(dossier, FICHIER_OPERATIONS))
+        sortie = subprocess.run([sys.executable, '-c', SCRIPT_REFERENCE], cwd=dossier, check=True, capture_output=True, text=True).stdout
+    return {nom: reduire(figure) for nom, figure in json.loads(sortie.splitlines()[-1]).items()}
+
+
+def liste_synthetique(dossier, taille=TAILLE_SYNTHETIQUE, graine=GRAINE):
+    from benchmarks.generer_operations import generer
+
+    chemin = os.path.join(dossier, FICHIER_OPERATIONS)
+    generer(taille, graine).to_csv(chemin, index=False)
+    return chemin
+
+
+def differences(attendu, obtenu, tolerance, chemin=''):
+    """Chemins (et valeurs) où obtenu s'écarte d'attendu."""
+    if isinstance(attendu, dict) and isinstance(obtenu, dict):
+        for cle in sorted(set(attendu) | set(obtenu)):
+            if cle not in obtenu:
+                yield '{}.{} absente'.format(chemin, cle)
+            elif cle not in attendu:
+                yield '{}.{} en trop'.format(chemin, cle)
+            else:
+                yield from differences(attendu[cle], obtenu[cle], tolerance, '{}.{}'.format(chemin, cle))
+    elif isinstance(attendu, list) and isinstance(obtenu, list):
+        if len(attendu) != len(obtenu):
+            yield '{} : {} éléments au lieu de {}'.format(chemin, len(obtenu), len(attendu))
+        else:
+            for i, (a, o) in enumerate(zip(attendu, obtenu)):
+                yield from differences(a, o, tolerance, '{}[{}]'.format(chemin, i))
+    elif isinstance(attendu, (int, float)) and isinstance(obtenu, (int, float)) and not isinstance(attendu, bool) and not isinstance(obtenu, bool):
+        if not math.isclose(attendu, obtenu, rel_tol=tolerance, abs_tol=tolerance):
+            yield '{} : {!r} au lieu de {!r}'.format(chemin, obtenu, attendu)
+    elif attendu != obtenu:
+        yield '{} : {!r} au lieu de {!r}'.format(chemin, str(obtenu)[:80], str(attendu)[:80])
+
+
+def differences_courbe(attendue, obtenue, chemin):
+    from lorenz import TOLERANCE as TOLERANCE_LORENZ
+
+    y = np.r_[0, np.asarray(attendue['y'], dtype=float)]
+    rangs = np.arange(len(y)) / (len(y) - 1)
+    x_obtenus, y_obtenus = np.asarray(obtenue['x'], dtype=float), np.asarray(obtenue['y'], dtype=float)
+    ecarts = np.abs(np.interp(x_obtenus, rangs, y) - y_obtenus)
+    for i in np.flatnonzero(ecarts > TOLERANCE_COURBE)[:DIFFERENCES_AFFICHEES]:
+        yield '{}.y[{}] : écart de {:.2g} à la courbe d’origine'.format(chemin, i, ecarts[i])
+    ecarts = np.abs(np.interp(rangs, x_obtenus, y_obtenus) - y)
+    for i in np.flatnonzero(ecarts > TOLERANCE_LORENZ + TOLERANCE_COURBE)[:DIFFERENCES_AFFICHEES]:
+        yield '{} : courbe d’origine à {:.2g} du tracé au rang {}'.format(chemin, ecarts[i], i)
+
+
+def comparer(nom, attendue, obtenue, tolerance):
+    ecarts = []
+    if nom in COURBES and len(attendue['data']) == len(obtenue['data']):
+        attendue, obtenue = json.loads(json.dumps(attendue)), json.loads(json.dumps(obtenue))
+        for i, (trace_attendue, trace_obtenue) in enumerate(zip(attendue['data'], obtenue['data'])):
+            courbes = [{axe: trace.pop(axe, []) for axe in ('x', 'y')} for trace in (trace_attendue, trace_obtenue)]
+            ecarts += differences_courbe(*courbes, '.data[{}]'.format(i))
+    ecarts += differences(attendue, obtenue, tolerance)
+    voulus = ECARTS_VOULUS.get(nom, set())
+    return [ecart for ecart in ecarts if re.sub(r'\[\d+\]', '[]', ecart.split(' ')[0]) not in voulus]
+
+
+def enregistrer(dossier):
+    with tempfile.TemporaryDirectory() as provisoire:
+        figures = figures_reference(liste_synthetique(provisoire))
+    os.makedirs(dossier, exist_ok=True)
+    for nom, figure in figures.items():
+        if nom in FIGURES_PUBLIEES:
+            continue
+        if nom in COURBES:
+            # Seuls les montants cumulés servent à la comparaison.
+            for trace in figure['data']:
+                del trace['x']
+                trace['y'] = [round(valeur, 9) for valeur in trace['y']]
+        with open(os.path.join(dossier, nom + '.json'), 'w', encoding='utf-8') as fichier:
+            json.dump(figure, fichier, ensure_ascii=False, sort_keys=True)
+            fichier.write('\n')
+    print('{} instantanés écrits dans {}'.format(len(set(figures) - FIGURES_PUBLIEES), dossier))
+
+
+def instantanes(dossier):
+    figures = {}
+    for nom in sorted(os.listdir(dossier)) if os.path.isdir(dossier) else []:
+        if nom.endswith('.json'):
+            with open(os.path.join(dossier, nom), encoding='utf-8') as fichier:
+                figures[nom[:-len('.json')]] = json.load(fichier)
+    return figures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare les figures à celles du code d’origine.')
+    parser.add_argument('--liste', help='dossier de la liste publiée (CSV) : compare toutes les figures au code d’origine exécuté sur elle')
+    parser.add_argument('--enregistrer', action='store_true', help='réécrit les instantanés à partir du code d’origine')
+    parser.add_argument('--dossier', default=DOSSIER_INSTANTANES)
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    if args.enregistrer:
+        enregistrer(args.dossier)
+        return
+    if args.liste:
+        liste = os.path.join(args.liste, FICHIER_OPERATIONS)
+        attendues, figures = figures_reference(liste), figures_courantes(liste)
+    else:
+        attendues = instantanes(args.dossier)
+        if not attendues:
+            sys.exit('aucun instantané dans {} : lancer d’abord avec --enregistrer'.format(args.dossier))
+        with tempfile.TemporaryDirectory() as provisoire:
+            figures = figures_courantes(liste_synthetique(provisoire))
+
+    echecs = 0
+    for nom in sorted(attendues):
+        if nom not in figures:
+            print('{} : figure absente'.format(nom))
+            echecs += 1
+            continue
+        ecarts = comparer(nom, attendues[nom], figures[nom], args.tolerance)
+        print('{} : {}'.format(nom, 'identique' if not ecarts else '{} différence(s)'.format(len(ecarts))))
+        for ecart in ecarts[:DIFFERENCES_AFFICHEES]:
+            print('    ' + ecart)
+        echecs += bool(ecarts)
+    sys.exit(1 if echecs else 0)
+
+
+if __name__ == '__main__':
+    main()
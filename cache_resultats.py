@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+# Cache des résultats calculés à la demande (figures filtrées…), partagé par
+# les workers gunicorn : un fichier par entrée sous cache/resultats, ou un
+# serveur compatible Redis si CACHE_REDIS_URL est défini. Le nombre d'entrées
+# est borné (les moins récemment lues sont évincées) et chaque entrée expire
+# après une durée de vie fixe.
+
+import bisect
+import copy
+import json
+import os
+import threading
+import time
+
+from fichiers import ecrire_json, lire_json
+
+DOSSIER_RESULTATS = os.path.join('cache', 'resultats')
+TAILLE_MAX = int(os.environ.get('CACHE_TAILLE_MAX', 256))
+DUREE_VIE = int(os.environ.get('CACHE_DUREE_VIE', 24 * 3600))
+# Bornes supérieures (en secondes) des classes de l'histogramme des latences.
+CLASSES_LATENCE = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, float('inf')]
+# Délai minimal (en secondes) entre deux publications des compteurs d'un
+# worker.
+PERIODE_PUBLICATION = 1.0
+
+
+class CacheFichiers:
+
+    def __init__(self, dossier, taille_max=TAILLE_MAX, duree_vie=DUREE_VIE):
+        self.dossier = dossier
+        self.taille_max = taille_max
+        self.duree_vie = duree_vie
+        os.makedirs(os.path.join(dossier, 'metriques'), exist_ok=True)
+
+    def _chemin(self, cle):
+        return os.path.join(self.dossier, cle + '.json')
+
+    def lire(self, cle):
+        entree = lire_json(self._chemin(cle))
+        if entree is None:
+            return None
+        if time.time() - entree['cree'] > self.duree_vie:
+            self._supprimer(self._chemin(cle))
+            return None
+        # La date de modification sert de date de dernier accès pour
+        # l'éviction.
+        try:
+            os.utime(self._chemin(cle))
+        except OSError:
+            pass
+        return entree['valeur']
+
+    def ecrire(self, cle, valeur):
+        ecrire_json(self._chemin(cle), {'cree': time.time(), 'valeur': valeur})
+        entrees = self._entrees()
+        if len(entrees) > self.taille_max:
+            entrees.sort(key=lambda entree: entree[1])
+            for chemin, _ in entrees[:len(entrees) - self.taille_max]:
+                self._supprimer(chemin)
+
+    def _entrees(self):
+        entrees = []
+        for nom in os.listdir(self.dossier):
+            if nom.endswith('.json'):
+                try:
+                    entrees.append((os.path.join(self.dossier, nom), os.path.getmtime(os.path.join(self.dossier, nom))))
+                except OSError:
+                    pass
+        return entrees
+
+    def _supprimer(self, chemin):
+        try:
+            os.remove(chemin)
+        except OSError:
+            pass
+
+    def nombre_entrees(self):
+        return len(self._entrees())
+
+    def publier_metriques(self, processus, metriques):
+        ecrire_json(os.path.join(self.dossier, 'metriques', '{}.json'.format(processus)), metriques)
+
+    def lire_metriques(self):
+        dossier = os.path.join(self.dossier, 'metriques')
+        return [metriques for metriques in (lire_json(os.path.join(dossier, nom)) for nom in os.listdir(dossier) if nom.endswith('.json')) if metriques]
+
+
+class CacheRedis:
+
+    def __init__(self, url, espace, taille_max=TAILLE_MAX, duree_vie=DUREE_VIE):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefixe = 'eu-cohesionpolicy:{}:'.format(espace)
+        self.taille_max = taille_max
+        self.duree_vie = duree_vie
+
+    def lire(self, cle):
+        valeur = self.client.get(self.prefixe + cle)
+        if valeur is None:
+            return None
+        self.client.zadd(self.prefixe + 'acces', {cle: time.time()})
+        return json.loads(valeur)
+
+    def ecrire(self, cle, valeur):
+        maintenant = time.time()
+        with self.client.pipeline() as pipeline:
+            pipeline.set(self.prefixe + cle, json.dumps(valeur), ex=self.duree_vie)
+            pipeline.zadd(self.prefixe + 'acces', {cle: maintenant})
+            pipeline.zremrangebyscore(self.prefixe + 'acces', '-inf', maintenant - self.duree_vie)
+            pipeline.execute()
+        excedent = self.client.zcard(self.prefixe + 'acces') - self.taille_max
+        if excedent > 0:
+            anciennes = [cle.decode() for cle in self.client.zrange(self.prefixe + 'acces', 0, excedent - 1)]
+            self.client.delete(*(self.prefixe + cle for cle in anciennes))
+            self.client.zrem(self.prefixe + 'acces', *anciennes)
+
+    def nombre_entrees(self):
+        return self.client.zcard(self.prefixe + 'acces')
+
+    def publier_metriques(self, processus, metriques):
+        self.client.hset(self.prefixe + 'metriques', str(processus), json.dumps(metriques))
+
+    def lire_metriques(self):
+        return [json.loads(metriques) for metriques in self.client.hgetall(self.prefixe + 'metriques').values()]
+
+
+def ouvrir_cache(espace, taille_max=TAILLE_MAX, duree_vie=DUREE_VIE):
+    # espace : version des données et du code ; un changement de l'une ou de
+    # l'autre repart d'un cache vide.
+    url = os.environ.get('CACHE_REDIS_URL')
+    if url:
+        return CacheRedis(url, espace, taille_max, duree_vie)
+    return CacheFichiers(os.path.join(DOSSIER_RESULTATS, espace), taille_max, duree_vie)
+
+
+def _histogramme_vide():
+    return {'nombre': 0, 'somme': 0.0, 'max': 0.0, 'classes': [0] * len(CLASSES_LATENCE)}
+
+
+class CacheMesure:
+    """Cache dont les lectures sont comptées et chronométrées.
+
+    Les compteurs de chaque processus sont publiés dans le cache lui-même,
+    au plus une fois par PERIODE_PUBLICATION, de sorte que metriques()
+    agrège ceux de tous les workers.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.compteurs = {'succes': _histogramme_vide(), 'echecs': _histogramme_vide()}
+        self.verrou = threading.Lock()
+        self.publiee = 0.0
+
+    def obtenir(self, cle, calculer):
+        debut = time.perf_counter()
+        valeur = self.cache.lire(cle)
+        resultat = 'succes'
+        if valeur is None:
+            resultat = 'echecs'
+            valeur = calculer()
+            self.cache.ecrire(cle, valeur)
+        self._enregistrer(resultat, time.perf_counter() - debut)
+        return valeur
+
+    def _enregistrer(self, resultat, duree):
+        with self.verrou:
+            histogramme = self.compteurs[resultat]
+            histogramme['nombre'] += 1
+            histogramme['somme'] += duree
+            histogramme['max'] = max(histogramme['max'], duree)
+            histogramme['classes'][bisect.bisect_left(CLASSES_LATENCE, duree)] += 1
+            if time.monotonic() - self.publiee < PERIODE_PUBLICATION:
+                return
+            self.publiee = time.monotonic()
+        self._publier()
+
+    def _publier(self):
+        with self.verrou:
+            compteurs = copy.deepcopy(self.compteurs)
+        try:
+            self.cache.publier_metriques(os.getpid(), compteurs)
+        except Exception:
+            # Les métriques ne doivent jamais faire échouer une requête.
+            pass
+
+    def metriques(self):
+        # Les compteurs de ce processus sont publiés à jour ; ceux des
+        # autres workers datent de leur dernière publication.
+        self._publier()
+        total = {'succes': _histogramme_vide(), 'echecs': _histogramme_vide()}
+        for compteurs in self.cache.lire_metriques():
+            for resultat, histogramme in compteurs.items():
+                cumul = total[resultat]
+                cumul['nombre'] += histogramme['nombre']
+                cumul['somme'] += histogramme['somme']
+                cumul['max'] = max(cumul['max'], histogramme['max'])
+                cumul['classes'] = [a + b for a, b in zip(cumul['classes'], histogramme['classes'])]
+        lectures = total['succes']['nombre'] + total['echecs']['nombre']
+        return {
+            'entrees': self.cache.nombre_entrees(),
+            'taille_max': self.cache.taille_max,
+            'duree_vie': self.cache.duree_vie,
+            'lectures': lectures,
+            'taux_succes': total['succes']['nombre'] / lectures if lectures else None,
+            'classes_latence': [str(borne) for borne in CLASSES_LATENCE],
+            'latences': total,
+        }
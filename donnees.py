@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+
+# Chargement de la liste des opérations : le CSV est converti une seule fois
+# en un cache colonne par colonne (fichiers .npy), rechargé ensuite sans
+# nouvelle analyse du CSV tant que celui-ci n'a pas changé.
+
+import bisect
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from fichiers import DOSSIER_SOURCES, FICHIER_OPERATIONS, ecrire_json, empreinte_source, lire_json
+
+DOSSIER_CACHE = os.path.join('cache', 'operations')
+VERSION_FORMAT = 2
+
+dtype_colonnes = {
+    'Région (pre-NOTRe)': str,
+    'Catégorie de région': str,
+    'Intitulé du projet': str,
+    'Nom du bénéficiaire': str,
+    'Instrument financier ?': bool,
+    "Catégorie d'instrument financier": str,
+    'Code postal du bénéficaire': str,
+    "Code postal de l'opération": str,
+    'Zone': str,
+    "Département de l'opération": str,
+    "Région de l'opération": str,
+    'Fonds': str,
+    'Montant UE programmé': float,
+    'Total des dépenses éligibles': float,
+    'Taux de cofinancement': float,
+    'Durée, en mois': int,
+    'Montant UE par mois': float,
+    'Total éligible par mois': float,
+    'catbeneficiaire': str,
+    'themeprojet': str,
+    'Palier': str
+}
+
+colonnes_dates = ["Date de début de l'opération", "Date de fin de l'opération"]
+
+# Ces colonnes sont lues en catégories, avec toutes leurs modalités : un
+# groupby sur l'une d'elles passe observed=True pour ne pas produire de
+# groupes vides.
+colonnes_categorielles = ['Fonds', 'catbeneficiaire', 'themeprojet', 'Palier', "Région de l'opération", 'Région (pre-NOTRe)', 'Catégorie de région']
+
+
+def lire_csv(chemin=FICHIER_OPERATIONS):
+    data = pd.read_csv(chemin, dtype=dtype_colonnes, parse_dates=colonnes_dates)
+    for colonne in colonnes_categorielles:
+        data[colonne] = data[colonne].astype('category')
+    return data
+
+
+def _ecrire_modalites(dossier, description, i, modalites):
+    description['modalites'] = '{}.modalites.npy'.format(i)
+    description['decalages'] = '{}.decalages.npy'.format(i)
+    encodees = [modalite.encode('utf-8') for modalite in modalites]
+    decalages = np.zeros(len(encodees) + 1, dtype=np.int64)
+    np.cumsum([len(modalite) for modalite in encodees], out=decalages[1:])
+    np.save(os.path.join(dossier, description['modalites']), np.frombuffer(b''.join(encodees), dtype=np.uint8), allow_pickle=False)
+    np.save(os.path.join(dossier, description['decalages']), decalages, allow_pickle=False)
+
+
+def ecrire_cache(data, dossier):
+    # Chaque colonne est écrite dans son propre fichier .npy ; les colonnes
+    # texte sont encodées en dictionnaire (codes entiers + modalités). Les
+    # modalités sont elles-mêmes stockées dans un tampon UTF-8 et un tableau
+    # de décalages, pour être projetées en mémoire comme le reste.
+    os.makedirs(dossier)
+    colonnes = []
+    for i, colonne in enumerate(data.columns):
+        serie = data[colonne]
+        description = {'nom': colonne, 'fichier': '{}.npy'.format(i)}
+        if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+            description['type'] = 'date'
+            valeurs = serie.to_numpy(dtype='datetime64[ns]')
+        elif pd.api.types.is_numeric_dtype(serie.dtype) or pd.api.types.is_bool_dtype(serie.dtype):
+            description['type'] = 'nombre'
+            valeurs = serie.to_numpy()
+        else:
+            categorie = serie.astype('category')
+            description['type'] = 'categorie' if colonne in colonnes_categorielles else 'texte'
+            _ecrire_modalites(dossier, description, i, [str(modalite) for modalite in categorie.cat.categories])
+            valeurs = categorie.cat.codes.to_numpy()
+        np.save(os.path.join(dossier, description['fichier']), valeurs, allow_pickle=False)
+        colonnes.append(description)
+    ecrire_json(os.path.join(dossier, 'colonnes.json'), {'version': VERSION_FORMAT, 'lignes': len(data), 'colonnes': colonnes})
+
+
+class Modalites:
+    """Modalités triées d'une colonne texte, décodées à la demande."""
+
+    def __init__(self, tampon, decalages):
+        self.tampon = tampon
+        self.decalages = decalages
+
+    def __len__(self):
+        return len(self.decalages) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return bytes(self.tampon[self.decalages[i]:self.decalages[i + 1]]).decode('utf-8')
+
+    def code(self, valeur):
+        # L'ordre des octets UTF-8 est celui des points de code, donc celui
+        # dans lequel pandas a trié les modalités.
+        i = bisect.bisect_left(self, valeur)
+        return i if i < len(self) and self[i] == valeur else -1
+
+    def liste(self):
+        return [self[i] for i in range(len(self))]
+
+
+class Operations:
+    """Colonnes du cache projetées en mémoire, en lecture seule.
+
+    Les tableaux sont des np.memmap : les workers gunicorn issus d'un même
+    processus maître (--preload) ou ouvrant le même cache partagent leurs
+    pages, et aucun objet Python par ligne n'est créé.
+    """
+
+    def __init__(self, dossier):
+        description = lire_json(os.path.join(dossier, 'colonnes.json'))
+        self.dossier = dossier
+        self.lignes = description['lignes']
+        self.types = {}
+        self.colonnes = {}
+        self.modalites = {}
+        for colonne in description['colonnes']:
+            nom = colonne['nom']
+            self.types[nom] = colonne['type']
+            self.colonnes[nom] = np.load(os.path.join(dossier, colonne['fichier']), mmap_mode='r', allow_pickle=False)
+            if 'modalites' in colonne:
+                self.modalites[nom] = Modalites(np.load(os.path.join(dossier, colonne['modalites']), mmap_mode='r', allow_pickle=False),
+                                                np.load(os.path.join(dossier, colonne['decalages']), mmap_mode='r', allow_pickle=False))
+
+    def __len__(self):
+        return self.lignes
+
+    def __getitem__(self, nom):
+        return self.colonnes[nom]
+
+    def masque(self, nom, valeur):
+        # Modalité absente de la liste : aucune opération. Son code (-1) est
+        # aussi celui des valeurs manquantes.
+        code = self.modalites[nom].code(valeur)
+        if code < 0:
+            return np.zeros(len(self), dtype=bool)
+        return self.colonnes[nom] == code
+
+    def dataframe(self, colonnes=None, lignes=None):
+        donnees = {}
+        for nom in colonnes or self.colonnes:
+            valeurs = self.colonnes[nom] if lignes is None else self.colonnes[nom][lignes]
+            if self.types[nom] == 'categorie':
+                donnees[nom] = pd.Categorical.from_codes(valeurs, categories=self.modalites[nom].liste())
+            elif self.types[nom] == 'texte':
+                donnees[nom] = np.array(self.modalites[nom].liste() + [np.nan], dtype=object)[valeurs]
+            else:
+                donnees[nom] = valeurs
+        return pd.DataFrame(donnees)
+
+
+def fusionner_caches(dossiers, destination):
+    # Concatène les caches de plusieurs partitions sans relire leurs CSV : les
+    # modalités des colonnes texte sont réunies puis les codes de chaque
+    # partition sont renumérotés.
+    partitions = [Operations(dossier) for dossier in dossiers]
+    reference = lire_json(os.path.join(dossiers[0], 'colonnes.json'))
+    provisoire = '{}.{}.tmp'.format(destination, os.getpid())
+    shutil.rmtree(provisoire, ignore_errors=True)
+    os.makedirs(provisoire)
+    try:
+        colonnes = []
+        for i, colonne in enumerate(reference['colonnes']):
+            nom = colonne['nom']
+            description = {'nom': nom, 'fichier': '{}.npy'.format(i), 'type': colonne['type']}
+            if 'modalites' in colonne:
+                reunion = sorted(set().union(*(partition.modalites[nom].liste() for partition in partitions)))
+                _ecrire_modalites(provisoire, description, i, reunion)
+                index = {modalite: code for code, modalite in enumerate(reunion)}
+                type_codes = np.int8 if len(reunion) < 127 else np.int16 if len(reunion) < 32767 else np.int32
+                valeurs = np.concatenate([np.array([index[modalite] for modalite in partition.modalites[nom].liste()] + [-1], dtype=type_codes)[partition[nom]]
+                                          for partition in partitions])
+            else:
+                valeurs = np.concatenate([partition[nom] for partition in partitions])
+            np.save(os.path.join(provisoire, description['fichier']), valeurs, allow_pickle=False)
+            colonnes.append(description)
+        ecrire_json(os.path.join(provisoire, 'colonnes.json'), {'version': VERSION_FORMAT, 'lignes': sum(len(partition) for partition in partitions), 'colonnes': colonnes})
+        os.rename(provisoire, destination)
+    except OSError:
+        if not os.path.exists(os.path.join(destination, 'colonnes.json')):
+            raise
+    finally:
+        shutil.rmtree(provisoire, ignore_errors=True)
+    return destination
+
+
+def lire_cache(dossier):
+    return Operations(dossier).dataframe()
+
+
+def dossier_version(chemin=FICHIER_OPERATIONS, dossier_cache=DOSSIER_CACHE):
+    # Le dossier du cache est nommé d'après l'empreinte du CSV et la version
+    # du format.
+    empreinte = empreinte_source(chemin, os.path.join(dossier_cache, 'index.json'))
+    return os.path.join(dossier_cache, 'v{}-{}'.format(VERSION_FORMAT, empreinte[:16])), empreinte
+
+
+def preparer_cache(chemin=FICHIER_OPERATIONS, dossier_cache=DOSSIER_CACHE):
+    # Renvoie le dossier du cache et, s'il a fallu lire le CSV, le DataFrame.
+    dossier, _ = dossier_version(chemin, dossier_cache)
+    if os.path.exists(os.path.join(dossier, 'colonnes.json')):
+        return dossier, None
+    data = lire_csv(chemin)
+    # Écriture dans un dossier provisoire puis renommage : plusieurs workers
+    # peuvent démarrer en même temps sans lire un cache incomplet.
+    provisoire = '{}.{}.tmp'.format(dossier, os.getpid())
+    try:
+        ecrire_cache(data, provisoire)
+        os.rename(provisoire, dossier)
+    except OSError:
+        pass
+    finally:
+        shutil.rmtree(provisoire, ignore_errors=True)
+    return dossier, data
+
+
+def charger_operations(chemin=FICHIER_OPERATIONS, dossier_cache=DOSSIER_CACHE):
+    dossier, data = preparer_cache(chemin, dossier_cache)
+    return data if data is not None else lire_cache(dossier)
+
+
+def ouvrir_operations(chemin=FICHIER_OPERATIONS, dossier_cache=DOSSIER_CACHE):
+    if os.path.isdir(DOSSIER_SOURCES):
+        # Une liste par autorité de gestion : voir ingestion.py.
+        from ingestion import actualiser
+        dossier, _ = actualiser(dossier_cache=dossier_cache)
+        return Operations(dossier)
+    dossier, _ = preparer_cache(chemin, dossier_cache)
+    return Operations(dossier)
+
+
+_operations = None
+
+
+def operations():
+    # Ouvert une fois par processus ; appelé dans le maître gunicorn
+    # (preload_app), il est hérité tel quel par les workers.
+    global _operations
+    if _operations is None:
+        _operations = ouvrir_operations()
+    return _operations
+
+
+def remplacer_operations(liste):
+    # Rechargement à chaud (rechargement.py) : les requêtes en cours gardent
+    # la liste qu'elles ont déjà obtenue.
+    global _operations
+    _operations = liste
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+
+# Résolution des bénéficiaires : les noms de bénéficiaires sont saisis
+# librement (« CONSEIL REGIONAL BRETAGNE », « Région Bretagne », « SARL
+# Dupont », « Dupont SARL »…). Chaque opération reçoit un identifiant
+# d'entité commun aux graphies d'un même bénéficiaire.
+#
+# 1. Chaque nom distinct est normalisé (accents, casse, mots vides, formes
+#    juridiques, « conseil régional » → « région »…), ses mots triés. Les
+#    unités à rapprocher sont les couples (nom normalisé, département du
+#    code postal du bénéficiaire) : les graphies d'une même unité forment
+#    une seule entité, deux homonymes de départements différents restent
+#    distincts.
+# 2. Une signature MinHash des trigrammes de caractères de chaque nom
+#    normalisé est découpée en bandes. Deux unités ne sont comparées que si
+#    elles partagent une bande, leur département et les mêmes nombres
+#    (« Mission locale 12 » et « Mission locale 13 » restent distinctes) :
+#    c'est le blocage LSH. Un bloc trop grand n'est comparé que de proche en
+#    proche, dans l'ordre des signatures ; le nombre de comparaisons reste
+#    proportionnel au nombre d'unités.
+# 3. Les paires dont la similarité de Jaccard estimée atteint
+#    SEUIL_SIMILARITE sont réunies en composantes connexes.
+#
+# Le résultat est rangé sous cache/entites/ pour chaque version des colonnes
+# lues.
+#
+#   python entites.py [--exemples 10]
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import zlib
+
+import numpy as np
+
+from fichiers import ecrire_json, empreinte_fichier, lire_json
+from recherche import mots
+
+DOSSIER_ENTITES = os.path.join('cache', 'entites')
+COLONNE_NOM = 'Nom du bénéficiaire'
+COLONNE_CODE_POSTAL = 'Code postal du bénéficaire'
+COLONNE_MONTANT = 'Montant UE programmé'
+FORMES_JURIDIQUES = frozenset('sa sarl sas sasu eurl sci scop scic gie sem spl earl gaec'.split())
+# Mots ou suites de mots remplacés avant comparaison.
+SYNONYMES = {
+    ('conseil', 'regional'): 'region',
+    ('conseil', 'departemental'): 'departement',
+    ('conseil', 'general'): 'departement',
+    ('ville',): 'commune',
+    ('mairie',): 'commune',
+    ('st',): 'saint',
+    ('ste',): 'sainte',
+    ('univ',): 'universite',
+}
+NOMBRE_BANDES = 10
+LIGNES_PAR_BANDE = 4
+SEUIL_SIMILARITE = 0.7
+# Au-delà de FENETRE unités dans un même bloc, chacune n'est comparée
+# qu'aux FENETRE suivantes.
+FENETRE = 32
+# Noms dont les signatures sont calculées ensemble (mémoire temporaire
+# bornée).
+TAILLE_MORCEAU = 4096
+PREMIER = np.uint64(4294967311)
+SIGNATURE_VIDE = np.iinfo(np.uint32).max
+
+
+def normaliser_nom(nom):
+    entree = mots(nom)
+    sortie = []
+    i = 0
+    while i < len(entree):
+        for suite, remplacement in SYNONYMES.items():
+            if tuple(entree[i:i + len(suite)]) == suite:
+                sortie.append(remplacement)
+                i += len(suite)
+                break
+        else:
+            if entree[i] not in FORMES_JURIDIQUES:
+                sortie.append(entree[i])
+            i += 1
+    # Un nom réduit à une forme juridique (« SARL ») la garde.
+    return ' '.join(sorted(set(sortie or entree)))
+
+
+def departement(code_postal):
+    code = code_postal.strip().zfill(5) if code_postal else ''
+    return code[:3] if code.startswith('97') else code[:2]
+
+
+def _trigrammes(texte):
+    texte = ' {} '.format(texte)
+    return {zlib.crc32(texte[i:i + 3].encode('utf-8')) for i in range(len(texte) - 2)}
+
+
+def signatures(textes, graine=0):
+    """Signature MinHash (NOMBRE_BANDES × LIGNES_PAR_BANDE valeurs) des
+    trigrammes de chaque texte."""
+    rng = np.random.default_rng(graine)
+    taille = NOMBRE_BANDES * LIGNES_PAR_BANDE
+    a = rng.integers(1, int(PREMIER), taille, dtype=np.uint64)[:, None]
+    b = rng.integers(0, int(PREMIER), taille, dtype=np.uint64)[:, None]
+    resultat = np.empty((len(textes), taille), dtype=np.uint32)
+    for debut in range(0, len(textes), TAILLE_MORCEAU):
+        ensembles = [sorted(_trigrammes(texte)) for texte in textes[debut:debut + TAILLE_MORCEAU]]
+        # Un texte vide (aucun trigramme) reçoit un trigramme fictif, pour
+        # que np.minimum.reduceat ne déborde pas sur le texte suivant, puis
+        # la signature SIGNATURE_VIDE.
+        vides = np.array([not ensemble for ensemble in ensembles])
+        ensembles = [ensemble or [0] for ensemble in ensembles]
+        longueurs = np.array([len(ensemble) for ensemble in ensembles])
+        hachages = np.fromiter((valeur for ensemble in ensembles for valeur in ensemble), dtype=np.uint64, count=int(longueurs.sum()))
+        # a·x + b < 2**64 : a et x tiennent sur 32 bits.
+        valeurs = (a * hachages + b) % PREMIER
+        debuts = np.concatenate([[0], np.cumsum(longueurs)[:-1]])
+        resultat[debut:debut + len(ensembles)] = np.minimum.reduceat(valeurs, debuts, axis=1).T.astype(np.uint32)
+        resultat[debut:debut + len(ensembles)][vides] = SIGNATURE_VIDE
+    return resultat
+
+
+def paires_candidates(signatures_unites, blocs):
+    """Paires (i, j), i < j, d'unités partageant une bande et un bloc."""
+    paires = []
+    puissances = np.uint64(1000003) ** np.arange(LIGNES_PAR_BANDE, dtype=np.uint64)
+    for bande in range(NOMBRE_BANDES):
+        valeurs = signatures_unites[:, bande * LIGNES_PAR_BANDE:(bande + 1) * LIGNES_PAR_BANDE].astype(np.uint64)
+        # Somme modulo 2**64 : dépassements voulus.
+        with np.errstate(over='ignore'):
+            cles = (valeurs * puissances).sum(axis=1)
+        ordre = np.lexsort((cles, blocs))
+        cles, groupes = cles[ordre], blocs[ordre]
+        for decalage in range(1, FENETRE + 1):
+            memes = (cles[decalage:] == cles[:-decalage]) & (groupes[decalage:] == groupes[:-decalage])
+            if not memes.any():
+                break
+            paires.append(np.stack([ordre[:-decalage][memes], ordre[decalage:][memes]], axis=1))
+    if not paires:
+        return np.empty((0, 2), dtype=np.int64)
+    paires = np.sort(np.concatenate(paires), axis=1).astype(np.int64)
+    return np.unique(paires, axis=0)
+
+
+def composantes(nombre, paires):
+    """Étiquette de la composante connexe de chaque sommet (la plus petite
+    de ses sommets)."""
+    etiquettes = np.arange(nombre)
+    if not len(paires):
+        return etiquettes
+    gauche, droite = paires[:, 0], paires[:, 1]
+    while True:
+        minimums = np.minimum(etiquettes[gauche], etiquettes[droite])
+        precedentes = etiquettes.copy()
+        np.minimum.at(etiquettes, gauche, minimums)
+        np.minimum.at(etiquettes, droite, minimums)
+        # Saut de pointeurs : chaque sommet prend l'étiquette de son
+        # étiquette, jusqu'à stabilité.
+        while True:
+            sautees = etiquettes[etiquettes]
+            if np.array_equal(sautees, etiquettes):
+                break
+            etiquettes = sautees
+        if np.array_equal(etiquettes, precedentes):
+            return etiquettes
+
+
+def _blocs(normalises, departements):
+    # Bloc de chaque unité : son département et les nombres de son nom.
+    blocs = {}
+    return np.array([blocs.setdefault((departement, ' '.join(mot for mot in nom.split() if mot.isdigit())), len(blocs))
+                     for nom, departement in zip(normalises, departements)], dtype=np.int64)
+
+
+def resoudre(operations):
+    """Identifiant d'entité de chaque opération (-1 sans nom), nom retenu de
+    chaque entité (sa graphie la plus fréquente), nombre de graphies et
+    statistiques."""
+    noms = operations.modalites[COLONNE_NOM].liste()
+    codes_noms = np.asarray(operations[COLONNE_NOM], dtype=np.int64)
+    departements = {}
+    departement_codes = np.array([departements.setdefault(departement(code), len(departements))
+                                  for code in operations.modalites[COLONNE_CODE_POSTAL].liste()] + [departements.setdefault('', len(departements))])
+    departement_lignes = departement_codes[np.asarray(operations[COLONNE_CODE_POSTAL], dtype=np.int64)]
+
+    normalises = {}
+    nom_normalise = np.array([normalises.setdefault(normaliser_nom(nom), len(normalises)) for nom in noms], dtype=np.int64)
+    textes = list(normalises)
+    avec_nom = codes_noms >= 0
+    # Unités : couples (nom normalisé, département du code postal) ; deux
+    # homonymes de départements différents restent distincts.
+    cles, unites_lignes = np.unique(nom_normalise[codes_noms[avec_nom]] * len(departements) + departement_lignes[avec_nom], return_inverse=True)
+    normalise_unites, departement_unites = cles // len(departements), cles % len(departements)
+    blocs = _blocs([textes[nom] for nom in normalise_unites.tolist()], departement_unites.tolist())
+
+    signatures_unites = signatures(textes)[normalise_unites]
+    candidates = paires_candidates(signatures_unites, blocs)
+    similarites = (signatures_unites[candidates[:, 0]] == signatures_unites[candidates[:, 1]]).mean(axis=1)
+    retenues = candidates[similarites >= SEUIL_SIMILARITE]
+    _, entites_unites = np.unique(composantes(len(cles), retenues), return_inverse=True)
+    entites_unites = entites_unites.ravel()
+
+    entites = np.full(len(codes_noms), -1, dtype=np.int32)
+    entites[avec_nom] = entites_unites[unites_lignes.ravel()]
+    nombre = int(entites_unites.max()) + 1 if len(cles) else 0
+    # Graphie la plus fréquente de chaque entité, et nombre de graphies.
+    couples, comptes = np.unique(entites[avec_nom].astype(np.int64) * len(noms) + codes_noms[avec_nom], return_counts=True)
+    entites_couples, noms_couples = couples // len(noms), couples % len(noms)
+    ordre = np.lexsort((-comptes, entites_couples))
+    premiers = ordre[np.r_[True, np.diff(entites_couples[ordre]) != 0]] if len(couples) else ordre
+    retenus = [''] * nombre
+    for entite, code in zip(entites_couples[premiers].tolist(), noms_couples[premiers].tolist()):
+        retenus[entite] = noms[code]
+    graphies = np.bincount(entites_couples, minlength=nombre)
+    statistiques = {'lignes': len(codes_noms), 'noms': len(noms), 'noms_normalises': len(normalises), 'unites': len(cles), 'blocs': int(blocs.max()) + 1 if len(blocs) else 0,
+                    'candidates': len(candidates), 'rapprochees': len(retenues), 'entites': nombre}
+    return entites, retenus, graphies, statistiques
+
+
+def dossier_entites(operations, dossier=DOSSIER_ENTITES):
+    from pipeline import empreintes_colonnes
+
+    empreintes = empreintes_colonnes(operations)
+    cle = hashlib.sha256(json.dumps({
+        'code': empreinte_fichier(os.path.abspath(__file__)),
+        'colonnes': {colonne: empreintes[colonne] for colonne in (COLONNE_NOM, COLONNE_CODE_POSTAL)},
+    }, sort_keys=True).encode()).hexdigest()[:16]
+    return os.path.join(dossier, cle)
+
+
+def construire_entites(operations, destination):
+    debut = time.perf_counter()
+    entites, noms, graphies, statistiques = resoudre(operations)
+    os.makedirs(destination)
+    np.save(os.path.join(destination, 'entites.npy'), entites, allow_pickle=False)
+    np.save(os.path.join(destination, 'graphies.npy'), graphies, allow_pickle=False)
+    ecrire_json(os.path.join(destination, 'noms.json'), noms)
+    ecrire_json(os.path.join(destination, 'index.json'), dict(statistiques, duree=time.perf_counter() - debut))
+
+
+class Entites:
+    """Entité de chaque opération, projetée en mémoire, et nom retenu de
+    chaque entité."""
+
+    def __init__(self, dossier):
+        self.dossier = dossier
+        self.entites = np.load(os.path.join(dossier, 'entites.npy'), mmap_mode='r', allow_pickle=False)
+        self.graphies = np.load(os.path.join(dossier, 'graphies.npy'), allow_pickle=False)
+        self.noms = lire_json(os.path.join(dossier, 'noms.json'))
+        self.statistiques = lire_json(os.path.join(dossier, 'index.json'))
+
+    def beneficiaires(self, operations, lignes=None):
+        """Nombre d'opérations et montant UE de chaque entité parmi les
+        opérations retenues, par montant décroissant."""
+        entites = np.asarray(self.entites if lignes is None else self.entites[lignes])
+        montants = np.nan_to_num(np.asarray(operations[COLONNE_MONTANT] if lignes is None else operations[COLONNE_MONTANT][lignes], dtype=float))
+        retenues = entites >= 0
+        nombres = np.bincount(entites[retenues], minlength=len(self.noms))
+        sommes = np.bincount(entites[retenues], weights=montants[retenues], minlength=len(self.noms))
+        presentes = np.flatnonzero(nombres)
+        return presentes[np.argsort(-sommes[presentes], kind='stable')], nombres, sommes
+
+
+def ouvrir_entites(operations, dossier=DOSSIER_ENTITES):
+    destination = dossier_entites(operations, dossier)
+    if not os.path.exists(os.path.join(destination, 'index.json')):
+        # Dossier provisoire puis renommé, comme le cache des opérations.
+        provisoire = '{}.{}.tmp'.format(destination, os.getpid())
+        shutil.rmtree(provisoire, ignore_errors=True)
+        try:
+            construire_entites(operations, provisoire)
+            os.rename(provisoire, destination)
+        except OSError:
+            if not os.path.exists(os.path.join(destination, 'index.json')):
+                raise
+        finally:
+            shutil.rmtree(provisoire, ignore_errors=True)
+    return Entites(destination)
+
+
+def main():
+    from donnees import operations
+
+    parser = argparse.ArgumentParser(description='Rapproche les graphies des noms de bénéficiaires.')
+    parser.add_argument('--exemples', type=int, default=10, help='nombre d’entités aux graphies multiples affichées')
+    args = parser.parse_args()
+    liste = operations()
+    debut = time.perf_counter()
+    entites = ouvrir_entites(liste)
+    statistiques = entites.statistiques
+    print('{} : {} noms distincts, {} entités ({} paires candidates, {} rapprochées), {:.2f} s'.format(
+        entites.dossier, statistiques['noms'], statistiques['entites'], statistiques['candidates'], statistiques['rapprochees'],
+        time.perf_counter() - debut))
+    codes = np.asarray(liste[COLONNE_NOM])
+    noms = liste.modalites[COLONNE_NOM]
+    for entite in np.argsort(-entites.graphies, kind='stable')[:args.exemples]:
+        if entites.graphies[entite] < 2:
+            break
+        graphies = sorted({noms[code] for code in np.unique(codes[np.asarray(entites.entites) == entite]).tolist()})
+        print(' - {} : {}'.format(entites.noms[entite], ' | '.join(graphies[:8]) + (' …' if len(graphies) > 8 else '')))
+
+
+if __name__ == '__main__':
+    main()
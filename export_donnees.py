@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+
+# Données des graphiques et liste des opérations, téléchargeables en CSV ou
+# en NDJSON (un objet JSON par ligne) :
+#
+#   /donnees/beneficiaires_thematiques.csv   montants par thématique et catégorie de bénéficiaire (graphique 3)
+#   /donnees/paliers.csv                     parts des catégories de bénéficiaires par fonds et palier (section 4)
+#   /donnees/contributions_10m.csv           opérations de plus de 10 M€ par thématique (section 8)
+#   /donnees/instruments_financiers.csv      montants par catégorie d'instrument financier (section 9)
+#   /donnees/profil_mensuel.csv              profil mensuel des montants (section 10)
+#   /donnees/beneficiaires.csv               opérations et montants par bénéficiaire, graphies rapprochées (entites.py)
+#   /donnees/operations.csv                  opérations, toutes colonnes ou ?colonne=…&colonne=…
+#
+# Chaque URL accepte les paramètres de la barre de filtres (region, fonds,
+# categorie, répétables ; debut et fin au format AAAA-MM-JJ) et, pour la
+# liste des opérations, q (mots de l'intitulé ou du bénéficiaire, voir
+# recherche.py). Les réponses sont envoyées par morceaux (transfert
+# « chunked ») au fur et à mesure qu'elles sont produites, bloc de lignes
+# par bloc de lignes à partir des colonnes projetées en mémoire : la liste
+# complète est exportée en mémoire constante. Le corps est compressé à la
+# volée (gzip) si le client l'accepte. L'ETag est calculée sans produire le
+# corps, à partir de la version des données, du code et de la requête.
+
+import csv
+import hashlib
+import io
+import itertools
+import json
+import os
+import zlib
+
+import flask
+import numpy as np
+
+from fichiers import empreinte_fichier
+
+TAILLE_BLOC = 4096
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+# Paramètres de filtrage et argument correspondant de
+# filtres.normaliser_filtres.
+PARAMETRES_FILTRES = {'region': 'regions', 'fonds': 'fonds', 'categorie': 'categories'}
+MODULES_EXPORT = ['agregats.py', 'entites.py', 'export_donnees.py', 'figures.py', 'filtres.py', 'paliers.py', 'profil_mensuel.py', 'recherche.py']
+
+RACINE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _tableau(donnees, index=True):
+    # (colonnes, lignes) d'un DataFrame ou d'une Series, valeurs manquantes à
+    # None.
+    if index:
+        donnees = donnees.reset_index()
+    colonnes = [str(colonne) for colonne in donnees.columns]
+    return colonnes, donnees.astype(object).where(donnees.notna(), None).values.tolist()
+
+
+def _cube(operations, lignes):
+    # Construit seulement pour les tables qui le lisent.
+    from agregats import construire_cube
+
+    return construire_cube(operations, lignes=lignes)
+
+
+def table_beneficiaires_thematiques(operations, lignes):
+    from figures import calculer_pivot
+
+    pivot = calculer_pivot(_cube(operations, lignes))
+    pivot.index = pivot.index.str.replace('<br>', ' ')
+    return _tableau(pivot)
+
+
+def table_paliers(operations, lignes):
+    from figures import calculer_parts_paliers
+    from paliers import PALIERS
+
+    colonnes = ['Fonds', 'Palier', 'catbeneficiaire', 'part']
+
+    def generer():
+        for fonds in ('FEDER', 'FSE'):
+            for palier, parts in zip(PALIERS, calculer_parts_paliers(operations, fonds, lignes)):
+                for categorie, part in parts.items():
+                    yield fonds, palier, categorie, part
+
+    return colonnes, generer()
+
+
+def table_contributions_10m(operations, lignes):
+    from figures import calculer_contributions_10m
+
+    contributions = calculer_contributions_10m(_cube(operations, lignes))
+    contributions['contribution_moyenne'] = contributions['montant'] / contributions['nombre']
+    return _tableau(contributions)
+
+
+def table_instruments_financiers(operations, lignes):
+    from figures import calculer_instruments_financiers
+
+    return _tableau(calculer_instruments_financiers(_cube(operations, lignes)))
+
+
+def table_profil_mensuel(operations, lignes):
+    from profil_mensuel import profil_mensuel
+
+    return _tableau(profil_mensuel(operations, lignes=lignes), index=False)
+
+
+def table_beneficiaires(operations, lignes):
+    from entites import ouvrir_entites
+
+    entites = ouvrir_entites(operations)
+    ordre, nombres, montants = entites.beneficiaires(operations, lignes)
+    colonnes = ['entite', 'Nom du bénéficiaire', 'graphies', 'operations', 'Montant UE programmé']
+    return colonnes, ((int(entite), entites.noms[entite], int(entites.graphies[entite]), int(nombres[entite]), float(montants[entite]))
+                      for entite in ordre.tolist())
+
+
+TABLES = {
+    'beneficiaires_thematiques': table_beneficiaires_thematiques,
+    'paliers': table_paliers,
+    'contributions_10m': table_contributions_10m,
+    'instruments_financiers': table_instruments_financiers,
+    'profil_mensuel': table_profil_mensuel,
+    'beneficiaires': table_beneficiaires,
+}
+
+
+def _valeurs(operations, colonne, selection):
+    # Valeurs Python d'un bloc de la colonne ; les modalités sont décodées
+    # une fois par code présent dans le bloc.
+    valeurs = operations[colonne][selection]
+    if colonne in operations.modalites:
+        # Tampon et décalages vus comme de simples ndarray : découper un
+        # np.memmap coûte plus cher que décoder la modalité.
+        modalites = operations.modalites[colonne]
+        tampon, decalages = np.asarray(modalites.tampon), np.asarray(modalites.decalages)
+        codes, inverses = np.unique(valeurs, return_inverse=True)
+        presents = codes[codes >= 0]
+        decodees = [tampon[debut:fin].tobytes().decode('utf-8') for debut, fin in zip(decalages[presents].tolist(), decalages[presents + 1].tolist())]
+        if len(presents) < len(codes):
+            decodees.insert(0, None)
+        return np.array(decodees, dtype=object)[inverses.ravel()].tolist()
+    if np.issubdtype(valeurs.dtype, np.datetime64):
+        jours = np.datetime_as_string(valeurs, unit='D').tolist()
+        return [None if jour == 'NaT' else jour for jour in jours]
+    if np.issubdtype(valeurs.dtype, np.floating):
+        return [None if valeur != valeur else valeur for valeur in valeurs.tolist()]
+    return valeurs.tolist()
+
+
+def table_operations(operations, lignes, colonnes):
+    def generer():
+        total = len(operations) if lignes is None else len(lignes)
+        for debut in range(0, total, TAILLE_BLOC):
+            selection = slice(debut, min(debut + TAILLE_BLOC, total)) if lignes is None else lignes[debut:debut + TAILLE_BLOC]
+            yield from zip(*(_valeurs(operations, colonne, selection) for colonne in colonnes))
+
+    return colonnes, generer()
+
+
+def morceaux(colonnes, lignes, format):
+    """Corps de la réponse, un morceau (bytes) par bloc de lignes."""
+    lignes = iter(lignes)
+    tampon = io.StringIO()
+    if format == 'csv':
+        ecrivain = csv.writer(tampon, lineterminator='\n')
+        ecrivain.writerow(colonnes)
+    while True:
+        bloc = list(itertools.islice(lignes, TAILLE_BLOC))
+        if not bloc:
+            break
+        if format == 'csv':
+            ecrivain.writerows(bloc)
+        else:
+            tampon.writelines(json.dumps(dict(zip(colonnes, ligne)), ensure_ascii=False, allow_nan=False) + '\n' for ligne in bloc)
+        yield tampon.getvalue().encode('utf-8')
+        tampon.seek(0)
+        tampon.truncate()
+    if tampon.tell():
+        yield tampon.getvalue().encode('utf-8')
+
+
+def compresser(corps):
+    compresseur = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for morceau in corps:
+        compresse = compresseur.compress(morceau) + compresseur.flush(zlib.Z_SYNC_FLUSH)
+        if compresse:
+            yield compresse
+    yield compresseur.flush()
+
+
+class ExportDonnees:
+
+    def __init__(self):
+        # (liste, options des filtres), recalculées si la liste change.
+        self.options = (None, None)
+        self.empreinte_code = hashlib.sha256(''.join(empreinte_fichier(os.path.join(RACINE, module)) for module in MODULES_EXPORT).encode()).hexdigest()
+
+    def lignes(self, operations, arguments, texte=None):
+        # Indices des opérations retenues par les filtres et la recherche,
+        # ou None pour toutes.
+        from filtres import normaliser_filtres, options_filtres, selection
+
+        if self.options[0] is not operations:
+            self.options = operations, options_filtres(operations)
+        parametres = {argument: arguments.getlist(parametre) for parametre, argument in PARAMETRES_FILTRES.items()}
+        # Contrairement aux listes de la barre de filtres, une valeur
+        # inconnue n'est pas ignorée : elle ne retiendrait aucune opération.
+        for parametre, argument in PARAMETRES_FILTRES.items():
+            inconnues = [valeur for valeur in parametres[argument] if valeur not in self.options[1][argument]]
+            if inconnues:
+                flask.abort(400, 'valeurs inconnues pour {} : {}'.format(parametre, ', '.join(inconnues)))
+        for parametre in ('debut', 'fin'):
+            if arguments.get(parametre):
+                try:
+                    np.datetime64(arguments[parametre], 'D')
+                except ValueError:
+                    flask.abort(400, '{} : date invalide, format AAAA-MM-JJ attendu'.format(parametre))
+        filtres = normaliser_filtres(self.options[1], debut=arguments.get('debut'), fin=arguments.get('fin'), **parametres)
+        lignes = selection(operations, filtres)
+        if texte and texte.strip():
+            from recherche import ouvrir_index
+
+            trouvees = ouvrir_index(operations).rechercher(texte)
+            if trouvees is not None:
+                lignes = trouvees if lignes is None else np.intersect1d(lignes, trouvees, assume_unique=True)
+        return lignes
+
+    def etag(self, operations):
+        requete = flask.request
+        cle = json.dumps([operations.dossier, self.empreinte_code, requete.path, sorted(requete.args.items(multi=True))])
+        return hashlib.sha256(cle.encode()).hexdigest()[:32]
+
+    def repondre(self, nom, format):
+        from donnees import operations
+
+        liste = operations()
+        requete = flask.request
+        etag = self.etag(liste)
+        encodage = 'gzip' if requete.accept_encodings['gzip'] else 'identity'
+        etags = {'identity': etag, 'gzip': etag + '-gzip'}
+        if any(requete.if_none_match.contains(valeur) for valeur in etags.values()):
+            reponse = flask.Response(status=304)
+        else:
+            if nom == 'operations':
+                colonnes = requete.args.getlist('colonne') or list(liste.colonnes)
+                inconnues = [colonne for colonne in colonnes if colonne not in liste.colonnes]
+                if inconnues:
+                    flask.abort(400, 'colonnes inconnues : {}'.format(', '.join(inconnues)))
+                colonnes, lignes = table_operations(liste, self.lignes(liste, requete.args, requete.args.get('q')), colonnes)
+            else:
+                colonnes, lignes = TABLES[nom](liste, self.lignes(liste, requete.args))
+            corps = morceaux(colonnes, lignes, format)
+            if encodage == 'gzip':
+                corps = compresser(corps)
+            reponse = flask.Response(flask.stream_with_context(corps), mimetype=FORMATS[format])
+            if format == 'csv':
+                reponse.mimetype_params['charset'] = 'utf-8'
+            reponse.headers['Content-Disposition'] = 'inline; filename="{}.{}"'.format(nom, format)
+            if encodage != 'identity':
+                reponse.headers['Content-Encoding'] = encodage
+        reponse.set_etag(etags[encodage])
+        reponse.vary.add('Accept-Encoding')
+        reponse.cache_control.no_cache = True
+        return reponse
+
+
+def installer(server):
+    export = ExportDonnees()
+    noms = ', '.join(['operations'] + list(TABLES))
+
+    @server.route('/donnees/<any({}):nom>.<any(csv, ndjson):format>'.format(noms))
+    def donnees(nom, format):
+        return export.repondre(nom, format)
+
+    return export
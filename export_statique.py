@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+# Export du rapport complet en site statique : page d'accueil, réponses
+# _dash-layout et _dash-dependencies, scripts des composants et assets.
+# Hormis index.html, chaque fichier est rangé sous un nom ou un dossier
+# contenant l'empreinte de son contenu et peut être mis en cache indéfiniment
+# par un CDN ou nginx.
+#
+#   python export_statique.py [--sortie site] [--base /]
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+
+from dash.fingerprint import check_fingerprint
+
+from filtres import ID_FILTRES
+from recherche import ID_RECHERCHE
+
+DOSSIER_SORTIE = 'site'
+
+
+def empreinte(*contenus):
+    sha = hashlib.sha256()
+    for contenu in contenus:
+        sha.update(contenu)
+    return sha.hexdigest()[:12]
+
+
+def _lire(client, url):
+    reponse = client.get(url)
+    if reponse.status_code != 200:
+        raise RuntimeError('{} : statut {}'.format(url, reponse.status_code))
+    return reponse.get_data()
+
+
+def _ecrire(chemin, contenu):
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    with open(chemin, 'wb') as fichier:
+        fichier.write(contenu)
+
+
+def _retirer(noeud, identifiants):
+    if isinstance(noeud, list):
+        return [_retirer(element, identifiants) for element in noeud if not (isinstance(element, dict) and element.get('props', {}).get('id') in identifiants)]
+    if isinstance(noeud, dict) and 'props' in noeud:
+        noeud['props'] = {cle: _retirer(valeur, identifiants) if cle == 'children' else valeur for cle, valeur in noeud['props'].items()}
+    return noeud
+
+
+def exporter(app, sortie=DOSSIER_SORTIE, base='/'):
+    client = app.server.test_client()
+    page = _lire(client, '/').decode('utf-8')
+    correspondances = {}
+
+    # Les scripts d'un même paquet restent groupés dans un dossier : les
+    # morceaux chargés à la demande (async-graph.js…) sont résolus par
+    # webpack relativement au script principal.
+    for espace, chemins in app.registered_paths.items():
+        fichiers = {chemin: _lire(client, '/_dash-component-suites/{}/{}'.format(espace, chemin))
+                    for chemin in sorted(chemins) if not chemin.endswith('.map')}
+        dossier = '{}.{}'.format(espace, empreinte(*(chemin.encode() + contenu for chemin, contenu in fichiers.items())))
+        for chemin, contenu in fichiers.items():
+            _ecrire(os.path.join(sortie, 'static', dossier, chemin), contenu)
+        correspondances[espace] = dossier
+
+    def remplacer(correspondance):
+        attribut, url = correspondance.group(1), correspondance.group(2)
+        chemin = url.split('?')[0]
+        if chemin.startswith('/_dash-component-suites/'):
+            espace, fichier = chemin[len('/_dash-component-suites/'):].split('/', 1)
+            fichier, _ = check_fingerprint(fichier)
+            nouvelle = 'static/{}/{}'.format(correspondances[espace], fichier)
+        else:
+            contenu = _lire(client, url)
+            racine, extension = os.path.splitext(os.path.basename(chemin))
+            nouvelle = 'static/{}.{}{}'.format(racine.lstrip('_'), empreinte(contenu), extension)
+            _ecrire(os.path.join(sortie, nouvelle), contenu)
+        return '{}="{}{}"'.format(attribut, base, nouvelle)
+
+    page = re.sub(r'(src|href)="(/[^"]*)"', remplacer, page)
+
+    # Réponses de l'application : le renderer les demande à
+    # {requests_pathname_prefix}_dash-layout, d'où un dossier versionné.
+    # Sans serveur, les callbacks ne peuvent pas répondre : la barre de
+    # filtres et la recherche (facettes, pages et tris de la liste) sont
+    # retirées, les graphiques gardent les totaux nationaux.
+    layout = json.dumps(_retirer(json.loads(_lire(client, '/_dash-layout')), {ID_FILTRES, ID_RECHERCHE})).encode('utf-8')
+    dependances = b'[]'
+    dossier_donnees = 'donnees.{}'.format(empreinte(layout, dependances))
+    _ecrire(os.path.join(sortie, dossier_donnees, '_dash-layout'), layout)
+    _ecrire(os.path.join(sortie, dossier_donnees, '_dash-dependencies'), dependances)
+
+    def configurer(correspondance):
+        config = json.loads(correspondance.group(2))
+        config['requests_pathname_prefix'] = base + dossier_donnees + '/'
+        config['url_base_pathname'] = None
+        return correspondance.group(1) + json.dumps(config) + correspondance.group(3)
+
+    page = re.sub(r'(<script id="_dash-config" type="application/json">)(.*?)(</script>)', configurer, page, flags=re.S)
+    _ecrire(os.path.join(sortie, 'index.html'), page.encode('utf-8'))
+    return os.path.join(sortie, 'index.html')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exporte le rapport en site statique.')
+    parser.add_argument('--sortie', default=DOSSIER_SORTIE)
+    parser.add_argument('--base', default='/', help='chemin public sous lequel le site est servi')
+    args = parser.parse_args()
+    base = args.base if args.base.endswith('/') else args.base + '/'
+
+    # Sans serveur, les figures différées ne seraient jamais chargées.
+    os.environ['FIGURES_DIFFEREES'] = '0'
+    from app import app
+
+    shutil.rmtree(args.sortie, ignore_errors=True)
+    print('Site statique écrit dans', exporter(app, args.sortie, base))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+# Utilitaires de fichiers sans dépendance à pandas, partagés par le cache des
+# opérations et les artefacts précalculés.
+
+import hashlib
+import json
+import os
+import threading
+
+FICHIER_OPERATIONS = 'france-2014-2020-feder-fse.csv'
+# Un CSV par liste d'opérations publiée ; remplace FICHIER_OPERATIONS s'il
+# existe.
+DOSSIER_SOURCES = 'sources'
+
+
+def empreinte_fichier(chemin):
+    sha = hashlib.sha256()
+    with open(chemin, 'rb') as fichier:
+        for bloc in iter(lambda: fichier.read(1 << 20), b''):
+            sha.update(bloc)
+    return sha.hexdigest()
+
+
+def ecrire_json(chemin, contenu):
+    # Fichier provisoire propre au processus et au thread.
+    provisoire = '{}.{}.{}.tmp'.format(chemin, os.getpid(), threading.get_ident())
+    with open(provisoire, 'w', encoding='utf-8') as fichier:
+        json.dump(contenu, fichier, ensure_ascii=False)
+    os.replace(provisoire, chemin)
+
+
+def lire_json(chemin):
+    try:
+        with open(chemin, encoding='utf-8') as fichier:
+            return json.load(fichier)
+    except (OSError, ValueError):
+        return None
+
+
+def empreinte_source(chemin, chemin_index):
+    # Taille et date de modification évitent de recalculer l'empreinte d'un
+    # fichier inchangé à chaque démarrage.
+    statut = os.stat(chemin)
+    index = lire_json(chemin_index) or {}
+    source = index.get(os.path.abspath(chemin))
+    if source and source['taille'] == statut.st_size and source['mtime_ns'] == statut.st_mtime_ns:
+        return source['empreinte']
+    empreinte = empreinte_fichier(chemin)
+    try:
+        os.makedirs(os.path.dirname(chemin_index) or '.', exist_ok=True)
+        index[os.path.abspath(chemin)] = {'taille': statut.st_size, 'mtime_ns': statut.st_mtime_ns, 'empreinte': empreinte}
+        ecrire_json(chemin_index, index)
+    except OSError:
+        pass
+    return empreinte
+
+
+def fichiers_sources():
+    if os.path.isdir(DOSSIER_SOURCES):
+        return sorted(os.path.join(DOSSIER_SOURCES, nom) for nom in os.listdir(DOSSIER_SOURCES) if nom.endswith('.csv'))
+    return [FICHIER_OPERATIONS]
@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from agregats import construire_cube
+from geometrie import contours_regions
+from instrumentation import phase
+from lorenz import courbe_lorenz
+from paliers import PALIERS, paliers
+from pipeline import executer
+from profil_mensuel import profil_mensuel
+from taches import TACHES_PARALLELES, executer_taches
+
+# Répartition publiée des cofinancements FEDER à l'investissement des
+# entreprises (graphique 5) : elle repose sur un classement manuel des
+# opérations, absent des données, et reste donc saisie dans ce tableau.
+FICHIER_INVESTISSEMENTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'investissements-entreprises.csv')
+
+graph_fontstyle = dict(family="Arial, sans-serif",
+                        size=14)
+
+ordre_themeprojet = ['Indéterminé', 'Insertion', 'Emploi', 'Formation', 'Subventions de fonctionnement des entreprises<br>(compensation de surcoûts)', 'Financement des entreprises', 'Investissements des entreprises', 'Recherche et innovation', 'Haut débit et très haut débit', 'Transport', 'Logement', 'Énergie', 'Environnement', 'Infrastructures sportives, culturelles et éducatives', 'Gestion administrative<br>(assistance technique)']
+ordre_catbeneficiaires = ['Associations', 'Autres établissements publics', "Chambres consulaires et groupements d'entreprises", 'Communes', 'Départements', 'Entreprises', 'Formation continue et enseignement hors supérieur', 'État', 'Logement social', 'Missions locales emploi et insertion', "Organismes de soutien à l'entrepreneuriat", 'Régions', "Établissements de recherche et d'enseignement supérieur", 'Bénéficiaires de type indéterminé']
+
+couleurs_catbeneficiaires = ['#aa8f00', 'LightSteelBlue', '#802200', '#3455db', '#0000e0', '#ff4500', '#b659ac', '#000060', '#28a228', '#af851a', '#553529', '#00008b',  '#9370db', '#939393']
+
+# Couleurs du graphique 8, par thématique : elles ne changent pas quand les
+# filtres retirent une thématique.
+couleurs_themeprojet = {
+    'Emploi': '#aa8f00', 'Environnement': '#28a228', 'Financement des entreprises': '#b659ac', 'Formation': '#2e343b',
+    'Haut débit et très haut débit': '#0000e0', 'Infrastructures sportives, culturelles et éducatives': '#00a4a6',
+    'Investissements des entreprises': '#726012', 'Recherche et innovation': '#9370db', 'Transport': '#e73c4e', 'Énergie': '#ff4500',
+    'Insertion': '#af851a', 'Logement': '#000060', 'Subventions de fonctionnement des entreprises<br>(compensation de surcoûts)': '#802200',
+    'Gestion administrative<br>(assistance technique)': '#553529', 'Indéterminé': '#939393',
+}
+
+couleurs_groupes_beneficiaires = ['#00008b', '#0000e0', '#3455db', '#ff4500', '#9370db', '#b8860b', 'LightSteelBlue', '#939393']
+
+# Classes de l'indice de concentration (borne supérieure, libellé, couleur).
+classes_concentration = [(1500, 'moins de 1500 : faible', '#D3ECFD'), (2000, '1500-2000 : plutôt faible', '#B9E6FF'),
+                         (2500, '2000-2500 : plutôt élevé', '#A29FFF'), (float('inf'), '2500 et plus : élevé', '#A09FD2')]
+
+categories_duree = ['moins d’un an', 'entre un et deux ans', 'entre deux et trois ans', 'plus de trois ans']
+palette_bleus = ['blue', 'cornflowerblue', 'SkyBlue', 'LightSteelBlue']
+
+
+def calculer_pivot(cube):
+    data_pivot = cube.tableau('Montant UE programmé', 'themeprojet', 'catbeneficiaire')
+    return data_pivot.reindex(index=ordre_themeprojet, columns=ordre_catbeneficiaires)
+
+
+def calculer_courbes_lorenz(operations):
+    montants = operations['Montant UE programmé']
+    return {fonds: courbe_lorenz(montants[operations.masque('Fonds', fonds)]) for fonds in ('FEDER', 'FSE')}
+
+
+def figure_repartition_montants(courbes):
+    feder_normalises, montants_feder_normalises, _ = courbes['FEDER']
+    fse_normalises, montants_fse_normalises, _ = courbes['FSE']
+
+    fig1 = go.Figure()
+    fig1.add_trace(go.Scatter(x=feder_normalises, y=montants_feder_normalises, name='FEDER', hoverinfo='none', line=dict(color="#0f4f75")))
+    fig1.add_trace(go.Scatter(x=fse_normalises, y=montants_fse_normalises, name='FSE', hoverinfo='none', line=dict(color="#00b1f3")))
+    fig1.update_layout(xaxis = dict(
+                                    title_text = "Nombre d'opérations",
+                                    tickmode = 'array',
+                                    tickvals = np.arange(0.1, 1, 0.1),
+                                    tickformat = '%'
+                                    ),
+                        yaxis = dict(
+                                    title_text = 'Montants UE programmés',
+                                    tickmode = 'array',
+                                    tickvals = np.arange(0.1, 1, 0.1),
+                                    tickformat = '%'
+                                    ),
+                        margin = dict(l=0, r=0, t=0, b=70),
+                        legend = dict(orientation="h", yanchor="top", y=1, xanchor="left", x=0.25),
+                        dragmode=False
+                        )
+    return fig1
+
+
+def figure_beneficiaires_thematiques(data_pivot):
+    data_pivot_sansindetermine = data_pivot.drop(index=['Indéterminé'])
+
+    fig2 = go.Figure(layout = dict(
+                                   polar = dict(
+                                       radialaxis = dict(
+                                           visible = True,
+                                           showticklabels = True,
+                                           tickvals = [500000000, 1000000000, 1500000000],
+                                           ticktext = ['500 mln €', '1 md €', '1,5 md €']
+                                       ),
+                                       angularaxis = dict(
+                                           tickmode = "array",
+                                           tickvals = [x*(360/len(data_pivot_sansindetermine.index)) for x in range(0, len(data_pivot_sansindetermine.index))],
+                                           ticktext = data_pivot_sansindetermine.index
+                                       )),
+                                   showlegend = True,
+                                   autosize = True
+                                   ))
+
+    for i, catbeneficiaire in enumerate(data_pivot_sansindetermine.columns):
+        fig2.add_trace(go.Barpolar(r=data_pivot_sansindetermine[catbeneficiaire],
+                                   name=catbeneficiaire,
+                                   hoverinfo="text",
+                                   hovertext=catbeneficiaire,
+                                   marker_color=couleurs_catbeneficiaires[i]
+                                  )
+                      )
+
+    fig2.update_layout(margin = dict(l=0, r=0, t=50, b=0),
+                       legend = dict(orientation="h", x=0.15, yanchor='bottom', y=-0.8, font=dict(size=12)), font=graph_fontstyle)
+    return fig2
+
+
+def calculer_parts_paliers(operations, fonds, lignes=None, cle=None):
+    # Paliers recalculés parmi les opérations retenues (paliers.py), non lus
+    # dans la colonne Palier.
+    classes = paliers(operations).classer(lignes, cle)
+    codes_fonds = operations['Fonds'] if lignes is None else operations['Fonds'][lignes]
+    categories = np.asarray(operations['catbeneficiaire'] if lignes is None else operations['catbeneficiaire'][lignes])
+    modalites = operations.modalites['catbeneficiaire'].liste()
+    # Les catégories manquantes sont comptées dans la dernière case (None).
+    categories = np.where(categories < 0, len(modalites), categories)
+    du_fonds = codes_fonds == operations.modalites['Fonds'].code(fonds)
+    parts = []
+    for palier in range(len(PALIERS)):
+        nombres = np.bincount(categories[du_fonds & (classes == palier)], minlength=len(modalites) + 1)
+        nombres = pd.Series(nombres, index=pd.Index(modalites + [None], name='catbeneficiaire'), name='nombre').drop('Bénéficiaires de type indéterminé', errors='ignore')
+        parts.append((nombres / nombres.sum()).loc[lambda parts: parts > 0].sort_index())
+    return parts
+
+
+def figure_paliers(data_p1, data_p2):
+    fig4 = go.Figure(data=[
+        go.Bar(name='Proportion des projets « courants »', orientation='h', x=data_p1, y=data_p1.index, hoverinfo='none', marker_color="#0f4f75"),
+        go.Bar(name='Proportion des projets « d’ampleur »', orientation='h', x=data_p2, y=data_p2.index, hoverinfo='none', marker_color="#00b1f3")
+    ])
+    fig4.update_layout(barmode = 'stack',
+                       xaxis = dict(tickformat='%'),
+                       margin = dict(l=0, r=0, t=10, b=40),
+                       legend = dict(orientation="h", yanchor="bottom", y=-0.2, xanchor="right", x=0.78),
+                       dragmode = False)
+    return fig4
+
+
+def figure_usages_fonds(data_pivot):
+    fig5 = go.Figure(layout = dict(
+                                   polar = dict(
+                                       radialaxis = dict(
+                                           visible = True,
+                                           showticklabels=True,
+                                           # range = [0, 1],
+                                           tickvals = [0.25, 0.5, 0.75],
+                                           ticktext = ['25 %', '50 %', '75 %']
+                                       ),
+                                       angularaxis = dict(
+                                           tickmode = "array",
+                                           tickvals = [x*(360/len(data_pivot.index)) for x in range(0, len(data_pivot.index))],
+                                           ticktext = data_pivot.index
+                                       )),
+                                   showlegend = False,
+                                   autosize=True
+                                   ))
+
+    fig5.add_trace(go.Barpolar(base="stack", opacity=0.6, marker_color="#57575F", hoverinfo="none"))
+    fig5.add_trace(go.Barpolar(base="stack", opacity=0.6, marker_color="#CA3542", hoverinfo="none"))
+
+    buttons1 = [dict(method = "restyle",
+                     args = [{'r': [data_pivot[catbeneficiaire] / data_pivot[catbeneficiaire].sum()]}, 0],
+                     label = catbeneficiaire) for catbeneficiaire in data_pivot.columns]
+
+    buttons2 = [dict(method = "restyle",
+                     args = [{'r': [data_pivot[catbeneficiaire] / data_pivot[catbeneficiaire].sum()]}, 1],
+                     label = catbeneficiaire) for catbeneficiaire in data_pivot.columns]
+
+    fig5.update_layout(updatemenus=[dict(active=-1, buttons=buttons1, xanchor="left", x=-0.05, yanchor="top", y=1.39, bgcolor="#d4d4d7"),
+                                    dict(active=-1, buttons=buttons2, xanchor="right", x=1.05, yanchor="top", y=1.39, bgcolor="#f1cccf")],
+                       margin=dict(l=50, r=50, t=150, b=50),
+                       dragmode=False,
+                       font=graph_fontstyle
+                      )
+    return fig5
+
+
+def lire_investissements_entreprises(chemin=FICHIER_INVESTISSEMENTS):
+    table = pd.read_csv(chemin)
+    return {'types': table['type'].tolist(), 'montants': table['montant'].tolist()}
+
+
+def figure_investissement_entreprises(investissements):
+    fig5_entreprises = go.Figure(data=[go.Pie(labels=investissements['types'], values=investissements['montants'], hole=0.6, hoverinfo = "none")])
+    fig5_entreprises.update_traces(texttemplate='%{percent:.0%f}')
+    fig5_entreprises.update_layout(title_text='Répartition des cofinancements FEDER pour l’investissement des entreprises',
+                                   margin=dict(l=0, r=0, t=20, b=60),
+                                   legend=dict(itemclick=False, itemdoubleclick=False, yanchor='middle', y=0.5, x=0.75),
+                                   title_font_size=12,
+                                   title_y=0.05,
+                                   title_x=0.42
+                                   )
+    return fig5_entreprises
+
+
+def figure_beneficiaires_catregion(repartition):
+    fig6 = go.Figure()
+    for (groupe, parts), couleur in zip(repartition['groupes'].items(), couleurs_groupes_beneficiaires):
+        fig6.add_trace(go.Bar(y=repartition['categories'], x=parts, name=groupe, orientation='h', hoverinfo = "none", marker_color=couleur))
+    fig6.update_layout(barmode='stack',
+                       xaxis = dict(ticksuffix=' %'),
+                       margin=dict(t=20, b=20),
+                       legend=dict(orientation="h"),
+                       dragmode=False)
+    return fig6
+
+
+def figure_concentration_regions(concentration, contours):
+    # Carte des régions coloriées selon la classe de leur indice.
+    fig7 = go.Figure()
+    legendes = set()
+    for region, indice in sorted(zip(concentration['regions'], concentration['indices']), key=lambda couple: couple[1]):
+        _, libelle, couleur = next(classe for classe in classes_concentration if indice < classe[0])
+        options = dict(name=libelle, legendgroup=libelle, showlegend=libelle not in legendes,
+                       text='{}<br>IHH : {}'.format(region, indice), hoverinfo='text')
+        legendes.add(libelle)
+        for i, (longitudes, latitudes) in enumerate(contours.get(region, [])):
+            # Projection équirectangulaire centrée sur la métropole.
+            fig7.add_trace(go.Scatter(x=np.round(np.asarray(longitudes) * np.cos(np.radians(46.5)), 3), y=latitudes, mode='lines', fill='toself',
+                                      fillcolor=couleur, line=dict(color='white', width=1), hoveron='fills',
+                                      **dict(options, showlegend=options['showlegend'] and i == 0)))
+    fig7.update_layout(height=400,
+                       xaxis=dict(visible=False),
+                       yaxis=dict(visible=False, scaleanchor='x'),
+                       plot_bgcolor='rgba(0,0,0,0)',
+                       margin=dict(l=0, r=0, t=10, b=10),
+                       legend=dict(title_text='Indice de concentration IHH', traceorder='normal', itemclick=False, itemdoubleclick=False),
+                       dragmode=False)
+    return fig7
+
+
+def calculer_contributions_10m(cube):
+    # Nombre d'opérations de plus de 10 M€ hors instruments financiers,
+    # montants UE et dépenses éligibles, par thématique.
+    filtres = {'Instrument financier ?': False, 'Plus de 10 M€': True}
+    nombres = cube.serie('nombre', 'themeprojet', filtres)
+    retenues = (nombres > 0) & nombres.index.notna()
+    return pd.DataFrame({
+        'nombre': nombres[retenues],
+        'montant': cube.serie('Montant UE programmé', 'themeprojet', filtres)[retenues],
+        'depenses_eligibles': cube.serie('Total des dépenses éligibles', 'themeprojet', filtres)[retenues],
+    })
+
+
+def figure_contributions_10m(cube):
+    contributions = calculer_contributions_10m(cube)
+    nombres, montants, depenses_eligibles = contributions['nombre'], contributions['montant'], contributions['depenses_eligibles']
+    fig8 = go.Figure(data=[go.Scatter(
+        x = (montants / nombres),
+        y = nombres,
+        text = list(nombres.index),
+        marker_size = depenses_eligibles,
+        marker_color = [couleurs_themeprojet.get(theme, '#939393') for theme in nombres.index]
+    )])
+    sizeref = 2.*max(depenses_eligibles, default=1)/(100**2)
+    fig8.update_traces(mode='markers',
+                       marker=dict(sizemode='area', sizeref=sizeref, line_width=2),
+                       hoverinfo='text')
+    fig8.update_layout(margin=dict(t=20, b=20),
+                       xaxis=dict(title='Contribution UE par opération'),
+                       yaxis=dict(title='Nombre d’opérations'),
+                       dragmode=False)
+    return fig8
+
+
+def calculer_instruments_financiers(cube):
+    filtres = {'Instrument financier ?': True}
+    nombres = cube.serie('nombre', "Catégorie d'instrument financier", filtres)
+    return cube.serie('Montant UE programmé', "Catégorie d'instrument financier", filtres)[(nombres > 0) & nombres.index.notna()]
+
+
+def figure_instruments_financiers(cube):
+    inst_financiers = calculer_instruments_financiers(cube)
+    fig9 = go.Figure(data=[go.Pie(labels=inst_financiers.index, values=inst_financiers, hole=0.6, hoverinfo = "none")])
+    fig9.update_traces(texttemplate='%{percent:.0%f}')
+    fig9.update_layout(title_text="Allocations aux différentes catégories d’instruments financiers",
+                       title_font_size=12,
+                       title_y=0.05,
+                       margin=dict(t=20),
+                       legend=dict(orientation="h", itemclick=False, itemdoubleclick=False, yanchor="bottom"))
+    return fig9
+
+
+def figure_montants_mois(data_montants_mois):
+    fig10a = go.Figure()
+    fig10a.add_trace(go.Scatter(x=data_montants_mois.iloc[:,0], y=(data_montants_mois['FEDER_normalise'] * 100), mode='lines', name='FEDER', hoverinfo='none', line=dict(color="#0f4f75")))
+    fig10a.add_trace(go.Scatter(x=data_montants_mois.iloc[:,0], y=(data_montants_mois['FSE_normalise'] * 100), mode='lines', name='FSE', hoverinfo='none', line=dict(color="#00b1f3")))
+    fig10a.update_layout(margin=dict(t=10, b=10),
+                         legend=dict(xanchor="right", x=1, yanchor="bottom", y=0),
+                         dragmode=False)
+    return fig10a
+
+
+def figure_lancement_annees(demarrages, en_cours):
+    fig10b = go.Figure()
+    fig10b.add_trace(go.Bar(x=demarrages['annees'], y=demarrages['demarrages'], name='Démarrages', hoverinfo='none', marker_color='#d4d4d7'))
+    for serie, categorie, couleur in zip(en_cours['series'], categories_duree, palette_bleus):
+        fig10b.add_trace(go.Scatter(x=en_cours['annees'], y=serie, mode='lines', name=categorie, hoverinfo='none', line=dict(color=couleur)))
+    fig10b.update_layout(margin=dict(t=10, b=90),
+                         dragmode=False,
+                         legend=dict(orientation="h", yanchor="bottom", y=-0.2, xanchor="center", x=0.5))
+    return fig10b
+
+
+def figure_distribution_durees(fonds, durees):
+    return go.Figure(go.Treemap(
+        labels = categories_duree,
+        parents = [fonds, fonds, fonds, fonds],
+        values = durees['nombres'],
+        text = durees['parts'],
+        textposition = "middle center",
+        sort = False,
+        hoverinfo = "none",
+        marker_colors = palette_bleus
+        ),
+                     layout=dict(font=graph_fontstyle, margin=dict(l=0, r=0, t=0, b=20))
+        )
+
+
+def taches_figures(operations, cube=None):
+    # Tâches {nom: (dépendances, fonction)} des agrégats et des figures (voir
+    # taches.py). cube : agrégats déjà tenus à jour (ingestion par
+    # partition), sinon calculés ici.
+    def etape(nom):
+        return (), lambda: executer(operations, nom)
+
+    return {
+        'cube': ((), lambda: construire_cube(operations) if cube is None else cube),
+        'lorenz': ((), lambda: calculer_courbes_lorenz(operations)),
+        'pivot': (('cube',), calculer_pivot),
+        'paliers_feder': ((), lambda: calculer_parts_paliers(operations, 'FEDER')),
+        'paliers_fse': ((), lambda: calculer_parts_paliers(operations, 'FSE')),
+        'profil_mensuel': ((), lambda: profil_mensuel(operations)),
+        'durees': etape('durees_par_fonds'),
+        'investissement_entreprises': ((), lire_investissements_entreprises),
+        'categories_region': etape('repartition_categories_region'),
+        'concentration_regions': etape('concentration_regions'),
+        'demarrages': etape('demarrages_par_annee'),
+        'en_cours': etape('operations_en_cours'),
+        'geometrie': ((), contours_regions),
+
+        'fig1': (('lorenz',), figure_repartition_montants),
+        'fig2': (('pivot',), figure_beneficiaires_thematiques),
+        'fig4a': (('paliers_feder',), lambda parts: figure_paliers(*parts)),
+        'fig4b': (('paliers_fse',), lambda parts: figure_paliers(*parts)),
+        'fig5': (('pivot',), figure_usages_fonds),
+        'fig5_entreprises': (('investissement_entreprises',), figure_investissement_entreprises),
+        'fig6': (('categories_region',), figure_beneficiaires_catregion),
+        'fig7': (('concentration_regions', 'geometrie'), figure_concentration_regions),
+        'fig8': (('cube',), figure_contributions_10m),
+        'fig9': (('cube',), figure_instruments_financiers),
+        'fig10a': (('profil_mensuel',), figure_montants_mois),
+        'fig10b': (('demarrages', 'en_cours'), figure_lancement_annees),
+        'fig10c': (('durees',), lambda durees: figure_distribution_durees('FSE', durees['FSE'])),
+        'fig10d': (('durees',), lambda durees: figure_distribution_durees('FEDER', durees['FEDER'])),
+    }
+
+
+def construire_figures(operations, cube=None, paralleles=TACHES_PARALLELES):
+    taches = taches_figures(operations, cube)
+    with phase('figures'):
+        resultats, _ = executer_taches(taches, paralleles)
+    return {nom: resultats[nom] for nom in taches if nom.startswith('fig')}
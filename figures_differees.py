@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+# Figures différées (FIGURES_DIFFEREES=1) : la mise en page initiale ne
+# contient que des graphiques vides, de même hauteur que les figures. Chaque
+# graphique est suivi d'un élément caché (« sentinelle ») ; quand le
+# graphique approche de la zone visible, assets/differe.js clique sur sa
+# sentinelle et le callback correspondant renvoie la figure, lue dans les
+# artefacts une fois par processus et par version servie.
+
+from dash.dependencies import Input, Output
+
+from artefacts import charger_figure, version_courante
+from mise_en_page import GRAPHIQUES
+
+PREFIXE_SENTINELLE = 'differe-'
+
+# (version, {nom: figure}) : remplacé en bloc quand la version change.
+_figures = (None, {})
+
+
+def figure(nom):
+    global _figures
+    version = version_courante()
+    if _figures[0] != version:
+        _figures = (version, {})
+    figures = _figures[1]
+    if nom not in figures:
+        figures[nom] = charger_figure(nom, version=version)
+    return figures[nom]
+
+
+def _substitut(figure):
+    # Figure vide conservant les dimensions et les marges de l'originale.
+    mise_en_page = {cle: valeur for cle, valeur in figure.get('layout', {}).items() if cle in ('height', 'width', 'margin', 'autosize')}
+    mise_en_page.update(xaxis={'visible': False}, yaxis={'visible': False})
+    return {'data': [], 'layout': mise_en_page}
+
+
+def _sentinelle(identifiant):
+    return {'type': 'Div', 'namespace': 'dash_html_components',
+            'props': {'id': PREFIXE_SENTINELLE + identifiant, 'style': {'display': 'none'}}}
+
+
+def _graphique(noeud):
+    # Identifiant du dcc.Graph à différer, ou None.
+    if isinstance(noeud, dict) and noeud.get('type') == 'Graph':
+        identifiant = noeud.get('props', {}).get('id')
+        if identifiant in GRAPHIQUES:
+            return identifiant
+    return None
+
+
+def differer(noeud):
+    """Mise en page JSON dont les figures sont remplacées par des substituts."""
+    if isinstance(noeud, list):
+        resultat = []
+        for element in noeud:
+            resultat.append(differer(element))
+            if _graphique(element):
+                resultat.append(_sentinelle(_graphique(element)))
+        return resultat
+    if not isinstance(noeud, dict) or 'props' not in noeud:
+        return noeud
+    props = dict(noeud['props'])
+    if _graphique(noeud):
+        props['figure'] = _substitut(props.get('figure') or {})
+    if 'children' in props:
+        enfants = props['children']
+        # Un graphique enfant unique devient une liste pour loger sa sentinelle.
+        props['children'] = differer([enfants] if _graphique(enfants) else enfants)
+    return dict(noeud, props=props)
+
+
+def enregistrer(app, exclus=()):
+    # exclus : graphiques dont la figure est déjà renvoyée par un autre
+    # callback (filtres), Dash n'acceptant qu'un callback par sortie.
+    for identifiant, nom in GRAPHIQUES.items():
+        if identifiant in exclus:
+            continue
+
+        def charger(n_clicks, nom=nom):
+            return figure(nom)
+
+        app.callback(Output(identifiant, 'figure'), [Input(PREFIXE_SENTINELLE + identifiant, 'n_clicks')],
+                     prevent_initial_call=True)(charger)
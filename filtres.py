@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+# Filtres interactifs (région, fonds, catégorie de région, période de début
+# des opérations) appliqués aux graphiques des sections 3, 4 et 8. Chaque
+# combinaison de filtres, une fois normalisée, n'est calculée qu'une fois :
+# les figures sont ensuite relues dans le cache partagé par les workers.
+
+import hashlib
+import json
+
+import numpy as np
+from dash.dependencies import Input, Output
+from flask import jsonify
+
+from artefacts import version_courante
+from cache_resultats import CacheMesure, ouvrir_cache
+
+ID_FILTRES = 'filtres'
+COLONNE_DATE = "Date de début de l'opération"
+COLONNES_FILTRES = {
+    'regions': "Région de l'opération",
+    'fonds': 'Fonds',
+    'categories': 'Catégorie de région',
+}
+GRAPHIQUES_FILTRES = ['apport_beneficiaires_thematiques', 'paliers_operations_feder', 'paliers_operations_fse', 'contributions_10m']
+
+
+def options_filtres(operations):
+    dates = np.asarray(operations[COLONNE_DATE])
+    dates = dates[~np.isnat(dates)]
+    options = {nom: operations.modalites[colonne].liste() for nom, colonne in COLONNES_FILTRES.items()}
+    options['debut'] = str(dates.min().astype('datetime64[D]'))
+    options['fin'] = str(dates.max().astype('datetime64[D]'))
+    return options
+
+
+def normaliser_filtres(options, regions=None, fonds=None, categories=None, debut=None, fin=None):
+    # Deux sélections équivalentes (ordre différent, toutes les modalités
+    # cochées, période couvrant toutes les dates…) donnent le même tuple, donc
+    # la même entrée du cache.
+    def modalites(nom, valeurs):
+        retenues = sorted(set(valeurs or []) & set(options[nom]))
+        return tuple(retenues) if len(retenues) < len(options[nom]) else ()
+
+    debut = debut[:10] if debut and debut[:10] > options['debut'] else None
+    fin = fin[:10] if fin and fin[:10] < options['fin'] else None
+    return (modalites('regions', regions), modalites('fonds', fonds), modalites('categories', categories), debut, fin)
+
+
+def selection(operations, filtres):
+    # Indices des opérations retenues, ou None si aucun filtre n'est actif.
+    regions, fonds, categories, debut, fin = filtres
+    if not any(filtres):
+        return None
+    masque = np.ones(len(operations), dtype=bool)
+    for nom, valeurs in zip(COLONNES_FILTRES, (regions, fonds, categories)):
+        if valeurs:
+            colonne = COLONNES_FILTRES[nom]
+            masque &= np.isin(operations[colonne], [operations.modalites[colonne].code(valeur) for valeur in valeurs])
+    if debut:
+        masque &= operations[COLONNE_DATE] >= np.datetime64(debut)
+    if fin:
+        masque &= operations[COLONNE_DATE] <= np.datetime64(fin)
+    return np.flatnonzero(masque)
+
+
+def calculer_figures_filtrees(operations, filtres):
+    # Importés ici : l'application démarre sans pandas ni plotly.graph_objects
+    # tant qu'aucun filtre n'est demandé.
+    from plotly.utils import PlotlyJSONEncoder
+
+    from agregats import construire_cube
+    from figures import calculer_parts_paliers, calculer_pivot, figure_beneficiaires_thematiques, figure_contributions_10m, figure_paliers
+    from serialisation import compacter_figure
+
+    lignes = selection(operations, filtres)
+    cube = construire_cube(operations, lignes=lignes)
+    # Seuils des paliers recalculés parmi les opérations filtrées, conservés
+    # par filtre.
+    cle = json.dumps(filtres)
+    fig2 = figure_beneficiaires_thematiques(calculer_pivot(cube))
+    if any(filtres):
+        # Les graduations fixes (500 M€, 1 Md€…) sont celles des totaux
+        # nationaux.
+        fig2.update_layout(polar_radialaxis=dict(tickvals=None, ticktext=None, ticksuffix='\xa0€'))
+    figures = [
+        fig2,
+        figure_paliers(*calculer_parts_paliers(operations, 'FEDER', lignes, cle)),
+        figure_paliers(*calculer_parts_paliers(operations, 'FSE', lignes, cle)),
+        figure_contributions_10m(cube),
+    ]
+    # Les thèmes sont ceux déjà insérés dans la page (même empreinte).
+    return [compacter_figure(figure, {}) for figure in json.loads(json.dumps(figures, cls=PlotlyJSONEncoder))]
+
+
+def _espace_cache():
+    return version_courante() or 'inconnue'
+
+
+def enregistrer(app, differe=False):
+    # differe : les graphiques filtrés reçoivent aussi leur première figure
+    # de ce callback, déclenché par leur sentinelle (figures_differees.py).
+    from figures_differees import PREFIXE_SENTINELLE, figure
+    from mise_en_page import GRAPHIQUES
+
+    espace = _espace_cache()
+    cache = CacheMesure(ouvrir_cache(espace))
+    # Options des filtres de la liste courante ; toutes deux changent avec
+    # la version servie (rechargement.py).
+    etat = {'espace': espace, 'options': (None, None)}
+    sentinelles = [Input(PREFIXE_SENTINELLE + identifiant, 'n_clicks') for identifiant in GRAPHIQUES_FILTRES] if differe else []
+
+    @app.callback([Output(identifiant, 'figure') for identifiant in GRAPHIQUES_FILTRES],
+                  [Input('filtre_regions', 'value'), Input('filtre_fonds', 'value'), Input('filtre_categories', 'value'),
+                   Input('filtre_periode', 'start_date'), Input('filtre_periode', 'end_date')] + sentinelles,
+                  prevent_initial_call=True)
+    def filtrer(regions, fonds, categories, debut, fin, *clics):
+        from donnees import operations
+
+        liste = operations()
+        if etat['options'][0] is not liste:
+            etat['options'] = liste, options_filtres(liste)
+        filtres = normaliser_filtres(etat['options'][1], regions, fonds, categories, debut, fin)
+        if not any(filtres):
+            # Totaux nationaux : ce sont les figures des artefacts.
+            return [figure(GRAPHIQUES[identifiant]) for identifiant in GRAPHIQUES_FILTRES]
+        if _espace_cache() != etat['espace']:
+            etat['espace'] = _espace_cache()
+            cache.cache = ouvrir_cache(etat['espace'])
+        cle = hashlib.sha256(json.dumps(filtres).encode()).hexdigest()[:32]
+        return cache.obtenir(cle, lambda: calculer_figures_filtrees(liste, filtres))
+
+    @app.server.route('/metriques/cache')
+    def metriques_cache():
+        return jsonify(cache.metriques())
+
+    return cache
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+# Ingestion en flux, pour les listes d'opérations qui ne tiennent pas en
+# mémoire (plusieurs périodes ou plusieurs pays) : le CSV est lu par
+# morceaux de TAILLE_MORCEAU lignes, limité aux colonnes du cube
+# d'agrégats ; chaque morceau est réduit en un cube (sommes, nombres,
+# cellules des tableaux croisés) ajouté au cube courant, et les montants de
+# chaque fonds alimentent une esquisse de quantiles fusionnable d'où sont
+# tirés les seuils des déciles (séparation des paliers P1 et P2, estimée ;
+# la dimension Palier du cube reste celle publiée dans le CSV). Les
+# intitulés, noms de bénéficiaires et codes postaux ne sont jamais lus : la
+# mémoire maximale dépend de la taille des morceaux, pas de celle du
+# fichier.
+#
+#   python flux.py [chemin.csv] [--taille-morceau 200000] [--sortie dossier]
+
+import argparse
+import json
+import math
+import os
+import resource
+import time
+
+import numpy as np
+import pandas as pd
+
+from agregats import DIMENSIONS, MESURES, construire_cube
+from donnees import dtype_colonnes
+from fichiers import FICHIER_OPERATIONS, ecrire_json, lire_json
+from lorenz import DECILES
+
+TAILLE_MORCEAU = 200000
+# 'Plus de 10 M€' est déduite du montant.
+COLONNES_FLUX = [dimension for dimension in DIMENSIONS if dimension in dtype_colonnes] + MESURES
+# Écart relatif maximal entre un quantile de l'esquisse et la valeur exacte.
+ERREUR_RELATIVE = 0.005
+
+
+class Esquisse:
+    """Esquisse de quantiles à erreur relative bornée, fusionnable.
+
+    Chaque montant positif est compté dans la classe ceil(log(x) / log(g)),
+    g = (1 + e) / (1 - e) : le représentant d'une classe est à moins de e
+    (en relatif) de toutes ses valeurs. Deux esquisses se fusionnent en
+    additionnant leurs comptes ; la taille ne dépend que de l'étendue des
+    montants. Les montants nuls ou négatifs sont comptés à zéro.
+    """
+
+    def __init__(self, erreur=ERREUR_RELATIVE):
+        self.erreur = erreur
+        self.log_gamma = math.log((1 + erreur) / (1 - erreur))
+        self.decalage = 0
+        self.comptes = np.zeros(0, dtype=np.int64)
+        self.nuls = 0
+
+    def __len__(self):
+        return self.nuls + int(self.comptes.sum())
+
+    def _accumuler(self, decalage, comptes):
+        if not len(comptes):
+            return
+        if not len(self.comptes):
+            self.decalage, self.comptes = decalage, comptes.copy()
+            return
+        debut = min(self.decalage, decalage)
+        fin = max(self.decalage + len(self.comptes), decalage + len(comptes))
+        if (debut, fin) != (self.decalage, self.decalage + len(self.comptes)):
+            etendus = np.zeros(fin - debut, dtype=np.int64)
+            etendus[self.decalage - debut:self.decalage - debut + len(self.comptes)] = self.comptes
+            self.decalage, self.comptes = debut, etendus
+        self.comptes[decalage - debut:decalage - debut + len(comptes)] += comptes
+
+    def ajouter(self, valeurs):
+        valeurs = np.asarray(valeurs, dtype=float)
+        valeurs = valeurs[~np.isnan(valeurs)]
+        positives = valeurs[valeurs > 0]
+        self.nuls += len(valeurs) - len(positives)
+        if len(positives):
+            classes = np.ceil(np.log(positives) / self.log_gamma).astype(np.int64)
+            minimum = int(classes.min())
+            self._accumuler(minimum, np.bincount(classes - minimum))
+        return self
+
+    def __add__(self, autre):
+        if autre.erreur != self.erreur:
+            raise ValueError('esquisses de précisions différentes')
+        somme = Esquisse(self.erreur)
+        somme.nuls = self.nuls + autre.nuls
+        somme._accumuler(self.decalage, self.comptes)
+        somme._accumuler(autre.decalage, autre.comptes)
+        return somme
+
+    def quantile(self, q):
+        # Même rang que lorenz.courbe_lorenz : la valeur de rang ceil(q × n)
+        # (à partir de 0) dans l'ordre croissant.
+        n = len(self)
+        if n == 0:
+            return math.nan
+        rang = min(math.ceil(q * n), n - 1)
+        if rang < self.nuls:
+            return 0.0
+        classe = self.decalage + int(np.searchsorted(np.cumsum(self.comptes), rang - self.nuls, side='right'))
+        return 2 * math.exp(classe * self.log_gamma) / (1 + math.exp(self.log_gamma))
+
+    def seuils(self, quantiles=DECILES):
+        return {q: self.quantile(q) for q in quantiles}
+
+    def description(self):
+        return {'erreur': self.erreur, 'decalage': self.decalage, 'comptes': self.comptes.tolist(), 'nuls': self.nuls}
+
+    @classmethod
+    def depuis(cls, description):
+        esquisse = cls(description['erreur'])
+        esquisse.nuls = description['nuls']
+        esquisse._accumuler(description['decalage'], np.asarray(description['comptes'], dtype=np.int64))
+        return esquisse
+
+
+class _Liste(list):
+
+    def liste(self):
+        return list(self)
+
+
+class Morceau:
+    """Morceau du CSV présenté à construire_cube comme des Operations."""
+
+    def __init__(self, data):
+        self.lignes = len(data)
+        self.colonnes = {}
+        self.modalites = {}
+        for nom in data.columns:
+            serie = data[nom]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                # Modalités triées comme dans le cache des opérations.
+                serie = serie.cat.reorder_categories(sorted(serie.cat.categories))
+                self.modalites[nom] = _Liste(serie.cat.categories)
+                self.colonnes[nom] = serie.cat.codes.to_numpy()
+            else:
+                self.colonnes[nom] = serie.to_numpy()
+
+    def __len__(self):
+        return self.lignes
+
+    def __getitem__(self, nom):
+        return self.colonnes[nom]
+
+
+def lire_morceaux(chemin=FICHIER_OPERATIONS, taille_morceau=TAILLE_MORCEAU):
+    types = {colonne: 'category' if dtype_colonnes[colonne] is str else dtype_colonnes[colonne] for colonne in COLONNES_FLUX}
+    with pd.read_csv(chemin, usecols=COLONNES_FLUX, dtype=types, chunksize=taille_morceau) as lecteur:
+        for data in lecteur:
+            yield Morceau(data)
+
+
+def agreger_csv(chemin=FICHIER_OPERATIONS, taille_morceau=TAILLE_MORCEAU, erreur=ERREUR_RELATIVE):
+    """Renvoie le cube d'agrégats, les esquisses des montants par fonds et
+    le nombre d'opérations, en une passe sur le CSV."""
+    cube, esquisses, lignes = None, {}, 0
+    for morceau in lire_morceaux(chemin, taille_morceau):
+        cube_morceau = construire_cube(morceau)
+        cube = cube_morceau if cube is None else cube + cube_morceau
+        montants = morceau['Montant UE programmé']
+        for code, fonds in enumerate(morceau.modalites['Fonds']):
+            esquisses.setdefault(fonds, Esquisse(erreur)).ajouter(montants[morceau['Fonds'] == code])
+        lignes += len(morceau)
+    return cube, esquisses, lignes
+
+
+def enregistrer(dossier, cube, esquisses):
+    os.makedirs(dossier, exist_ok=True)
+    provisoire = os.path.join(dossier, 'cube.{}.tmp'.format(os.getpid()))
+    cube.enregistrer(provisoire)
+    os.replace(provisoire, os.path.join(dossier, 'cube.npz'))
+    ecrire_json(os.path.join(dossier, 'esquisses.json'), {fonds: esquisse.description() for fonds, esquisse in esquisses.items()})
+
+
+def charger_esquisses(dossier):
+    descriptions = lire_json(os.path.join(dossier, 'esquisses.json')) or {}
+    return {fonds: Esquisse.depuis(description) for fonds, description in descriptions.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Calcule les agrégats d’une liste d’opérations lue par morceaux.')
+    parser.add_argument('chemin', nargs='?', default=FICHIER_OPERATIONS)
+    parser.add_argument('--taille-morceau', type=int, default=TAILLE_MORCEAU)
+    parser.add_argument('--sortie', help='dossier où enregistrer le cube et les esquisses')
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    cube, esquisses, lignes = agreger_csv(args.chemin, args.taille_morceau)
+    duree = time.perf_counter() - debut
+    if args.sortie:
+        enregistrer(args.sortie, cube, esquisses)
+    print('{} opérations en {:.1f} s, mémoire maximale {:.0f} Mo'.format(
+        lignes, duree, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+    for fonds, esquisse in sorted(esquisses.items()):
+        print('{:<8} {:>10} opérations, seuil P2 (9e décile) {:>14,.0f} €'.format(fonds, len(esquisse), esquisse.quantile(0.9)))
+    print(json.dumps({fonds: round(float(cube.serie('Montant UE programmé', 'Fonds').get(fonds, 0))) for fonds in esquisses}, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+# Contours des régions d'avant 2016 pour la carte de la section 7, tracée
+# localement par plotly au lieu d'être intégrée depuis uMap. Les contours
+# simplifiés sont livrés avec le code (regions-2015.json) ; ils se régénèrent
+# à partir d'une géométrie source (GeoJSON en longitude/latitude, une entité
+# par région et son nom dans la propriété nom), simplifiée par l'algorithme
+# de Douglas-Peucker et arrondie à 0,001° ; les départements et régions
+# d'outre-mer sont déplacés dans des encarts à l'ouest de la métropole.
+#
+#   python geometrie.py --source regions-2015.geojson
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from fichiers import ecrire_json
+from pipeline import nom_region
+
+FICHIER_CONTOURS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regions-2015.json')
+PROPRIETES_NOM = ['nom', 'NOM_REG', 'name']
+# Écart maximal (en degrés) entre un contour et sa version simplifiée.
+TOLERANCE = 0.02
+DECIMALES = 3
+# Centre (longitude, latitude) et plus grande dimension (en degrés) de
+# l'encart de chaque région d'outre-mer.
+ENCARTS = {
+    'Guadeloupe': (-7.5, 48.5),
+    'Martinique': (-7.5, 47.2),
+    'Guyane': (-7.5, 45.9),
+    'La Réunion': (-7.5, 44.6),
+    'Mayotte': (-7.5, 43.3),
+}
+TAILLE_ENCART = 1.1
+
+
+def simplifier(points, tolerance=TOLERANCE):
+    """Points conservés d'une ligne par l'algorithme de Douglas-Peucker."""
+    garder = np.zeros(len(points), dtype=bool)
+    garder[[0, -1]] = True
+    pile = [(0, len(points) - 1)]
+    while pile:
+        debut, fin = pile.pop()
+        if fin - debut < 2:
+            continue
+        origine = points[debut]
+        dx, dy = points[fin] - origine
+        ecarts = points[debut + 1:fin] - origine
+        longueur = np.hypot(dx, dy)
+        if longueur == 0:
+            # Anneau fermé : distance au point de départ.
+            distances = np.hypot(ecarts[:, 0], ecarts[:, 1])
+        else:
+            distances = np.abs(dx * ecarts[:, 1] - dy * ecarts[:, 0]) / longueur
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance:
+            milieu = debut + 1 + i
+            garder[milieu] = True
+            pile += [(debut, milieu), (milieu, fin)]
+    return points[garder]
+
+
+def _polygones(geometrie):
+    if geometrie['type'] == 'Polygon':
+        return [geometrie['coordinates']]
+    if geometrie['type'] == 'MultiPolygon':
+        return geometrie['coordinates']
+    return []
+
+
+def _nom(proprietes):
+    for propriete in PROPRIETES_NOM:
+        if proprietes.get(propriete):
+            return nom_region(proprietes[propriete])
+    return None
+
+
+def _encart(anneaux, centre):
+    tous = np.concatenate(anneaux)
+    minimum, maximum = tous.min(axis=0), tous.max(axis=0)
+    echelle = TAILLE_ENCART / max((maximum - minimum).max(), 1e-9)
+    return [(anneau - (minimum + maximum) / 2) * echelle + centre for anneau in anneaux]
+
+
+def preparer_contours(source, tolerance=TOLERANCE):
+    # {région : [[longitudes], [latitudes]] par anneau extérieur}.
+    with open(source, encoding='utf-8') as fichier:
+        collection = json.load(fichier)
+    anneaux = {}
+    for entite in collection['features']:
+        nom = _nom(entite.get('properties') or {})
+        if nom is None or not entite.get('geometry'):
+            continue
+        for polygone in _polygones(entite['geometry']):
+            anneau = simplifier(np.asarray(polygone[0], dtype=float)[:, :2], tolerance)
+            # Les îlots réduits à moins d'un triangle disparaissent.
+            if len(anneau) >= 4:
+                anneaux.setdefault(nom, []).append(anneau)
+    contours = {}
+    for nom, liste in sorted(anneaux.items()):
+        if nom in ENCARTS:
+            liste = _encart(liste, np.asarray(ENCARTS[nom]))
+        contours[nom] = [np.round(anneau, DECIMALES).T.tolist() for anneau in liste]
+    return contours
+
+
+def contours_regions(chemin=FICHIER_CONTOURS):
+    """Contours simplifiés des régions livrés avec le code."""
+    with open(chemin, encoding='utf-8') as fichier:
+        return json.load(fichier)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Régénère les contours simplifiés des régions de la section 7.')
+    parser.add_argument('--source', required=True, help='GeoJSON des régions')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+    if not os.path.exists(args.source):
+        parser.error('géométrie introuvable : {}'.format(args.source))
+    contours = preparer_contours(args.source, args.tolerance)
+    ecrire_json(FICHIER_CONTOURS, contours)
+    points = sum(len(anneau[0]) for anneaux in contours.values() for anneau in anneaux)
+    print('{} régions, {} points, {} octets'.format(len(contours), points, os.path.getsize(FICHIER_CONTOURS)))
+
+
+if __name__ == '__main__':
+    main()
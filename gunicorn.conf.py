@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+
+# L'application (artefacts, colonnes projetées en mémoire) est chargée une
+# seule fois dans le processus maître ; les workers en héritent par fork et
+# partagent ces pages au lieu d'en garder chacun une copie.
+
+import gc
+
+preload_app = True
+
+
+def when_ready(server):
+    # Les objets créés au chargement sont exclus du ramasse-miettes : ses
+    # écritures dans leurs en-têtes recopieraient sinon les pages partagées
+    # dans chaque worker.
+    gc.freeze()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+# Ingestion par partition : chaque liste d'opérations publiée (ANCT, Régions
+# Nouvelle-Aquitaine, Normandie et Bretagne, DGEFP) est déposée dans son
+# propre CSV sous sources/ et a son propre cache colonne par colonne. Quand
+# une liste est republiée, seul son CSV est relu ; le cube d'agrégats est mis
+# à jour en retranchant le cube de l'ancienne version de la partition et en
+# ajoutant celui de la nouvelle, sans recalculer les autres partitions.
+#
+#   python ingestion.py [--complet]
+
+import argparse
+import hashlib
+import json
+import os
+import time
+
+from agregats import Cube, construire_cube
+from donnees import DOSSIER_CACHE, VERSION_FORMAT, Operations, dossier_version, fusionner_caches, preparer_cache
+from fichiers import DOSSIER_SOURCES, ecrire_json, lire_json
+
+DOSSIER_PARTITIONS = os.path.join('cache', 'partitions')
+# Noms de fichiers attendus sous sources/ ; tout autre CSV du dossier est
+# également traité comme une partition.
+SOURCES = {
+    'anct.csv': 'Agence nationale de la cohésion des territoires',
+    'nouvelle-aquitaine.csv': 'Région Nouvelle-Aquitaine',
+    'normandie.csv': 'Région Normandie',
+    'bretagne.csv': 'Région Bretagne',
+    'dgefp.csv': 'Délégation générale à l’emploi et à la formation professionnelle',
+}
+
+
+def _chemin_cube(dossier, empreinte):
+    return os.path.join(dossier, 'cubes', '{}.npz'.format(empreinte[:16]))
+
+
+def _empreinte_ensemble(partitions):
+    return hashlib.sha256(json.dumps(partitions, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def cube_partition(dossier_partition, empreinte, dossier=DOSSIER_PARTITIONS):
+    chemin = _chemin_cube(dossier, empreinte)
+    if os.path.exists(chemin):
+        return Cube.charger(chemin)
+    cube = construire_cube(Operations(dossier_partition))
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    provisoire = '{}.{}.tmp'.format(chemin, os.getpid())
+    cube.enregistrer(provisoire)
+    os.replace(provisoire, chemin)
+    return cube
+
+
+def actualiser(dossier_sources=DOSSIER_SOURCES, dossier_cache=DOSSIER_CACHE, dossier=DOSSIER_PARTITIONS, reconstruire=False):
+    """Prend en compte les partitions ajoutées, modifiées ou supprimées.
+
+    Renvoie le dossier du cache des opérations fusionnées et la liste des
+    partitions dont le cube a été ajouté ou retranché.
+    """
+    chemins = sorted(os.path.join(dossier_sources, nom) for nom in os.listdir(dossier_sources) if nom.endswith('.csv'))
+    if not chemins:
+        raise FileNotFoundError('aucune liste d’opérations dans {}'.format(dossier_sources))
+
+    courantes, dossiers = {}, []
+    for chemin in chemins:
+        _, empreinte = dossier_version(chemin, dossier_cache)
+        dossier_partition, _ = preparer_cache(chemin, dossier_cache)
+        courantes[os.path.basename(chemin)] = empreinte
+        dossiers.append(dossier_partition)
+
+    etat = lire_json(os.path.join(dossier, 'etat.json')) or {}
+    anciennes = {} if reconstruire else etat.get('partitions', {})
+    total = None
+    if anciennes and etat.get('cube') and os.path.exists(etat['cube']):
+        total = Cube.charger(etat['cube'])
+    else:
+        anciennes = {}
+
+    modifiees = sorted(nom for nom in set(anciennes) | set(courantes) if anciennes.get(nom) != courantes.get(nom))
+    for nom in modifiees:
+        if nom in anciennes:
+            total = total - Cube.charger(_chemin_cube(dossier, anciennes[nom]))
+        if nom in courantes:
+            cube = cube_partition(dossiers[list(courantes).index(nom)], courantes[nom], dossier)
+            total = cube if total is None else total + cube
+
+    chemin_total = os.path.join(dossier, 'total-{}.npz'.format(_empreinte_ensemble(courantes)))
+    if modifiees or not os.path.exists(chemin_total):
+        provisoire = '{}.{}.tmp'.format(chemin_total, os.getpid())
+        total.enregistrer(provisoire)
+        os.replace(provisoire, chemin_total)
+        if etat.get('cube') and etat['cube'] != chemin_total and os.path.exists(etat['cube']):
+            os.remove(etat['cube'])
+        for empreinte in set(anciennes.values()) - set(courantes.values()):
+            if os.path.exists(_chemin_cube(dossier, empreinte)):
+                os.remove(_chemin_cube(dossier, empreinte))
+        ecrire_json(os.path.join(dossier, 'etat.json'), {'partitions': courantes, 'cube': chemin_total})
+
+    fusion = os.path.join(dossier_cache, 'fusion-v{}-{}'.format(VERSION_FORMAT, _empreinte_ensemble(courantes)))
+    if not os.path.exists(os.path.join(fusion, 'colonnes.json')):
+        fusionner_caches(dossiers, fusion)
+    return fusion, modifiees
+
+
+def cube_courant(dossier_sources=DOSSIER_SOURCES, dossier=DOSSIER_PARTITIONS):
+    # Cube tenu à jour par actualiser(), ou None hors du mode par partition.
+    if not os.path.isdir(dossier_sources):
+        return None
+    etat = lire_json(os.path.join(dossier, 'etat.json')) or {}
+    return Cube.charger(etat['cube']) if etat.get('cube') and os.path.exists(etat['cube']) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Met à jour le cache des opérations et les agrégats après la publication d’une liste.')
+    parser.add_argument('--complet', action='store_true', help='recalcule le cube de toutes les partitions')
+    args = parser.parse_args()
+    debut = time.perf_counter()
+    fusion, modifiees = actualiser(reconstruire=args.complet)
+    print('Partitions prises en compte : {}'.format(', '.join(modifiees) or 'aucune'))
+    print('Cache fusionné : {} ({:.1f} s)'.format(fusion, time.perf_counter() - debut))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+
+# Mesures du serveur, exposées au format texte de Prometheus sur /metrics :
+# durée de chaque phase du démarrage (chargement des opérations, agrégats,
+# construction de chaque figure…) et, pour chaque point d'entrée de Dash,
+# nombre de requêtes, latence et taille des réponses telles qu'envoyées,
+# c'est-à-dire après compression par Flask-Compress. Les compteurs de
+# requêtes de chaque worker sont publiés dans le cache des résultats et
+# additionnés à la lecture, comme ceux de cache_resultats.CacheMesure.
+#
+# Profilage (PROFILAGE=1) : une requête portant l'en-tête X-Profil ou le
+# paramètre profil=1 est échantillonnée pendant son traitement ; les piles
+# d'appels sont écrites au format « folded » (une pile par ligne suivie de
+# son nombre d'échantillons) sous cache/profils, lisible par flamegraph.pl,
+# speedscope ou inferno.
+
+import bisect
+import collections
+import contextlib
+import copy
+import os
+import sys
+import threading
+import time
+
+from cache_resultats import CLASSES_LATENCE, ouvrir_cache
+
+DOSSIER_PROFILS = os.path.join('cache', 'profils')
+PROFILAGE = os.environ.get('PROFILAGE') == '1'
+INTERVALLE_PROFILAGE = float(os.environ.get('PROFILAGE_INTERVALLE', 0.001))
+# Bornes supérieures (en octets) des classes de l'histogramme des tailles.
+CLASSES_TAILLE = [1000, 10000, 100000, 1000000, 10000000, float('inf')]
+# Délai minimal (en secondes) entre deux publications des compteurs d'un
+# worker.
+PERIODE_PUBLICATION = 1.0
+POINTS_ENTREE = ['_dash-layout', '_dash-dependencies', '_dash-update-component', '_dash-component-suites', 'assets', 'donnees', 'sql', 'metrics']
+PREFIXE = 'cohesion_'
+
+# Phases du démarrage, dans l'ordre où elles se terminent.
+PHASES = {}
+_pile = threading.local()
+
+
+def chemin_phase():
+    return getattr(_pile, 'chemin', ())
+
+
+@contextlib.contextmanager
+def phase(nom, parent=None):
+    # Les phases imbriquées sont nommées d'après leur chemin
+    # (figures/fig1…) ; parent : chemin de la phase englobante quand elle a
+    # été ouverte dans un autre thread.
+    chemin = chemin_phase()
+    _pile.chemin = (chemin if parent is None else parent) + (nom,)
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASES['/'.join(_pile.chemin)] = time.perf_counter() - debut
+        _pile.chemin = chemin
+
+
+def point_entree(chemin):
+    if chemin == '/':
+        return '/'
+    for nom in POINTS_ENTREE:
+        if '/' + nom in chemin:
+            return nom
+    return 'autre'
+
+
+class Echantillonneur(threading.Thread):
+    """Relève à intervalle régulier la pile d'appels d'un autre thread."""
+
+    def __init__(self, thread, intervalle=INTERVALLE_PROFILAGE):
+        super().__init__(daemon=True)
+        self.thread = thread
+        self.intervalle = intervalle
+        self.piles = collections.Counter()
+        self.arret = threading.Event()
+
+    def run(self):
+        while not self.arret.wait(self.intervalle):
+            cadre = sys._current_frames().get(self.thread)
+            pile = []
+            while cadre is not None:
+                code = cadre.f_code
+                pile.append('{}:{}'.format(os.path.basename(code.co_filename), code.co_name).replace(' ', '_').replace(';', ','))
+                cadre = cadre.f_back
+            if pile:
+                self.piles[';'.join(reversed(pile))] += 1
+
+    def arreter(self):
+        self.arret.set()
+        self.join()
+
+    def ecrire(self, chemin):
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        with open(chemin, 'w', encoding='utf-8') as fichier:
+            for pile, nombre in self.piles.most_common():
+                fichier.write('{} {}\n'.format(pile, nombre))
+
+
+def _histogramme_vide(classes):
+    return {'nombre': 0, 'somme': 0.0, 'classes': [0] * len(classes)}
+
+
+def _ajouter(histogramme, classes, valeur):
+    histogramme['nombre'] += 1
+    histogramme['somme'] += valeur
+    histogramme['classes'][bisect.bisect_left(classes, valeur)] += 1
+
+
+class Instrumentation:
+    """Application WSGI mesurant les requêtes de l'application enveloppée."""
+
+    def __init__(self, application, publication=None):
+        self.application = application
+        self.publication = publication
+        self.compteurs = {}
+        self.verrou = threading.Lock()
+        self.publiee = 0.0
+
+    def __call__(self, environ, start_response):
+        debut = time.perf_counter()
+        nom = point_entree(environ.get('PATH_INFO', ''))
+        statut = []
+
+        def demarrer(status, headers, exc_info=None):
+            statut.append(status.split(' ', 1)[0])
+            return start_response(status, headers, exc_info)
+
+        echantillonneur = None
+        if PROFILAGE and (environ.get('HTTP_X_PROFIL') or 'profil=1' in environ.get('QUERY_STRING', '')):
+            echantillonneur = Echantillonneur(threading.get_ident())
+            echantillonneur.start()
+        corps = self.application(environ, demarrer)
+        return self._parcourir(corps, nom, statut, debut, echantillonneur)
+
+    def _parcourir(self, corps, nom, statut, debut, echantillonneur):
+        octets = 0
+        try:
+            for morceau in corps:
+                octets += len(morceau)
+                yield morceau
+        finally:
+            if hasattr(corps, 'close'):
+                corps.close()
+            duree = time.perf_counter() - debut
+            if echantillonneur is not None:
+                echantillonneur.arreter()
+                chemin = os.path.join(DOSSIER_PROFILS, '{}-{}-{}.folded'.format(time.strftime('%Y%m%dT%H%M%S'), nom.strip('/_') or 'index', os.getpid()))
+                echantillonneur.ecrire(chemin)
+                print('Profil de la requête {} ({:.3f} s) : {}'.format(nom, duree, chemin), file=sys.stderr)
+            self.enregistrer(nom, statut[0] if statut else '500', duree, octets)
+
+    def enregistrer(self, nom, statut, duree, octets):
+        with self.verrou:
+            compteur = self.compteurs.setdefault(nom, {
+                'statuts': {},
+                'duree': _histogramme_vide(CLASSES_LATENCE),
+                'octets': _histogramme_vide(CLASSES_TAILLE),
+            })
+            compteur['statuts'][statut] = compteur['statuts'].get(statut, 0) + 1
+            _ajouter(compteur['duree'], CLASSES_LATENCE, duree)
+            _ajouter(compteur['octets'], CLASSES_TAILLE, octets)
+            if self.publication is None or time.monotonic() - self.publiee < PERIODE_PUBLICATION:
+                return
+            self.publiee = time.monotonic()
+            compteurs = copy.deepcopy(self.compteurs)
+        try:
+            self.publication.publier_metriques(os.getpid(), compteurs)
+        except Exception:
+            # Les métriques ne doivent jamais faire échouer une requête.
+            pass
+
+    def compteurs_workers(self):
+        # Compteurs de tous les workers, ceux de ce processus étant pris à
+        # jour plutôt que dans leur dernière publication.
+        with self.verrou:
+            propres = copy.deepcopy(self.compteurs)
+        if self.publication is not None:
+            try:
+                self.publication.publier_metriques(os.getpid(), propres)
+                return self.publication.lire_metriques()
+            except Exception:
+                pass
+        return [propres]
+
+
+def _cumuler(classes):
+    # Les classes de Prometheus sont cumulatives.
+    cumul, total = [], 0
+    for nombre in classes:
+        total += nombre
+        cumul.append(total)
+    return cumul
+
+
+def _borne(borne):
+    return '+Inf' if borne == float('inf') else repr(borne)
+
+
+def texte_prometheus(instrumentation):
+    lignes = [
+        '# HELP {}demarrage_phase_secondes Durée de chaque phase du démarrage du processus.'.format(PREFIXE),
+        '# TYPE {}demarrage_phase_secondes gauge'.format(PREFIXE),
+    ]
+    for nom, duree in PHASES.items():
+        lignes.append('{}demarrage_phase_secondes{{phase="{}"}} {:.6f}'.format(PREFIXE, nom, duree))
+
+    total = {}
+    for compteurs in instrumentation.compteurs_workers():
+        for nom, compteur in compteurs.items():
+            cumul = total.setdefault(nom, {'statuts': {}, 'duree': _histogramme_vide(CLASSES_LATENCE), 'octets': _histogramme_vide(CLASSES_TAILLE)})
+            for statut, nombre in compteur['statuts'].items():
+                cumul['statuts'][statut] = cumul['statuts'].get(statut, 0) + nombre
+            for mesure in ('duree', 'octets'):
+                cumul[mesure]['nombre'] += compteur[mesure]['nombre']
+                cumul[mesure]['somme'] += compteur[mesure]['somme']
+                cumul[mesure]['classes'] = [a + b for a, b in zip(cumul[mesure]['classes'], compteur[mesure]['classes'])]
+
+    lignes += [
+        '# HELP {}requetes_total Requêtes traitées, par point d’entrée et statut HTTP.'.format(PREFIXE),
+        '# TYPE {}requetes_total counter'.format(PREFIXE),
+    ]
+    for nom, cumul in sorted(total.items()):
+        for statut, nombre in sorted(cumul['statuts'].items()):
+            lignes.append('{}requetes_total{{endpoint="{}",statut="{}"}} {}'.format(PREFIXE, nom, statut, nombre))
+    for mesure, metrique, classes, description in (
+            ('duree', 'requete_duree_secondes', CLASSES_LATENCE, 'Latence des requêtes, corps de la réponse compris.'),
+            ('octets', 'reponse_octets', CLASSES_TAILLE, 'Taille des réponses envoyées, après compression.')):
+        lignes += [
+            '# HELP {}{} {}'.format(PREFIXE, metrique, description),
+            '# TYPE {}{} histogram'.format(PREFIXE, metrique),
+        ]
+        for nom, cumul in sorted(total.items()):
+            histogramme = cumul[mesure]
+            for borne, nombre in zip(classes, _cumuler(histogramme['classes'])):
+                lignes.append('{}{}_bucket{{endpoint="{}",le="{}"}} {}'.format(PREFIXE, metrique, nom, _borne(borne), nombre))
+            lignes.append('{}{}_sum{{endpoint="{}"}} {}'.format(PREFIXE, metrique, nom, histogramme['somme']))
+            lignes.append('{}{}_count{{endpoint="{}"}} {}'.format(PREFIXE, metrique, nom, histogramme['nombre']))
+    return '\n'.join(lignes) + '\n'
+
+
+def installer(server, espace='instrumentation'):
+    """Enveloppe l'application WSGI de server et ajoute la route /metrics."""
+    try:
+        publication = ouvrir_cache(espace)
+    except Exception:
+        publication = None
+    instrumentation = Instrumentation(server.wsgi_app, publication)
+    server.wsgi_app = instrumentation
+
+    @server.route('/metrics')
+    def metriques():
+        return texte_prometheus(instrumentation), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+    return instrumentation
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+# Courbe de concentration des montants (graphique de la section 2) : part
+# cumulée des montants en fonction de la part des opérations, classées par
+# montant croissant.
+#
+# La courbe n'est calculée qu'en un nombre borné de points (« nœuds ») : les
+# montants sont partitionnés (np.partition) autour des rangs des nœuds sans
+# être entièrement triés, puis les segments dont l'erreur d'interpolation
+# dépasse la tolérance sont redécoupés. La taille de la figure ne dépend donc
+# plus du nombre d'opérations.
+
+import heapq
+import math
+
+import numpy as np
+
+DECILES = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
+NOEUDS_INITIAUX = 32
+NB_POINTS_MAX = 400
+TOLERANCE = 0.0005
+
+
+def rang_quantile(n, quantile):
+    # Rang (à partir de 0) du plus petit montant au-delà du quantile parmi n.
+    return min(math.ceil(quantile * n), n - 1)
+
+
+def _erreur(debut, fin, bas, total):
+    # La courbe est convexe : entre deux nœuds, l'écart à la corde est au plus
+    # largeur × (pente maximale - pente minimale) / 4, les pentes étant les
+    # montants extrêmes du segment, bornés par les valeurs aux nœuds.
+    if fin - debut < 2:
+        return 0.0
+    return (fin - debut) * (bas[fin] - bas[debut]) / (4 * total)
+
+
+def courbe_lorenz(montants, tolerance=TOLERANCE, nb_points_max=NB_POINTS_MAX, quantiles=DECILES):
+    """Renvoie (parts des opérations, parts cumulées des montants, seuils).
+
+    seuils[q] est le plus petit montant des opérations au-delà du quantile q
+    (pour q = 0,9 : le seuil d'entrée dans les projets « d'ampleur »), calculé
+    exactement.
+    """
+    valeurs = np.array(montants, dtype=float)
+    valeurs = valeurs[~np.isnan(valeurs)]
+    n = len(valeurs)
+    if n == 0:
+        return np.array([]), np.array([]), {}
+    total = valeurs.sum()
+
+    # bas[r] : r-ième plus petit montant, exact dès que r est un nœud ;
+    # bas[n] : montant maximal.
+    rangs_quantiles = {q: rang_quantile(n, q) for q in quantiles}
+    noeuds = sorted({0} | set(np.linspace(0, n, NOEUDS_INITIAUX + 1).astype(int)[1:-1]) | set(rangs_quantiles.values()))
+    valeurs.partition(noeuds)
+    bas = {rang: valeurs[rang] for rang in noeuds}
+    bas[n] = valeurs[noeuds[-1]:].max()
+
+    segments = {}
+    file_attente = []
+    for debut, fin in zip(noeuds, noeuds[1:] + [n]):
+        segments[debut] = (fin, valeurs[debut:fin].sum())
+        heapq.heappush(file_attente, (-_erreur(debut, fin, bas, total), debut))
+
+    while len(segments) < nb_points_max - 1 and -file_attente[0][0] > tolerance:
+        _, debut = heapq.heappop(file_attente)
+        fin, _ = segments[debut]
+        milieu = (debut + fin) // 2
+        # Seul le segment est partitionné ; le reste du tableau est inchangé.
+        valeurs[debut:fin].partition(milieu - debut)
+        bas[milieu] = valeurs[milieu]
+        segments[debut] = (milieu, valeurs[debut:milieu].sum())
+        segments[milieu] = (fin, valeurs[milieu:fin].sum())
+        heapq.heappush(file_attente, (-_erreur(debut, milieu, bas, total), debut))
+        heapq.heappush(file_attente, (-_erreur(milieu, fin, bas, total), milieu))
+
+    debuts = sorted(segments)
+    cumul = np.concatenate([[0.0], np.cumsum([segments[debut][1] for debut in debuts])])
+    seuils = {q: bas[rang] for q, rang in rangs_quantiles.items()}
+    return np.array(debuts + [n]) / n, cumul / total, seuils
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+
+import dash_core_components as dcc
+import dash_html_components as html
+import dash_table
+
+from paliers import texte_seuil
+from recherche import COLONNES_RESULTATS, TAILLE_PAGE, libelle_compte, nombre_pages
+from textes import partie1_md, partie2_md_a, partie2_md_b, partie3_md, partie4_md, partie5_md, partie5_md_focus_assos, partie5_md_focus_entreprises, partie6_md, partie6_md_note, partie7_md, partie7_md_note, partie8_md, partie9_md, partie10_md, partie10_md_note, partie11_md, partie12_md
+
+# Identifiant de chaque dcc.Graph et nom de sa figure.
+GRAPHIQUES = {
+    'repartition_montants': 'fig1',
+    'apport_beneficiaires_thematiques': 'fig2',
+    'paliers_operations_feder': 'fig4a',
+    'paliers_operations_fse': 'fig4b',
+    'comparaison_usages_fonds': 'fig5',
+    'focus_entreprises': 'fig5_entreprises',
+    'beneficiaires_catregion': 'fig6',
+    'concentration_regions': 'fig7',
+    'contributions_10m': 'fig8',
+    'instruments_financiers': 'fig9',
+    'montants_op_mois': 'fig10a',
+    'lancement_op_annees': 'fig10b',
+    'distribution_durees_feder': 'fig10d',
+    'distribution_durees_fse': 'fig10c',
+}
+
+
+def barre_filtres(options):
+    # Les graphiques des sections 3, 4 et 8 sont recalculés par le callback
+    # de filtres.py ; la barre reste visible pendant le défilement.
+    return html.Div([
+        html.Div('Filtrer les graphiques des sections 3, 4 et 8 :', className="filtres-titre"),
+        dcc.Dropdown(id='filtre_regions', options=[{'label': region, 'value': region} for region in options['regions']],
+                     multi=True, placeholder='Toutes les régions'),
+        dcc.Dropdown(id='filtre_fonds', options=[{'label': fonds, 'value': fonds} for fonds in options['fonds']],
+                     multi=True, placeholder='FEDER et FSE'),
+        dcc.Dropdown(id='filtre_categories', options=[{'label': categorie, 'value': categorie} for categorie in options['categories']],
+                     multi=True, placeholder='Toutes les catégories de région'),
+        dcc.DatePickerRange(id='filtre_periode', min_date_allowed=options['debut'], max_date_allowed=options['fin'],
+                            start_date_placeholder_text='Début après le', end_date_placeholder_text='et avant le',
+                            display_format='DD/MM/YYYY', first_day_of_week=1, clearable=True)
+    ], id='filtres', className="filtres")
+
+
+# Libellés des facettes de la recherche (recherche.FACETTES).
+LIBELLES_FACETTES = {
+    'fonds': 'Tous les fonds',
+    'themes': 'Toutes les thématiques',
+    'beneficiaires': 'Toutes les catégories de bénéficiaire',
+    'regions': 'Toutes les régions',
+}
+LIBELLES_RESULTATS = ['Intitulé du projet', 'Bénéficiaire', 'Fonds', 'Région', 'Thématique', 'Montant UE', 'Dépenses éligibles', 'Cofinancement UE', 'Durée (mois)']
+FORMAT_EUROS = {'locale': {'symbol': ['', '\xa0€'], 'group': '\xa0'}, 'specifier': '$,.0f'}
+FORMATS_RESULTATS = {
+    'Montant UE programmé': FORMAT_EUROS,
+    'Total des dépenses éligibles': FORMAT_EUROS,
+    'Taux de cofinancement': {'specifier': '.0%'},
+    'Durée, en mois': {'specifier': 'd'},
+}
+
+
+def section_recherche(options):
+    # La mise en page contient la première page de la liste ; les autres
+    # pages, les tris et les comptes des facettes sont fournis par le
+    # callback de recherche.py.
+    colonnes = []
+    for colonne, libelle in zip(COLONNES_RESULTATS, LIBELLES_RESULTATS):
+        colonnes.append({'id': colonne, 'name': libelle})
+        if colonne in FORMATS_RESULTATS:
+            colonnes[-1].update(type='numeric', format=FORMATS_RESULTATS[colonne])
+    return html.Div([
+        html.H2('Explorer les opérations'),
+        dcc.Input(id='recherche_texte', type='search', debounce=True, className='recherche-texte',
+                  placeholder='Mots de l’intitulé du projet ou du nom du bénéficiaire'),
+        html.Div([
+            dcc.Dropdown(id='recherche_' + nom, options=[{'label': modalite.replace('<br>', ' '), 'value': modalite} for modalite in modalites],
+                         multi=True, placeholder=LIBELLES_FACETTES[nom])
+            for nom, modalites in options['facettes'].items()
+        ], className='recherche-facettes'),
+        html.Div(libelle_compte(options['total']), id='recherche_compte', className='recherche-compte'),
+        dash_table.DataTable(
+            id='recherche_resultats',
+            columns=colonnes,
+            data=options['lignes'],
+            page_action='custom',
+            page_current=0,
+            page_size=TAILLE_PAGE,
+            page_count=nombre_pages(options['total']),
+            sort_action='custom',
+            sort_mode='single',
+            sort_by=[],
+            style_cell={'textAlign': 'left', 'whiteSpace': 'normal', 'height': 'auto', 'fontFamily': 'Arial, sans-serif', 'fontSize': '0.85em'},
+            style_cell_conditional=[{'if': {'column_id': colonne}, 'textAlign': 'right'} for colonne in FORMATS_RESULTATS],
+            style_header={'fontWeight': 'bold'}
+        )
+    ], id='recherche', className='paragraph recherche')
+
+
+def construire_layout(figures, options):
+    # Seuils des projets « d'ampleur » calculés sur la liste servie
+    # (paliers.py).
+    seuils = {'seuil_{}'.format(fonds.lower()): texte_seuil(seuil) for fonds, seuil in options['seuils'].items()}
+    return html.Div(children=[
+    
+        html.Div(children=[
+    
+        html.H1(['Comment sont utilisés les fonds européens en France ?', html.Br(), 'Analyse des projets FEDER et FSE de la période 2014-2020']),
+
+        html.Div([
+            dcc.Markdown(children=partie1_md)
+        ], className="paragraph"),
+
+        html.Div([
+            html.H2('2. Typologie des opérations'),
+            html.Div([dcc.Markdown(children=partie2_md_a)], className="five columns"),
+            html.Div([
+                dcc.Graph(
+                id='repartition_montants',
+                figure=figures['fig1'],
+                config={'displayModeBar': False}
+            )], className="one-half column"),
+            html.Div([dcc.Markdown(children=partie2_md_b.format(**seuils))], className="twelve columns")
+        ], className="row"),
+
+        barre_filtres(options),
+
+        html.Div([
+            dcc.Markdown(children=partie3_md)
+        ], className="paragraph"),
+
+        html.Figure([
+            html.Figcaption('Financement FEDER et FSE par catégorie de bénéficiaire et par thématique'),
+            dcc.Graph(
+                id='apport_beneficiaires_thematiques',
+                figure=figures['fig2'],
+                config={'displayModeBar': False},
+                style={'width':'100%'}
+            )
+        ]),
+
+        html.Div([
+            dcc.Markdown(children=partie4_md.format(**seuils))
+        ], className="paragraph"),
+
+        html.Figure([
+            html.Figcaption('Répartition des opérations FEDER par catégorie de bénéficiaire et de projet'),
+            dcc.Graph(
+                id='paliers_operations_feder',
+                figure=figures['fig4a'],
+                config={'displayModeBar': False},
+                style={'width':'90%'}
+            )
+        ]),
+
+        html.Figure([
+            html.Figcaption('Répartition des opérations FSE par catégorie de bénéficiaire et de projet'),
+            dcc.Graph(
+                id='paliers_operations_fse',
+                figure=figures['fig4b'],
+                config={'displayModeBar': False},
+                style={'width':'90%'}
+            )
+        ]),
+
+        html.Div([
+            dcc.Markdown(children=partie5_md)
+        ], className="paragraph"),
+
+        html.Figure([
+            html.Figcaption('Comparaison des usages des fonds européens entre catégories de bénéficiaires'),
+            dcc.Graph(
+                id='comparaison_usages_fonds',
+                figure=figures['fig5'],
+                config={'displayModeBar': False},
+                style={'width':'95%', 'height':'75vh'}
+            )
+        ]),
+
+        html.Div([
+    #        html.Div([dcc.Markdown(children=partie5_md_focus_assos)], className="five columns"),
+            html.Div([dcc.Markdown(children=partie5_md_focus_entreprises),
+                      dcc.Graph(
+                                id='focus_entreprises',
+                                figure=figures['fig5_entreprises'],
+                                config={'displayModeBar': False},
+                                style={'height':340}
+                    )       
+            ], className="ten columns offset-by-one")
+        ], className="row"),
+
+        html.Div([
+            dcc.Markdown(children=partie6_md)
+        ], id="renvoi_partie6", className="paragraph"),
+
+        html.Figure([
+            html.Figcaption('Bénéficiaires FEDER et FSE par catégorie de région'),
+            dcc.Graph(
+                id='beneficiaires_catregion',
+                figure=figures['fig6'],
+                config={'displayModeBar': False})
+        ]),
+
+        html.Div([
+            dcc.Markdown(children=partie6_md_note)
+        ], id="note1", className="paragraph footnote"),
+
+        html.Div([
+            dcc.Markdown(children=partie7_md)
+        ], id="renvoi_partie7", className="paragraph"),
+
+        html.Figure([
+            html.Figcaption('Indice de concentration des montants programmés entre catégories de bénéficiaires, par région'),
+            dcc.Graph(
+                id='concentration_regions',
+                figure=figures['fig7'],
+                config={'displayModeBar': False}
+            )
+        ]),
+
+        html.Div([
+            dcc.Markdown(children=partie7_md_note)
+        ], id="note2", className="paragraph footnote"),
+
+        html.Div([
+            dcc.Markdown(children=partie8_md)
+        ], className="paragraph"),
+
+        html.Figure(
+            children=[
+            html.Figcaption(['Contributions FEDER et FSE supérieures à 10 millions d’euros, hors instruments financiers', html.Br(), '(surface = total des contributions UE)']),
+            dcc.Graph(
+                id='contributions_10m',
+                figure=figures['fig8'],
+                config={'displayModeBar': False})
+        ]),
+
+        html.Div([
+            html.Div([dcc.Markdown(children=partie9_md)], className="one-half column"),
+            html.Div([
+                dcc.Graph(
+                          id='instruments_financiers',
+                          figure=figures['fig9'],
+                          config={'displayModeBar': False}
+                    )
+            ], className="one-half column")
+        ], className="row"),
+
+        html.Div([
+            dcc.Markdown(children=partie10_md)
+        ], id="renvoi_partie10", className="paragraph"),
+
+        html.Figure([
+            html.Figcaption(['Mise en œuvre des opérations mesurée par montants programmés de fonds européens', html.Br(), '(100 = rythme maximum observé sur l’ensemble de la période)']),
+            dcc.Graph(
+                id='montants_op_mois',
+                figure=figures['fig10a'],
+                config={'displayModeBar': False}
+            )
+        ]),
+
+        html.Figure([
+            html.Figcaption(['Nombre de démarrages d’opérations FEDER et FSE par année', html.Br(), 'et nombre d’opérations en cours de réalisation chaque année en fonction de leur durée']),
+            dcc.Graph(
+                id='lancement_op_annees',
+                figure=figures['fig10b'],
+                config={'displayModeBar': False}
+            )
+        ]),
+
+        html.P(['Distribution des projets en fonction de la durée des opérations'], className="figcap"),
+
+        html.Div([
+    #        html.Figure([
+    #            html.Figcaption('Distribution des projets en fonction de la durée des opérations'),
+                html.Div([
+                    dcc.Graph(
+                        id='distribution_durees_feder',
+                        figure=figures['fig10d'],
+                        config={'displayModeBar': False})
+                ], className="one-half column"),
+                html.Div([
+                    dcc.Graph(
+                        id='distribution_durees_fse',
+                        figure=figures['fig10c'],
+                        config={'displayModeBar': False})
+                ], className="one-half column")
+        ], className="row"),
+
+        html.Div([
+            dcc.Markdown(children=partie10_md_note)
+        ], id="note3", className="paragraph footnote"),
+
+        html.Div([
+            dcc.Markdown(children=partie11_md)
+        ], className="paragraph"),
+
+        html.Div([
+            dcc.Markdown(children=partie12_md)
+        ], className="paragraph"),
+
+        section_recherche(options['recherche']),
+
+        html.Div([
+            html.P([html.Span(['Auteurs : '], style={'font-weight': 'bold'}), html.A(['Elie Herberichs'], href="mailto:eherberichs@novi-advisory.eu"), ' et ', html.A(['Romain Su'], href="https://romain.su")], style={'text-align': 'right', 'margin': '20px 50px 20px', 'font-size': '1.2em'})
+        ])
+
+    ],
+        className="container"
+    ),
+
+    html.Div([
+        html.A(children=[
+            html.Img(src="https://novi-advisory.eu/wp-content/uploads/2019/05/logo-footer.png")], href="https://novi-advisory.eu")
+    ], className="footer")
+
+    ])
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+# Paliers des opérations (sections 2 et 4) : une opération est un projet
+# « d'ampleur » (P2) quand sa contribution UE atteint le seuil du dixième
+# décile des opérations de même fonds, un projet « courant » (P1) sinon. Le
+# seuil suit la convention de lorenz.courbe_lorenz : plus petit montant au
+# rang ceil(0,9 × n).
+#
+# Les paliers sont recalculés pour n'importe quel sous-ensemble des
+# opérations (graphiques filtrés) au lieu d'être lus dans la colonne Palier
+# du CSV. Les montants de chaque fonds sont regroupés une fois ; chaque seuil
+# est obtenu par sélection (np.partition, linéaire) et non par un tri, puis
+# conservé par fonds et par sous-ensemble.
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from lorenz import rang_quantile
+
+FONDS = ['FEDER', 'FSE']
+PALIERS = ['P1', 'P2']
+QUANTILE_AMPLEUR = 0.9
+COLONNE_MONTANT = 'Montant UE programmé'
+# Seuils conservés (fonds × sous-ensemble) ; les plus anciens sont oubliés.
+TAILLE_CACHE = 256
+
+
+def seuil_montants(montants, quantile=QUANTILE_AMPLEUR):
+    """Seuil des projets « d'ampleur » parmi des montants (NaN ignorés),
+    None s'il n'y en a aucun. Les montants ne sont pas modifiés."""
+    valeurs = np.array(montants, dtype=float)
+    valeurs = valeurs[~np.isnan(valeurs)]
+    if not len(valeurs):
+        return None
+    rang = rang_quantile(len(valeurs), quantile)
+    # Seul le rang cherché est placé ; le reste du tableau n'est pas trié.
+    valeurs.partition(rang)
+    return float(valeurs[rang])
+
+
+def cle_lignes(lignes):
+    # Clé d'un sous-ensemble d'opérations (None : toutes).
+    if lignes is None:
+        return None
+    return hashlib.blake2b(np.ascontiguousarray(lignes).tobytes(), digest_size=16).hexdigest()
+
+
+class Paliers:
+    """Seuils et paliers des opérations d'une liste."""
+
+    def __init__(self, operations, quantile=QUANTILE_AMPLEUR):
+        self.operations = operations
+        self.quantile = quantile
+        self.codes_fonds = {fonds: operations.modalites['Fonds'].code(fonds) for fonds in FONDS}
+        # Montants de chaque fonds, regroupés une fois pour la liste
+        # complète (NaN retirés).
+        montants = np.asarray(operations[COLONNE_MONTANT], dtype=float)
+        self.montants = {}
+        for fonds, code in self.codes_fonds.items():
+            valeurs = montants[operations['Fonds'] == code] if code >= 0 else montants[:0]
+            self.montants[fonds] = valeurs[~np.isnan(valeurs)]
+        self.cache = OrderedDict()
+        self.verrou = threading.Lock()
+
+    def seuil(self, fonds, lignes=None, cle=None):
+        """Seuil des projets « d'ampleur » du fonds parmi les opérations
+        retenues (indices lignes, toutes par défaut) ; cle identifie ces
+        lignes (par défaut, leur empreinte)."""
+        if lignes is None:
+            cle = None
+        elif cle is None:
+            cle = cle_lignes(lignes)
+        cle = fonds, cle
+        with self.verrou:
+            if cle in self.cache:
+                self.cache.move_to_end(cle)
+                return self.cache[cle]
+        if lignes is None or self.codes_fonds[fonds] < 0:
+            valeurs = self.montants[fonds]
+        else:
+            retenues = self.operations['Fonds'][lignes] == self.codes_fonds[fonds]
+            valeurs = np.asarray(self.operations[COLONNE_MONTANT][lignes][retenues], dtype=float)
+        seuil = seuil_montants(valeurs, self.quantile)
+        with self.verrou:
+            self.cache[cle] = seuil
+            if len(self.cache) > TAILLE_CACHE:
+                self.cache.popitem(last=False)
+        return seuil
+
+    def seuils(self, lignes=None, cle=None):
+        return {fonds: self.seuil(fonds, lignes, cle) for fonds in FONDS}
+
+    def classer(self, lignes=None, cle=None):
+        """Indice dans PALIERS du palier de chaque opération retenue, -1
+        sans fonds FEDER ou FSE ni montant."""
+        if cle is None and lignes is not None:
+            cle = cle_lignes(lignes)
+        codes = np.asarray(self.operations['Fonds'] if lignes is None else self.operations['Fonds'][lignes])
+        montants = np.asarray(self.operations[COLONNE_MONTANT] if lignes is None else self.operations[COLONNE_MONTANT][lignes], dtype=float)
+        # Seuil de chaque code de fonds ; NaN pour les autres fonds et les
+        # fonds manquants (code -1, dernière case).
+        seuils = np.full(len(self.operations.modalites['Fonds']) + 1, np.nan)
+        for fonds, seuil in self.seuils(lignes, cle).items():
+            if self.codes_fonds[fonds] >= 0 and seuil is not None:
+                seuils[self.codes_fonds[fonds]] = seuil
+        seuils_lignes = seuils[codes]
+        resultat = (montants >= seuils_lignes).view(np.int8)
+        resultat[np.isnan(seuils_lignes) | np.isnan(montants)] = -1
+        return resultat
+
+
+_courant = None
+_verrou = threading.Lock()
+
+
+def paliers(operations):
+    """Paliers de la liste d'opérations, recréés quand elle change
+    (rechargement à chaud)."""
+    global _courant
+    with _verrou:
+        if _courant is None or _courant.operations is not operations:
+            _courant = Paliers(operations)
+        return _courant
+
+
+def texte_seuil(seuil):
+    # « 326 000 » : seuil arrondi au millier, comme dans le texte publié.
+    return '{:,.0f}'.format(round(seuil, -3)).replace(',', ' ') if seuil is not None else '—'
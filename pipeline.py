@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+# Séries calculées à partir des opérations pour les graphiques des sections
+# 6, 7 et 10, qui étaient auparavant saisies à la main ou hébergées sur un
+# site tiers. Chaque étape déclare les colonnes qu'elle lit ; son résultat est
+# mis en cache sous une clé formée des empreintes de ces colonnes et du code
+# de ce module, de sorte qu'après une mise à jour des données seules les
+# étapes dont une colonne a changé sont recalculées.
+
+import hashlib
+import json
+import os
+import re
+import unicodedata
+
+import numpy as np
+
+from fichiers import ecrire_json, empreinte_fichier, lire_json
+
+DOSSIER_PIPELINE = os.path.join('cache', 'pipeline')
+
+ANNEES = list(range(2014, 2021))
+# Classes de durée (en mois) : ]0, 12], ]12, 24], ]24, 36], ]36, 200].
+BORNES_DUREES = [0, 12, 24, 36, 200]
+ORDRE_CATEGORIES_REGION = ['Régions moins développées', 'Régions en transition', 'Régions plus développées']
+# Regroupement des catégories de bénéficiaires du graphique 6 ; les autres
+# catégories sont comptées dans « Autres ».
+GROUPES_BENEFICIAIRES = {
+    'Régions': 'Régions',
+    'Départements': 'Départements',
+    'Communes': 'Communes',
+    'État': 'État',
+    "Établissements de recherche et d'enseignement supérieur": 'Recherche et enseignement supérieur',
+    'Entreprises': 'Entreprises',
+    'Autres établissements publics': 'Autres établissements publics',
+}
+ORDRE_GROUPES = list(GROUPES_BENEFICIAIRES.values()) + ['Autres']
+# Régions d'avant la loi du 16 janvier 2015 ; les autres modalités de la
+# colonne (programmes nationaux et interrégionaux) sont exclues du graphique 7.
+REGIONS_PRE_NOTRE = [
+    'Alsace', 'Aquitaine', 'Auvergne', 'Basse-Normandie', 'Bourgogne', 'Bretagne', 'Centre', 'Champagne-Ardenne', 'Corse',
+    'Franche-Comté', 'Guadeloupe', 'Guyane', 'Haute-Normandie', 'Île-de-France', 'La Réunion', 'Languedoc-Roussillon', 'Limousin',
+    'Lorraine', 'Martinique', 'Mayotte', 'Midi-Pyrénées', 'Nord-Pas-de-Calais', 'Pays de la Loire', 'Picardie', 'Poitou-Charentes',
+    "Provence-Alpes-Côte d'Azur", 'Rhône-Alpes',
+]
+BENEFICIAIRE_INDETERMINE = 'Bénéficiaires de type indéterminé'
+
+ETAPES = {}
+
+
+def etape(*colonnes):
+    def enregistrer(fonction):
+        ETAPES[fonction.__name__] = (colonnes, fonction)
+        return fonction
+    return enregistrer
+
+
+def empreintes_colonnes(operations):
+    # Calculées une fois par version du cache des opérations et rangées à
+    # côté de ses colonnes.
+    chemin = os.path.join(operations.dossier, 'empreintes.json')
+    empreintes = lire_json(chemin)
+    if empreintes is None:
+        description = lire_json(os.path.join(operations.dossier, 'colonnes.json'))
+        empreintes = {}
+        for colonne in description['colonnes']:
+            fichiers = [colonne[cle] for cle in ('fichier', 'modalites', 'decalages') if cle in colonne]
+            empreintes[colonne['nom']] = hashlib.sha256(''.join(empreinte_fichier(os.path.join(operations.dossier, fichier)) for fichier in fichiers).encode()).hexdigest()
+        try:
+            ecrire_json(chemin, empreintes)
+        except OSError:
+            pass
+    return empreintes
+
+
+def executer(operations, nom, dossier=DOSSIER_PIPELINE):
+    colonnes, fonction = ETAPES[nom]
+    empreintes = empreintes_colonnes(operations)
+    cle = hashlib.sha256(json.dumps({
+        'code': empreinte_fichier(os.path.abspath(__file__)),
+        'colonnes': {colonne: empreintes[colonne] for colonne in colonnes},
+    }, sort_keys=True).encode()).hexdigest()[:16]
+    chemin = os.path.join(dossier, '{}.{}.json'.format(nom, cle))
+    resultat = lire_json(chemin)
+    if resultat is None:
+        resultat = fonction(operations)
+        os.makedirs(dossier, exist_ok=True)
+        ecrire_json(chemin, resultat)
+    return resultat
+
+
+def _classes_durees(operations):
+    # -1 pour les durées hors classes, comme pd.cut.
+    durees = np.asarray(operations['Durée, en mois'], dtype=float)
+    classes = np.searchsorted(BORNES_DUREES, durees, side='left') - 1
+    return np.where((durees > BORNES_DUREES[0]) & (durees <= BORNES_DUREES[-1]), classes, -1)
+
+
+def _annees(dates):
+    return dates.astype('datetime64[Y]').astype(np.int64) + 1970
+
+
+def _pourcentage(part):
+    return '< 1%' if part < 0.01 else '{:.0f}%'.format(100 * part)
+
+
+@etape("Date de début de l'opération")
+def demarrages_par_annee(operations):
+    debuts = np.asarray(operations["Date de début de l'opération"])
+    annees = _annees(debuts[~np.isnat(debuts)])
+    annees = annees[(annees >= ANNEES[0]) & (annees <= ANNEES[-1])]
+    return {'annees': ANNEES, 'demarrages': np.bincount(annees - ANNEES[0], minlength=len(ANNEES)).tolist()}
+
+
+@etape("Date de début de l'opération", "Date de fin de l'opération", 'Durée, en mois')
+def operations_en_cours(operations):
+    # Balayage des intervalles : chaque opération ajoute +1 à son année de
+    # début et -1 à l'année suivant sa fin, dans un tableau de différences
+    # par classe de durée ; la somme cumulée donne le nombre d'opérations en
+    # cours chaque année, en une seule passe sur les données.
+    debuts = np.asarray(operations["Date de début de l'opération"])
+    fins = np.asarray(operations["Date de fin de l'opération"])
+    classes = _classes_durees(operations)
+    valides = ~np.isnat(debuts) & ~np.isnat(fins) & (classes >= 0)
+    debuts, fins, classes = _annees(debuts[valides]), _annees(fins[valides]), classes[valides]
+    retenues = (fins >= ANNEES[0]) & (debuts <= ANNEES[-1]) & (fins >= debuts)
+    debuts = np.clip(debuts[retenues], ANNEES[0], ANNEES[-1]) - ANNEES[0]
+    fins = np.clip(fins[retenues], ANNEES[0], ANNEES[-1]) - ANNEES[0]
+    classes = classes[retenues]
+
+    largeur = len(ANNEES) + 1
+    taille = (len(BORNES_DUREES) - 1) * largeur
+    differences = (np.bincount(classes * largeur + debuts, minlength=taille)
+                   - np.bincount(classes * largeur + fins + 1, minlength=taille)).reshape(-1, largeur)
+    en_cours = np.cumsum(differences, axis=1)[:, :-1]
+    return {'annees': ANNEES, 'series': en_cours.tolist()}
+
+
+@etape('Fonds', 'Durée, en mois')
+def durees_par_fonds(operations):
+    classes = _classes_durees(operations)
+    resultat = {}
+    for fonds in ('FEDER', 'FSE'):
+        retenues = classes[operations.masque('Fonds', fonds) & (classes >= 0)]
+        nombres = np.bincount(retenues, minlength=len(BORNES_DUREES) - 1)
+        resultat[fonds] = {'nombres': nombres.tolist(), 'parts': [_pourcentage(nombre / max(nombres.sum(), 1)) for nombre in nombres]}
+    return resultat
+
+
+@etape('Catégorie de région', 'catbeneficiaire', 'Montant UE programmé')
+def repartition_categories_region(operations):
+    # Part (en %) de chaque groupe de bénéficiaires dans les montants UE
+    # programmés de chaque catégorie de région.
+    categories = operations.modalites['Catégorie de région']
+    beneficiaires = operations.modalites['catbeneficiaire']
+    groupes = np.array([ORDRE_GROUPES.index(GROUPES_BENEFICIAIRES.get(beneficiaire, 'Autres')) for beneficiaire in beneficiaires.liste()] + [len(ORDRE_GROUPES) - 1])
+    codes_categories = np.asarray(operations['Catégorie de région'])
+    codes_groupes = groupes[np.asarray(operations['catbeneficiaire'])]
+    montants = np.nan_to_num(np.asarray(operations['Montant UE programmé'], dtype=float))
+    retenues = codes_categories >= 0
+    sommes = np.bincount(codes_categories[retenues] * len(ORDRE_GROUPES) + codes_groupes[retenues], weights=montants[retenues],
+                         minlength=len(categories) * len(ORDRE_GROUPES)).reshape(len(categories), len(ORDRE_GROUPES))
+    ordre = [categories.code(categorie) for categorie in ORDRE_CATEGORIES_REGION]
+    parts = np.zeros((len(ORDRE_CATEGORIES_REGION), len(ORDRE_GROUPES)))
+    for i, code in enumerate(ordre):
+        if code >= 0 and sommes[code].sum() > 0:
+            parts[i] = 100 * sommes[code] / sommes[code].sum()
+    return {'categories': ORDRE_CATEGORIES_REGION, 'groupes': {groupe: np.round(parts[:, j]).astype(int).tolist() for j, groupe in enumerate(ORDRE_GROUPES)}}
+
+
+def _normaliser(texte):
+    return unicodedata.normalize('NFKD', texte).encode('ascii', 'ignore').decode().lower()
+
+
+def _cle_region(nom):
+    return re.sub(r'^la ', '', re.sub(r'[^a-z]+', ' ', _normaliser(nom)).strip())
+
+
+_REGIONS = {_cle_region(region): region for region in REGIONS_PRE_NOTRE}
+
+
+def nom_region(nom):
+    # Nom de REGIONS_PRE_NOTRE correspondant, aux accents, apostrophes et
+    # article près (« Réunion », « Provence-Alpes-Côte d’Azur »…), ou None.
+    return _REGIONS.get(_cle_region(nom))
+
+
+@etape('Région (pre-NOTRe)', 'catbeneficiaire', 'Montant UE programmé')
+def concentration_regions(operations):
+    # Indice de Herfindahl-Hirschman (somme des carrés des parts en %) des
+    # montants UE programmés entre les 13 catégories de bénéficiaires
+    # déterminées, pour chaque région.
+    regions = operations.modalites['Région (pre-NOTRe)']
+    beneficiaires = operations.modalites['catbeneficiaire']
+    codes_regions = np.asarray(operations['Région (pre-NOTRe)'], dtype=np.int64)
+    codes_beneficiaires = np.asarray(operations['catbeneficiaire'], dtype=np.int64)
+    montants = np.nan_to_num(np.asarray(operations['Montant UE programmé'], dtype=float))
+    retenues = (codes_regions >= 0) & (codes_beneficiaires >= 0) & (codes_beneficiaires != beneficiaires.code(BENEFICIAIRE_INDETERMINE))
+    sommes = np.bincount(codes_regions[retenues] * len(beneficiaires) + codes_beneficiaires[retenues], weights=montants[retenues],
+                         minlength=len(regions) * len(beneficiaires)).reshape(len(regions), len(beneficiaires))
+    totaux = sommes.sum(axis=1)
+    parts = 100 * sommes / np.where(totaux > 0, totaux, 1)[:, None]
+    indices = (parts ** 2).sum(axis=1)
+    resultat = {}
+    for code, nom in enumerate(regions.liste()):
+        if nom_region(nom) and totaux[code] > 0:
+            resultat[nom_region(nom)] = round(float(indices[code]))
+    return {'regions': sorted(resultat), 'indices': [resultat[region] for region in sorted(resultat)]}
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+# Réponses précompressées : la page d'accueil, _dash-layout,
+# _dash-dependencies, les scripts des composants et les fichiers de assets/
+# ne changent pas pendant la vie du processus (sauf la page et _dash-layout
+# lors d'un rechargement des données, voir rechargement.py). Chacune est
+# générée une fois au démarrage, compressée une fois par encodage (Brotli au
+# niveau maximal, gzip) et servie telle quelle avec une ETag forte, au lieu
+# d'être resérialisée puis recompressée par Flask-Compress à chaque requête.
+# Une requête conditionnelle dont l'ETag correspond reçoit 304 sans corps.
+#
+# Les corps compressés sont aussi conservés sous cache/compression, rangés
+# par empreinte du contenu : un redémarrage sans changement ne recompresse
+# rien.
+
+import gzip
+import hashlib
+import os
+import re
+
+import brotli
+import flask
+from dash.fingerprint import check_fingerprint
+
+DOSSIER_COMPRESSION = os.path.join('cache', 'compression')
+# Ressources dont l'URL contient une empreinte ou une version : leur
+# contenu ne change jamais pour une URL donnée.
+DUREE_CACHE_IMMUABLE = 365 * 24 * 3600
+ENCODAGES = ['br', 'gzip']
+# Types compressés en plus de COMPRESS_MIMETYPES : Python 3.11 associe les
+# scripts .js à text/javascript, absent de la liste de Flask-Compress.
+TYPES_COMPRESSIBLES = {'text/javascript', 'image/svg+xml'}
+
+
+def _compresser(contenu, encodage):
+    if encodage == 'br':
+        return brotli.compress(contenu, quality=11)
+    return gzip.compress(contenu, compresslevel=9, mtime=0)
+
+
+class Reponse:
+
+    def __init__(self, contenu, mimetype, compressible, dossier=DOSSIER_COMPRESSION):
+        self.mimetype = mimetype
+        empreinte = hashlib.sha256(contenu).hexdigest()[:32]
+        self.corps = {'identity': contenu}
+        self.etags = {'identity': empreinte}
+        if compressible:
+            for encodage in ENCODAGES:
+                self.corps[encodage] = self._compresse(contenu, encodage, empreinte, dossier)
+                self.etags[encodage] = '{}-{}'.format(empreinte, encodage)
+
+    @staticmethod
+    def _compresse(contenu, encodage, empreinte, dossier):
+        chemin = os.path.join(dossier, '{}.{}'.format(empreinte, encodage))
+        try:
+            with open(chemin, 'rb') as fichier:
+                return fichier.read()
+        except OSError:
+            pass
+        compresse = _compresser(contenu, encodage)
+        try:
+            os.makedirs(dossier, exist_ok=True)
+            provisoire = '{}.{}.tmp'.format(chemin, os.getpid())
+            with open(provisoire, 'wb') as fichier:
+                fichier.write(compresse)
+            os.replace(provisoire, chemin)
+        except OSError:
+            pass
+        return compresse
+
+    def encodage(self, acceptes):
+        for encodage in ENCODAGES:
+            if encodage in self.corps and acceptes[encodage]:
+                return encodage
+        return 'identity'
+
+
+class ReponsesPrecompressees:
+    """Cache des réponses immuables d'une application Dash."""
+
+    def __init__(self, app, dossier=DOSSIER_COMPRESSION):
+        self.app = app
+        self.dossier = dossier
+        self.prefixe = app.config.routes_pathname_prefix
+        # Réponses énumérées par preparer() ; les autres chemins sont servis
+        # par Flask.
+        self.reponses = {}
+
+    def cle(self, chemin):
+        # Chemin sans l'empreinte des scripts des composants, ou None si la
+        # réponse n'est pas immuable.
+        if chemin in (self.prefixe, self.prefixe + '_dash-layout', self.prefixe + '_dash-dependencies'):
+            return chemin
+        if chemin.startswith(self.prefixe + '_dash-component-suites/') and not chemin.endswith('.map'):
+            dossier, fichier = chemin.rsplit('/', 1)
+            return dossier + '/' + check_fingerprint(fichier)[0]
+        if chemin.startswith(self.prefixe + self.app.config.assets_url_path.strip('/') + '/'):
+            return chemin
+        return None
+
+    def generer(self, cle):
+        # La vue est appelée directement, sans les hooks de Flask-Compress.
+        server = self.app.server
+        with server.test_request_context(cle):
+            server.try_trigger_before_first_request_functions()
+            reponse = server.make_response(server.dispatch_request())
+            if reponse.status_code != 200:
+                return None
+            reponse.direct_passthrough = False
+            contenu = reponse.get_data()
+        types = TYPES_COMPRESSIBLES.union(server.config['COMPRESS_MIMETYPES'])
+        compressible = reponse.mimetype in types and len(contenu) >= server.config['COMPRESS_MIN_SIZE']
+        return Reponse(contenu, reponse.mimetype, compressible, self.dossier)
+
+    def renouveler(self):
+        """Régénère la page et _dash-layout après un changement de version
+        (rechargement.py), puis les substitue en bloc aux anciennes."""
+        reponses = dict(self.reponses)
+        for cle in (self.prefixe, self.prefixe + '_dash-layout'):
+            reponses[cle] = self.generer(cle)
+        self.reponses = reponses
+
+    def preparer(self):
+        """Génère à l'avance les réponses de la page et de ses scripts."""
+        reponses = {self.prefixe: self.generer(self.prefixe)}
+        page = reponses[self.prefixe].corps['identity'].decode('utf-8')
+        cles = [self.prefixe + '_dash-layout', self.prefixe + '_dash-dependencies']
+        cles += [self.cle(url.split('?')[0]) for url in re.findall(r'(?:src|href)="([^"]*)"', page)]
+        # Morceaux chargés à la demande (async-graph.js…), absents de la page.
+        for espace, chemins in self.app.registered_paths.items():
+            cles += ['{}_dash-component-suites/{}/{}'.format(self.prefixe, espace, chemin) for chemin in sorted(chemins)]
+        for cle in cles:
+            if cle and self.cle(cle) == cle and cle not in reponses:
+                reponse = self.generer(cle)
+                # Une erreur (404…) reste servie par Flask.
+                if reponse is not None:
+                    reponses[cle] = reponse
+        self.reponses = reponses
+        return len(reponses)
+
+    def servir(self):
+        requete = flask.request
+        if requete.method not in ('GET', 'HEAD'):
+            return None
+        cle = self.cle(requete.path)
+        reponse = self.reponses.get(cle)
+        if reponse is None:
+            return None
+
+        encodage = reponse.encodage(requete.accept_encodings)
+        # Toutes les représentations ont le même contenu : l'ETag de l'une
+        # ou l'autre suffit.
+        if any(requete.if_none_match.contains(etag) for etag in reponse.etags.values()):
+            resultat = flask.Response(status=304)
+        else:
+            resultat = flask.Response(reponse.corps[encodage], mimetype=reponse.mimetype)
+            if encodage != 'identity':
+                resultat.headers['Content-Encoding'] = encodage
+        resultat.set_etag(reponse.etags[encodage])
+        resultat.vary.add('Accept-Encoding')
+        if cle != requete.path or requete.args.get('m'):
+            # Script à empreinte, ou fichier de assets/ versionné par Dash
+            # (?m=date de modification). En-tête écrit tel quel : la
+            # directive immutable n'a d'attribut que depuis Werkzeug 2.0.
+            resultat.headers['Cache-Control'] = 'public, max-age={:d}, immutable'.format(DUREE_CACHE_IMMUABLE)
+        else:
+            resultat.cache_control.no_cache = True
+        return resultat
+
+
+def installer(app):
+    reponses = ReponsesPrecompressees(app)
+    reponses.preparer()
+    app.server.before_request(reponses.servir)
+    return reponses
+
+
+def main():
+    # Remplit cache/compression avant le démarrage des workers.
+    os.environ['PRECOMPRESSION'] = '0'
+    from app import app
+
+    reponses = ReponsesPrecompressees(app)
+    print('{} réponses précompressées dans {}'.format(reponses.preparer(), reponses.dossier))
+
+
+if __name__ == '__main__':
+    main()
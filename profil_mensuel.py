@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+# Profil mensuel des contributions UE (graphique 10a) : le montant mensuel de
+# chaque opération est réparti sur ses mois de réalisation, du mois de début
+# au mois de fin inclus. Plutôt que de créer une ligne par opération et par
+# mois, chaque opération ajoute son montant mensuel au mois de début et le
+# retranche au mois suivant sa fin dans un tableau de différences, dont la
+# somme cumulée donne le profil : O(opérations + mois) en temps comme en
+# mémoire.
+
+import numpy as np
+import pandas as pd
+
+PREMIER_MOIS = '2014-01'
+DERNIER_MOIS = '2020-12'
+TAILLE_BLOC = 1 << 20
+
+
+def _mois(dates):
+    return dates.astype('datetime64[M]').astype(np.int64)
+
+
+def repartir(debuts, fins, montants_par_mois, premier_mois=PREMIER_MOIS, dernier_mois=DERNIER_MOIS, taille_bloc=TAILLE_BLOC):
+    """Somme, pour chaque mois de [premier_mois, dernier_mois], des montants
+    mensuels des opérations en cours ce mois-là."""
+    origine = _mois(np.datetime64(premier_mois))
+    nombre_mois = _mois(np.datetime64(dernier_mois)) - origine + 1
+    differences = np.zeros(nombre_mois + 1)
+    for debut in range(0, len(debuts), taille_bloc):
+        bloc = slice(debut, debut + taille_bloc)
+        d, f = np.asarray(debuts[bloc]), np.asarray(fins[bloc])
+        montants = np.nan_to_num(np.asarray(montants_par_mois[bloc], dtype=float))
+        valides = ~np.isnat(d) & ~np.isnat(f)
+        d, f, montants = _mois(d[valides]) - origine, _mois(f[valides]) - origine, montants[valides]
+        # Les opérations commencées avant la période ou finissant après sont
+        # tronquées ; celles entièrement en dehors sont ignorées.
+        retenues = (f >= 0) & (d < nombre_mois) & (f >= d)
+        d, f, montants = np.clip(d[retenues], 0, None), np.clip(f[retenues], None, nombre_mois - 1), montants[retenues]
+        differences += np.bincount(d, weights=montants, minlength=nombre_mois + 1)
+        differences -= np.bincount(f + 1, weights=montants, minlength=nombre_mois + 1)
+    return np.cumsum(differences[:-1])
+
+
+def profil_mensuel(operations, premier_mois=PREMIER_MOIS, dernier_mois=DERNIER_MOIS, lignes=None):
+    # Chaque série est ramenée sur [0, 1] entre son minimum et son maximum
+    # (0 % au mois le plus faible, 100 % au pic de réalisation), comme
+    # l'ancien data_montants_mois.csv.
+    # lignes : indices des opérations retenues (toutes par défaut).
+    mois = pd.period_range(premier_mois, dernier_mois, freq='M').strftime('%Y-%m')
+    profil = pd.DataFrame({'mois': mois})
+    for fonds in ('FEDER', 'FSE'):
+        masque = operations.masque('Fonds', fonds)
+        retenues = np.flatnonzero(masque) if lignes is None else lignes[masque[lignes]]
+        montants = repartir(operations["Date de début de l'opération"][retenues], operations["Date de fin de l'opération"][retenues],
+                            operations['Montant UE par mois'][retenues], premier_mois, dernier_mois)
+        etendue = montants.max() - montants.min()
+        profil[fonds + '_normalise'] = (montants - montants.min()) / etendue if etendue > 0 else montants * 0
+    return profil
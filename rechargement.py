@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+# Rechargement à chaud d'une nouvelle liste d'opérations, sans redémarrer les
+# workers. Un constructeur, processus distinct des workers, convertit le
+# CSV, calcule les figures et la mise en page (artefacts.py), l'index de
+# recherche, les entités, la base SQL et les réponses précompressées, puis
+# publie la version en remplaçant atomiquement le lien artefacts/courant.
+#
+# Chaque worker relit ce lien au plus une fois par RECHARGEMENT_PERIODE
+# secondes (2 par défaut). Quand il change, un thread prépare la nouvelle
+# version hors du chemin des requêtes (ouverture des colonnes projetées,
+# lecture de la mise en page, des index, des entités, de la base SQL et des
+# corps compressés), puis la substitue à l'ancienne par quelques
+# affectations. Les requêtes en cours terminent avec la version qu'elles ont
+# déjà obtenue ; les fichiers des versions précédentes restent en place
+# (artefacts.nettoyer).
+#
+#   python rechargement.py [--surveiller 60] [--conserver 3]
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from artefacts import (DOSSIER_ARTEFACTS, charger_gabarits, charger_layout, construire, dossier_courant, fixer_version, publier,
+                       version_attendue, version_courante, version_publiee)
+from fichiers import lire_json
+from instrumentation import phase
+from serialisation import script_gabarits
+
+PERIODE_VERIFICATION = float(os.environ.get('RECHARGEMENT_PERIODE', 2))
+
+
+def page_avec_gabarits(index_string, gabarits):
+    return index_string.replace('{%scripts%}', script_gabarits(gabarits) + '\n        {%scripts%}')
+
+
+def ouvrir_liste(version, dossier=DOSSIER_ARTEFACTS):
+    # Liste des opérations dont la version a été calculée, ou None pour les
+    # artefacts dont le manifeste ne la désigne pas.
+    from donnees import Operations
+
+    manifeste = lire_json(os.path.join(dossier, version, 'manifeste.json')) or {}
+    chemin = manifeste.get('operations')
+    if chemin and os.path.exists(os.path.join(chemin, 'colonnes.json')):
+        return Operations(chemin)
+    return None
+
+
+class Rechargement:
+    """Version des artefacts servie par un worker, et passage à la suivante."""
+
+    def __init__(self, app, differe=False, version=None):
+        from donnees import remplacer_operations
+
+        self.app = app
+        self.differe = differe
+        # Page sans les gabarits, complétée à chaque version.
+        self.page = app.index_string
+        self.reponses = None
+        self.verrou = threading.Lock()
+        self.en_cours = False
+        self.verifiee = time.monotonic()
+        self.version = version or version_courante()
+        fixer_version(self.version)
+        liste = ouvrir_liste(self.version) if self.version else None
+        if liste is not None:
+            remplacer_operations(liste)
+
+    def verifier(self):
+        # Appelée avant chaque requête ; ne la retarde jamais.
+        maintenant = time.monotonic()
+        if self.en_cours or maintenant - self.verifiee < PERIODE_VERIFICATION:
+            return None
+        self.verifiee = maintenant
+        version = version_publiee()
+        if version is None or version == self.version:
+            return None
+        with self.verrou:
+            if self.en_cours:
+                return None
+            self.en_cours = True
+        threading.Thread(target=self.basculer, args=(version,), daemon=True).start()
+        return None
+
+    def basculer(self, version):
+        from donnees import ouvrir_operations, remplacer_operations
+        from entites import ouvrir_entites
+        from recherche import ouvrir_index, ouvrir_ordres
+        from requetes import preparer_base
+
+        try:
+            with phase('rechargement'):
+                if dossier_courant(version=version) is None:
+                    print('Version {} introuvable, {} reste servie'.format(version, self.version), file=sys.stderr)
+                    return
+                liste = ouvrir_liste(version) or ouvrir_operations()
+                ouvrir_index(liste)
+                ouvrir_ordres(liste)
+                ouvrir_entites(liste)
+                preparer_base(liste)
+                layout = charger_layout(differe=self.differe, version=version)
+                page = page_avec_gabarits(self.page, charger_gabarits(version=version))
+
+                fixer_version(version)
+                remplacer_operations(liste)
+                self.app.layout = layout
+                self.app.index_string = page
+                if self.reponses is not None:
+                    self.reponses.renouveler()
+                ancienne, self.version = self.version, version
+            print('Version {} servie à la place de {}'.format(version, ancienne), file=sys.stderr)
+        except Exception as erreur:
+            # L'ancienne version reste servie ; nouvel essai à la prochaine
+            # vérification.
+            print('Rechargement de la version {} impossible : {!r}'.format(version, erreur), file=sys.stderr)
+        finally:
+            self.en_cours = False
+
+
+def installer(app, differe=False):
+    # ARTEFACTS_VERSION : version imposée, sans suivre le lien publié
+    # (préparation d'une version avant sa publication).
+    version = os.environ.get('ARTEFACTS_VERSION')
+    rechargement = Rechargement(app, differe, version)
+    if not version:
+        app.server.before_request(rechargement.verifier)
+    return rechargement
+
+
+def construire_version(conserver=3):
+    """Prépare puis publie la version correspondant aux données courantes."""
+    import precompression
+    from donnees import operations
+    from entites import ouvrir_entites
+    from recherche import ouvrir_index, ouvrir_ordres
+    from requetes import preparer_base
+
+    version, destination = construire(conserver=conserver, publication=False)
+    if version == version_publiee():
+        return version, False
+    liste = operations()
+    ouvrir_index(liste)
+    ouvrir_ordres(liste)
+    ouvrir_entites(liste)
+    preparer_base(liste)
+    # Corps compressés de la page et de la mise en page de cette version,
+    # relus ensuite par les workers dans cache/compression.
+    os.environ['ARTEFACTS_VERSION'] = version
+    precompression.main()
+    publier(version)
+    return version, True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Construit et publie une nouvelle version des données, servie sans redémarrage.')
+    parser.add_argument('--conserver', type=int, default=3, help='nombre de versions conservées')
+    parser.add_argument('--surveiller', type=float, metavar='SECONDES', help='reconstruit à chaque changement des données, vérifié à cet intervalle')
+    args = parser.parse_args()
+    if not args.surveiller:
+        debut = time.perf_counter()
+        version, publiee = construire_version(args.conserver)
+        print('Version {} {} ({:.1f} s)'.format(version, 'publiée' if publiee else 'déjà servie', time.perf_counter() - debut))
+        return
+    while True:
+        try:
+            a_jour = version_attendue() == version_publiee()
+        except FileNotFoundError:
+            a_jour = True
+        if not a_jour:
+            # Un processus neuf par version : rien n'est réutilisé des
+            # calculs précédents.
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--conserver', str(args.conserver)])
+        time.sleep(args.surveiller)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+
+# Recherche des opérations par mots de l'intitulé du projet ou du nom du
+# bénéficiaire. Un index inversé (liste triée des opérations contenant
+# chaque mot) est construit une fois par version des deux colonnes et
+# écrit sous cache/recherche en fichiers .npy, projetés en mémoire à
+# l'ouverture comme les colonnes du cache des opérations. Les mots sont
+# comparés sans accents ni majuscules ; le dernier mot de la requête est
+# complété (« entrepr » trouve « entreprise », « entreprises »…).
+#
+# Les résultats sont comptés par fonds, thématique, catégorie de
+# bénéficiaire et région ; le compte d'une facette ignore la sélection
+# faite dans cette facette, pour indiquer ce qu'ajouterait chaque modalité.
+#
+# Le tableau est trié côté serveur : l'ordre des opérations selon chaque
+# colonne (et le rang de chaque opération dans cet ordre) est calculé une
+# fois et projeté en mémoire comme l'index. Sans requête, une page est une
+# tranche de cet ordre, quelle que soit sa position dans la liste ; avec une
+# requête, seuls les résultats sont triés, d'après leurs rangs.
+#
+#   python recherche.py [requête…]
+
+import argparse
+import bisect
+import functools
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import unicodedata
+
+import numpy as np
+from dash.dependencies import Input, Output, State
+
+from fichiers import ecrire_json, empreinte_fichier, lire_json
+
+ID_RECHERCHE = 'recherche'
+DOSSIER_RECHERCHE = os.path.join('cache', 'recherche')
+COLONNES_TEXTE = ['Intitulé du projet', 'Nom du bénéficiaire']
+FACETTES = {
+    'fonds': 'Fonds',
+    'themes': 'themeprojet',
+    'beneficiaires': 'catbeneficiaire',
+    'regions': "Région de l'opération",
+}
+COLONNES_RESULTATS = ['Intitulé du projet', 'Nom du bénéficiaire', 'Fonds', "Région de l'opération", 'themeprojet',
+                      'Montant UE programmé', 'Total des dépenses éligibles', 'Taux de cofinancement', 'Durée, en mois']
+TAILLE_PAGE = 20
+# Longueur minimale du dernier mot pour qu'il soit complété.
+LONGUEUR_PREFIXE = 3
+MOTS_VIDES = frozenset('a au aux avec d dans de des du en et l la le les ou par pour sur un une'.split())
+LIGATURES = str.maketrans({'œ': 'oe', 'æ': 'ae', 'ß': 'ss'})
+
+
+def normaliser(texte):
+    texte = unicodedata.normalize('NFKD', texte.lower().translate(LIGATURES))
+    return ''.join(caractere for caractere in texte if not unicodedata.combining(caractere))
+
+
+def mots(texte):
+    return [mot for mot in re.findall(r'[a-z0-9]+', normaliser(texte)) if mot not in MOTS_VIDES]
+
+
+def _paires(operations, colonne, termes):
+    # (terme, opération) pour chaque mot de chaque opération ; les mots sont
+    # extraits une fois par modalité de la colonne, non par opération.
+    modalites = operations.modalites[colonne]
+    par_modalite = [sorted({termes.setdefault(mot, len(termes)) for mot in mots(modalite)}) for modalite in modalites.liste()]
+    longueurs = np.array([len(ids) for ids in par_modalite] + [0], dtype=np.int64)
+    plats = np.fromiter((terme for ids in par_modalite for terme in ids), dtype=np.int64, count=int(longueurs.sum()))
+    debuts = np.concatenate([[0], np.cumsum(longueurs)[:-1]])
+    codes = np.asarray(operations[colonne], dtype=np.int64)
+    codes = np.where(codes < 0, len(modalites), codes)
+    nombres = longueurs[codes]
+    total = int(nombres.sum())
+    positions = np.repeat(debuts[codes] - (np.cumsum(nombres) - nombres), nombres) + np.arange(total)
+    return plats[positions], np.repeat(np.arange(len(codes), dtype=np.int64), nombres)
+
+
+def construire_index(operations, destination):
+    termes = {}
+    paires = [_paires(operations, colonne, termes) for colonne in COLONNES_TEXTE]
+    vocabulaire = sorted(termes)
+    rangs = np.empty(len(termes), dtype=np.int64)
+    rangs[[termes[mot] for mot in vocabulaire]] = np.arange(len(vocabulaire))
+    # Paires dédoublonnées et triées par terme puis par opération.
+    cles = np.unique(np.concatenate([rangs[ids] * len(operations) + lignes for ids, lignes in paires]))
+    lignes = (cles % len(operations)).astype(np.int32)
+    debuts = np.searchsorted(cles // len(operations), np.arange(len(vocabulaire) + 1))
+
+    encodes = [mot.encode('utf-8') for mot in vocabulaire]
+    decalages = np.zeros(len(encodes) + 1, dtype=np.int64)
+    np.cumsum([len(mot) for mot in encodes], out=decalages[1:])
+    os.makedirs(destination)
+    np.save(os.path.join(destination, 'vocabulaire.npy'), np.frombuffer(b''.join(encodes), dtype=np.uint8), allow_pickle=False)
+    np.save(os.path.join(destination, 'decalages.npy'), decalages, allow_pickle=False)
+    np.save(os.path.join(destination, 'debuts.npy'), debuts, allow_pickle=False)
+    np.save(os.path.join(destination, 'lignes.npy'), lignes, allow_pickle=False)
+    ecrire_json(os.path.join(destination, 'index.json'), {'lignes': len(operations), 'termes': len(vocabulaire), 'paires': len(lignes)})
+
+
+def _membres(tableau, trie):
+    # Éléments de tableau présents dans trie (tous deux triés, sans doublon).
+    if not len(trie):
+        return tableau[:0]
+    positions = np.minimum(np.searchsorted(trie, tableau), len(trie) - 1)
+    return tableau[trie[positions] == tableau]
+
+
+class Index:
+    """Index inversé projeté en mémoire, en lecture seule."""
+
+    def __init__(self, dossier):
+        from donnees import Modalites
+
+        def charger(nom):
+            return np.load(os.path.join(dossier, nom), mmap_mode='r', allow_pickle=False)
+
+        self.dossier = dossier
+        self.vocabulaire = Modalites(charger('vocabulaire.npy'), charger('decalages.npy'))
+        self.debuts = charger('debuts.npy')
+        self.lignes = charger('lignes.npy')
+
+    def _occurrences(self, debut, fin):
+        return self.lignes[self.debuts[debut]:self.debuts[fin]]
+
+    def occurrences(self, mot, prefixe=False):
+        """Opérations contenant le mot (ou un mot qui commence par lui)."""
+        debut = bisect.bisect_left(self.vocabulaire, mot)
+        if not prefixe:
+            fin = debut + 1 if debut < len(self.vocabulaire) and self.vocabulaire[debut] == mot else debut
+            return self._occurrences(debut, fin)
+        # '{' suit 'z' : tous les mots de l'index commençant par mot sont
+        # avant mot + '{'.
+        fin = bisect.bisect_left(self.vocabulaire, mot + '{', debut)
+        if fin - debut <= 1:
+            return self._occurrences(debut, fin)
+        return np.unique(self._occurrences(debut, fin))
+
+    def rechercher(self, texte):
+        """Opérations contenant tous les mots du texte, triées ; None si le
+        texte ne contient aucun mot."""
+        liste = mots(texte)
+        if not liste:
+            return None
+        complet = not texte or not texte[-1].isalnum()
+        ensembles = [self.occurrences(mot, prefixe=(i == len(liste) - 1 and not complet and len(mot) >= LONGUEUR_PREFIXE))
+                     for i, mot in enumerate(liste)]
+        ensembles.sort(key=len)
+        resultat = np.asarray(ensembles[0])
+        for ensemble in ensembles[1:]:
+            resultat = _membres(resultat, ensemble)
+        return resultat
+
+
+def dossier_index(operations, dossier=DOSSIER_RECHERCHE):
+    # Nommé d'après les empreintes des colonnes indexées et le code de ce
+    # module.
+    from pipeline import empreintes_colonnes
+
+    empreintes = empreintes_colonnes(operations)
+    cle = hashlib.sha256(json.dumps({
+        'code': empreinte_fichier(os.path.abspath(__file__)),
+        'colonnes': {colonne: empreintes[colonne] for colonne in COLONNES_TEXTE},
+    }, sort_keys=True).encode()).hexdigest()[:16]
+    return os.path.join(dossier, cle)
+
+
+def _preparer(destination, construire, operations):
+    # Écrit dans un dossier provisoire puis renommé, comme le cache des
+    # opérations.
+    if not os.path.exists(os.path.join(destination, 'index.json')):
+        provisoire = '{}.{}.tmp'.format(destination, os.getpid())
+        shutil.rmtree(provisoire, ignore_errors=True)
+        try:
+            construire(operations, provisoire)
+            os.rename(provisoire, destination)
+        except OSError:
+            # Un autre processus a écrit le dossier en même temps.
+            if not os.path.exists(os.path.join(destination, 'index.json')):
+                raise
+        finally:
+            shutil.rmtree(provisoire, ignore_errors=True)
+    return destination
+
+
+def ouvrir_index(operations, dossier=DOSSIER_RECHERCHE):
+    return Index(_preparer(dossier_index(operations, dossier), construire_index, operations))
+
+
+def construire_ordres(operations, destination):
+    # Pour chaque colonne : les opérations triées par valeur croissante, les
+    # valeurs manquantes en dernier (ordre), et la position de chaque
+    # opération dans cet ordre (rang).
+    os.makedirs(destination)
+    manquantes = {}
+    for i, colonne in enumerate(COLONNES_RESULTATS):
+        valeurs = np.asarray(operations[colonne])
+        if colonne in operations.modalites:
+            # Les modalités sont triées : l'ordre des codes est l'ordre
+            # alphabétique.
+            absentes = valeurs < 0
+            valeurs = np.where(absentes, len(operations.modalites[colonne]), valeurs)
+        else:
+            absentes = np.isnan(valeurs.astype(float))
+        ordre = np.argsort(valeurs, kind='stable').astype(np.int32)
+        rang = np.empty(len(ordre), dtype=np.int32)
+        rang[ordre] = np.arange(len(ordre), dtype=np.int32)
+        np.save(os.path.join(destination, '{}.ordre.npy'.format(i)), ordre, allow_pickle=False)
+        np.save(os.path.join(destination, '{}.rang.npy'.format(i)), rang, allow_pickle=False)
+        manquantes[colonne] = int(absentes.sum())
+    ecrire_json(os.path.join(destination, 'index.json'), {'lignes': len(operations), 'manquantes': manquantes})
+
+
+class Ordres:
+    """Ordres de tri des colonnes du tableau, projetés en mémoire."""
+
+    def __init__(self, dossier):
+        self.dossier = dossier
+        self.manquantes = lire_json(os.path.join(dossier, 'index.json'))['manquantes']
+        self.ordres, self.rangs = {}, {}
+        for i, colonne in enumerate(COLONNES_RESULTATS):
+            self.ordres[colonne] = np.load(os.path.join(dossier, '{}.ordre.npy'.format(i)), mmap_mode='r', allow_pickle=False)
+            self.rangs[colonne] = np.load(os.path.join(dossier, '{}.rang.npy'.format(i)), mmap_mode='r', allow_pickle=False)
+
+    def tranche(self, colonne, descendant, debut, fin):
+        """Opérations aux positions [debut, fin) de la liste complète triée ;
+        les valeurs manquantes restent en dernier dans les deux sens."""
+        ordre = self.ordres[colonne]
+        if not descendant:
+            return np.asarray(ordre[debut:fin])
+        valides = len(ordre) - self.manquantes[colonne]
+        # Positions 0…valides-1 : valeurs connues, de la plus grande à la
+        # plus petite ; ensuite les valeurs manquantes, dans l'ordre.
+        positions = np.arange(debut, min(fin, len(ordre)))
+        return np.asarray(ordre[np.where(positions < valides, valides - 1 - positions, positions)])
+
+    def trier(self, colonne, descendant, lignes, fin):
+        # Les fin premières opérations de lignes dans l'ordre de la colonne :
+        # seules celles-ci sont triées, après np.argpartition.
+        rangs = np.asarray(self.rangs[colonne][lignes], dtype=np.int64)
+        if descendant:
+            valides = len(self.rangs[colonne]) - self.manquantes[colonne]
+            rangs = np.where(rangs < valides, valides - 1 - rangs, rangs)
+        # Les rangs sont tous distincts : le tri partiel est exact.
+        premieres = np.argpartition(rangs, fin - 1)[:fin] if 0 < fin < len(rangs) else np.arange(len(rangs))
+        return lignes[premieres[np.argsort(rangs[premieres])]]
+
+
+def ouvrir_ordres(operations, dossier=DOSSIER_RECHERCHE):
+    from pipeline import empreintes_colonnes
+
+    empreintes = empreintes_colonnes(operations)
+    cle = hashlib.sha256(json.dumps({
+        'code': empreinte_fichier(os.path.abspath(__file__)),
+        'colonnes': {colonne: empreintes[colonne] for colonne in COLONNES_RESULTATS},
+    }, sort_keys=True).encode()).hexdigest()[:16]
+    return Ordres(_preparer(os.path.join(dossier, 'ordres-' + cle), construire_ordres, operations))
+
+
+@functools.lru_cache(maxsize=4)
+def _comptes_complets(operations):
+    return selectionner(operations, None, {})[1]
+
+
+def selectionner(operations, lignes, choix):
+    """Opérations retenues par les modalités choisies dans chaque facette,
+    et comptes de chaque facette : {nom: tableau, la dernière case comptant
+    les valeurs manquantes}."""
+    # Codes dans leur type d'origine (int8 le plus souvent), sans copie
+    # quand toutes les opérations sont retenues.
+    codes = {nom: operations[colonne] if lignes is None else operations[colonne][lignes] for nom, colonne in FACETTES.items()}
+    masques = {}
+    for nom, valeurs in choix.items():
+        if valeurs:
+            masques[nom] = np.zeros(len(codes[nom]), dtype=bool)
+            for valeur in valeurs:
+                code = operations.modalites[FACETTES[nom]].code(valeur)
+                if code >= 0:
+                    masques[nom] |= codes[nom] == code
+    comptes = {}
+    for nom, colonne in FACETTES.items():
+        autres = [masque for autre, masque in masques.items() if autre != nom]
+        valeurs = codes[nom][np.logical_and.reduce(autres)] if autres else codes[nom]
+        # Codes décalés d'un cran : les valeurs manquantes (-1) sont comptées
+        # dans la première case, replacée ensuite en dernier.
+        comptes[nom] = np.roll(np.bincount(valeurs + 1, minlength=len(operations.modalites[colonne]) + 1), -1)
+    if masques:
+        retenues = np.logical_and.reduce(list(masques.values()))
+        lignes = np.flatnonzero(retenues) if lignes is None else lignes[retenues]
+    return lignes, comptes
+
+
+def _texte(modalite):
+    # Certaines thématiques contiennent un saut de ligne pour les graphiques.
+    return modalite.replace('<br>', ' ')
+
+
+def lignes_tableau(operations, lignes):
+    resultats = []
+    for ligne in lignes:
+        resultat = {}
+        for colonne in COLONNES_RESULTATS:
+            valeur = operations[colonne][ligne]
+            if colonne in operations.modalites:
+                resultat[colonne] = _texte(operations.modalites[colonne][valeur]) if valeur >= 0 else None
+            else:
+                resultat[colonne] = None if np.isnan(valeur) else valeur.item()
+        resultats.append(resultat)
+    return resultats
+
+
+def rechercher(operations, index, texte='', choix=None, page=0, taille_page=TAILLE_PAGE, ordres=None, tri=None):
+    """Page de résultats ; tri : (colonne, décroissant) ou None pour l'ordre
+    de la liste."""
+    lignes = index.rechercher(texte or '')
+    if lignes is None and not any((choix or {}).values()):
+        # Liste complète : les comptes ne changent pas d'une page à l'autre.
+        comptes = _comptes_complets(operations)
+    else:
+        lignes, comptes = selectionner(operations, lignes, choix or {})
+    total = len(operations) if lignes is None else len(lignes)
+    debut, fin = page * taille_page, min((page + 1) * taille_page, total)
+    if lignes is None:
+        page_lignes = ordres.tranche(*tri, debut, fin) if tri else np.arange(debut, fin)
+    else:
+        page_lignes = (ordres.trier(*tri, lignes, fin) if tri else lignes)[debut:fin]
+    return {'total': total, 'lignes': lignes_tableau(operations, page_lignes), 'comptes': comptes}
+
+
+def options_recherche(operations):
+    # Modalités des facettes et première page de la liste, insérées dans
+    # la mise en page.
+    return {
+        'facettes': {nom: operations.modalites[colonne].liste() for nom, colonne in FACETTES.items()},
+        'total': len(operations),
+        'lignes': lignes_tableau(operations, range(min(TAILLE_PAGE, len(operations)))),
+    }
+
+
+def libelle_nombre(nombre):
+    return '{:,}'.format(nombre).replace(',', ' ')
+
+
+def libelle_compte(total):
+    return '{} opération{}'.format(libelle_nombre(total), 's' if total > 1 else '')
+
+
+def nombre_pages(total):
+    return max(1, -(-total // TAILLE_PAGE))
+
+
+def enregistrer(app):
+    # L'index est ouvert à la première recherche, dans chaque worker (les
+    # pages projetées sont partagées), puis à nouveau si la liste change
+    # (rechargement.py).
+    etat = {'courant': (None, None, None)}
+
+    def ouvrir():
+        from donnees import operations
+
+        liste = operations()
+        if etat['courant'][0] is not liste:
+            etat['courant'] = liste, ouvrir_index(liste), ouvrir_ordres(liste)
+        return etat['courant']
+
+    entrees = [Input('recherche_texte', 'value')] + [Input('recherche_' + nom, 'value') for nom in FACETTES]
+    entrees.append(Input('recherche_resultats', 'sort_by'))
+
+    # Toute nouvelle requête ou tout nouveau tri revient à la première page,
+    # qui déclenche l'affichage des résultats.
+    @app.callback(Output('recherche_resultats', 'page_current'), entrees, prevent_initial_call=True)
+    def nouvelle_recherche(*_):
+        return 0
+
+    @app.callback([Output('recherche_resultats', 'data'), Output('recherche_resultats', 'page_count'), Output('recherche_compte', 'children')]
+                  + [Output('recherche_' + nom, 'options') for nom in FACETTES],
+                  [Input('recherche_resultats', 'page_current')],
+                  [State('recherche_texte', 'value')] + [State('recherche_' + nom, 'value') for nom in FACETTES]
+                  + [State('recherche_resultats', 'sort_by')],
+                  prevent_initial_call=True)
+    def afficher(page, texte, *selections):
+        *selections, tri = selections
+        operations, index, ordres = ouvrir()
+        tri = (tri[0]['column_id'], tri[0]['direction'] == 'desc') if tri and tri[0]['column_id'] in ordres.ordres else None
+        resultat = rechercher(operations, index, texte, dict(zip(FACETTES, selections)), page or 0, ordres=ordres, tri=tri)
+        options = []
+        for nom, colonne in FACETTES.items():
+            modalites = operations.modalites[colonne].liste()
+            options.append([{'label': '{} ({})'.format(_texte(modalite), libelle_nombre(int(nombre))), 'value': modalite}
+                            for modalite, nombre in zip(modalites, resultat['comptes'][nom])])
+        return [resultat['lignes'], nombre_pages(resultat['total']), libelle_compte(resultat['total'])] + options
+
+
+def main():
+    from donnees import operations
+
+    parser = argparse.ArgumentParser(description='Construit l’index de recherche des opérations et l’interroge.')
+    parser.add_argument('requete', nargs='*')
+    args = parser.parse_args()
+    debut = time.perf_counter()
+    liste = operations()
+    index = ouvrir_index(liste)
+    ouvrir_ordres(liste)
+    description = lire_json(os.path.join(index.dossier, 'index.json'))
+    print('Index {} : {} mots, {} occurrences ({:.2f} s)'.format(index.dossier, description['termes'], description['paires'], time.perf_counter() - debut))
+    if args.requete:
+        debut = time.perf_counter()
+        resultat = rechercher(liste, index, ' '.join(args.requete))
+        print('{} opérations ({:.2f} ms)'.format(resultat['total'], (time.perf_counter() - debut) * 1000))
+        for ligne in resultat['lignes']:
+            print(' - {} — {}'.format(ligne['Intitulé du projet'], ligne['Nom du bénéficiaire']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+
+# Requêtes SQL sur les opérations. Les colonnes du cache sont recopiées une
+# fois par version dans une base SQLite (cache/sql/<empreinte>.sqlite),
+# indexée sur le fonds, la catégorie de bénéficiaire, la thématique, la
+# région et la date de début. Les questions récurrentes sont des requêtes
+# nommées (REQUETES) dont les paramètres restreignent les opérations ; leurs
+# résultats sont conservés dans le cache partagé des résultats.
+#
+#   /sql/<nom>?fonds=FSE&region=Bretagne&debut=2016-01-01   requête nommée (JSON)
+#   /sql  (POST {"requete": "SELECT …", "parametres": {…}})   requête libre, avec le jeton SQL_JETON
+#
+# Toute requête s'exécute sur une connexion en lecture seule, ne peut que
+# lire (SELECT), est interrompue après SQL_DUREE_MAX secondes (2 par défaut)
+# et renvoie au plus SQL_LIGNES_MAX lignes (10 000) : une requête lourde
+# n'immobilise pas un worker.
+#
+#   python requetes.py [--nom contributions_10m | "SELECT …"] [parametre=valeur…]
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from fichiers import empreinte_fichier
+
+DOSSIER_SQL = os.path.join('cache', 'sql')
+COLONNES_INDEXEES = ['Fonds', 'catbeneficiaire', 'themeprojet', "Région de l'opération", "Date de début de l'opération"]
+DUREE_MAX = float(os.environ.get('SQL_DUREE_MAX', 2))
+LIGNES_MAX = int(os.environ.get('SQL_LIGNES_MAX', 10000))
+# Nombre d'instructions de la machine virtuelle de SQLite entre deux
+# vérifications de la durée.
+INSTRUCTIONS_VERIFICATION = 10000
+# Jeton attendu dans l'en-tête X-Jeton-SQL des requêtes libres ; sans lui,
+# elles sont refusées. L'adresse du client ne suffit pas : derrière un proxy
+# de la même machine, toutes les requêtes viennent de 127.0.0.1.
+JETON = os.environ.get('SQL_JETON')
+TYPES_SQL = {'texte': 'TEXT', 'categorie': 'TEXT', 'date': 'TEXT'}
+# Opérations autorisées par l'autorisateur de SQLite : lecture seule.
+ACTIONS_AUTORISEES = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, getattr(sqlite3, 'SQLITE_RECURSIVE', 33)}
+
+# Paramètres communs aux requêtes nommées et condition de chacun. Seules
+# les conditions des paramètres fournis figurent dans la requête, pour que
+# SQLite puisse se servir des index.
+FILTRES = {
+    'fonds': '"Fonds" = :fonds',
+    'region': '"Région de l\'opération" = :region',
+    'debut': '"Date de début de l\'opération" >= :debut',
+    'fin': '"Date de début de l\'opération" <= :fin',
+}
+# Taille maximale de la projection en mémoire de la base (PRAGMA mmap_size) :
+# les pages lues sont partagées par les workers comme les colonnes du cache.
+TAILLE_PROJECTION = 1 << 30
+
+# Requêtes nommées : (texte SQL, paramètres propres et leur valeur par
+# défaut).
+REQUETES = {
+    # Section 3 : montants par thématique et catégorie de bénéficiaire.
+    'beneficiaires_thematiques': ('''
+        SELECT themeprojet, catbeneficiaire, SUM("Montant UE programmé") AS montant
+        FROM operations WHERE {filtres}
+        GROUP BY themeprojet, catbeneficiaire ORDER BY themeprojet, catbeneficiaire''', {}),
+    # Section 4 : nombre d'opérations par palier et catégorie de bénéficiaire.
+    # Les paliers sont ceux des graphiques (paliers.py), recalculés parmi les
+    # opérations retenues, et non la colonne Palier du CSV. Regroupement par
+    # position : « Palier » y désignerait la colonne du CSV.
+    'paliers': ('''
+        SELECT "Fonds",
+               CASE WHEN "Montant UE programmé" >= CASE "Fonds" WHEN 'FEDER' THEN :seuil_feder ELSE :seuil_fse END
+                    THEN 'P2' ELSE 'P1' END AS "Palier",
+               catbeneficiaire, COUNT(*) AS nombre
+        FROM operations
+        WHERE "Fonds" IN ('FEDER', 'FSE') AND "Montant UE programmé" IS NOT NULL AND {filtres}
+        GROUP BY 1, 2, 3 ORDER BY 1, 2, 3''', {}),
+    # Section 6 : montants par catégorie de région (dont les régions
+    # ultrapériphériques) et catégorie de bénéficiaire.
+    'categories_region': ('''
+        SELECT "Catégorie de région", catbeneficiaire, SUM("Montant UE programmé") AS montant
+        FROM operations WHERE "Catégorie de région" IS NOT NULL AND {filtres}
+        GROUP BY "Catégorie de région", catbeneficiaire ORDER BY "Catégorie de région", catbeneficiaire''', {}),
+    # Section 8 : opérations de plus de 10 M€ hors instruments financiers.
+    'contributions_10m': ('''
+        SELECT themeprojet, COUNT(*) AS nombre, SUM("Montant UE programmé") AS montant,
+               SUM("Total des dépenses éligibles") AS depenses_eligibles
+        FROM operations
+        WHERE NOT "Instrument financier ?" AND "Montant UE programmé" > :seuil AND themeprojet IS NOT NULL AND {filtres}
+        GROUP BY themeprojet ORDER BY themeprojet''', {'seuil': 10000000}),
+    # Section 9 : montants par catégorie d'instrument financier.
+    'instruments_financiers': ('''
+        SELECT "Catégorie d'instrument financier", SUM("Montant UE programmé") AS montant
+        FROM operations
+        WHERE "Instrument financier ?" AND "Catégorie d'instrument financier" IS NOT NULL AND {filtres}
+        GROUP BY "Catégorie d'instrument financier" ORDER BY "Catégorie d'instrument financier"''', {}),
+}
+
+
+def _identifiant(nom):
+    return '"{}"'.format(nom.replace('"', '""'))
+
+
+def chemin_base(operations, dossier=DOSSIER_SQL):
+    # Nommée d'après les empreintes des colonnes et le code de ce module.
+    from pipeline import empreintes_colonnes
+
+    cle = hashlib.sha256(json.dumps({
+        'code': empreinte_fichier(os.path.abspath(__file__)),
+        'colonnes': empreintes_colonnes(operations),
+    }, sort_keys=True).encode()).hexdigest()[:16]
+    return os.path.join(dossier, cle + '.sqlite')
+
+
+def construire_base(operations, chemin):
+    from export_donnees import table_operations
+
+    colonnes = list(operations.colonnes)
+    connexion = sqlite3.connect(chemin)
+    try:
+        connexion.execute('PRAGMA journal_mode = OFF')
+        connexion.execute('PRAGMA synchronous = OFF')
+        definitions = ', '.join('{} {}'.format(_identifiant(colonne), TYPES_SQL.get(operations.types[colonne], 'NUMERIC')) for colonne in colonnes)
+        connexion.execute('CREATE TABLE operations ({})'.format(definitions))
+        _, lignes = table_operations(operations, None, colonnes)
+        connexion.executemany('INSERT INTO operations VALUES ({})'.format(', '.join('?' * len(colonnes))), lignes)
+        for i, colonne in enumerate(COLONNES_INDEXEES):
+            connexion.execute('CREATE INDEX index_{} ON operations ({})'.format(i, _identifiant(colonne)))
+        # Statistiques des index pour le planificateur.
+        connexion.execute('ANALYZE')
+        connexion.commit()
+    finally:
+        connexion.close()
+
+
+def preparer_base(operations, dossier=DOSSIER_SQL):
+    chemin = chemin_base(operations, dossier)
+    if not os.path.exists(chemin):
+        os.makedirs(dossier, exist_ok=True)
+        provisoire = '{}.{}.tmp'.format(chemin, os.getpid())
+        try:
+            construire_base(operations, provisoire)
+            os.replace(provisoire, chemin)
+        finally:
+            if os.path.exists(provisoire):
+                os.remove(provisoire)
+    return chemin
+
+
+def _autoriser(action, *_):
+    return sqlite3.SQLITE_OK if action in ACTIONS_AUTORISEES else sqlite3.SQLITE_DENY
+
+
+class Base:
+    """Base SQLite des opérations, une connexion en lecture seule par thread."""
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.local = threading.local()
+
+    def connexion(self):
+        connexion = getattr(self.local, 'connexion', None)
+        if connexion is None:
+            connexion = sqlite3.connect('file:{}?mode=ro'.format(os.path.abspath(self.chemin)), uri=True)
+            connexion.execute('PRAGMA query_only = ON')
+            connexion.execute('PRAGMA mmap_size = {:d}'.format(TAILLE_PROJECTION))
+            connexion.set_authorizer(_autoriser)
+            self.local.connexion = connexion
+        return connexion
+
+    def executer(self, requete, parametres=(), duree_max=DUREE_MAX, lignes_max=LIGNES_MAX):
+        """Colonnes et lignes du résultat ; lève TimeoutError au-delà de
+        duree_max secondes et sqlite3.Error pour une requête invalide ou
+        interdite."""
+        connexion = self.connexion()
+        limite = time.monotonic() + duree_max
+        # Une valeur vraie renvoyée par le gestionnaire interrompt la requête.
+        connexion.set_progress_handler(lambda: time.monotonic() > limite, INSTRUCTIONS_VERIFICATION)
+        debut = time.perf_counter()
+        try:
+            curseur = connexion.execute(requete, parametres)
+            lignes = curseur.fetchmany(lignes_max + 1)
+        except sqlite3.OperationalError as erreur:
+            if time.monotonic() > limite:
+                raise TimeoutError('requête interrompue après {:g} s'.format(duree_max)) from erreur
+            raise
+        finally:
+            connexion.set_progress_handler(None, 0)
+        return {
+            'colonnes': [description[0] for description in curseur.description or []],
+            'lignes': [list(ligne) for ligne in lignes[:lignes_max]],
+            'tronque': len(lignes) > lignes_max,
+            'duree': time.perf_counter() - debut,
+        }
+
+
+def parametres_requete(nom, valeurs):
+    # Paramètres complets d'une requête nommée ; ValueError pour un
+    # paramètre inconnu.
+    _, propres = REQUETES[nom]
+    inconnus = set(valeurs) - set(FILTRES) - set(propres)
+    if inconnus:
+        raise ValueError('paramètres inconnus : {}'.format(', '.join(sorted(inconnus))))
+    parametres = dict(propres)
+    for cle, valeur in valeurs.items():
+        parametres[cle] = type(propres[cle])(valeur) if cle in propres else valeur
+    return parametres
+
+
+def seuils_paliers(operations, parametres):
+    # Seuils des projets « d'ampleur » parmi les opérations de la région et
+    # de la période demandées, comme pour les graphiques filtrés.
+    from filtres import COLONNES_FILTRES, selection
+    from paliers import paliers
+
+    region = parametres.get('region')
+    # Une région absente de la liste aurait le code des valeurs manquantes.
+    if region and operations.modalites[COLONNES_FILTRES['regions']].code(region) < 0:
+        raise ValueError('région inconnue : {}'.format(region))
+    filtres = ((region,) if region else (), (), (), parametres.get('debut'), parametres.get('fin'))
+    seuils = paliers(operations).seuils(selection(operations, filtres))
+    return {'seuil_feder': seuils['FEDER'], 'seuil_fse': seuils['FSE']}
+
+
+# Paramètres des requêtes nommées calculés à partir des opérations.
+PARAMETRES_CALCULES = {'paliers': seuils_paliers}
+
+
+def executer_requete(base, nom, valeurs=None, operations=None):
+    # operations : liste dont la base est tirée (par défaut, la liste
+    # servie).
+    texte, _ = REQUETES[nom]
+    parametres = parametres_requete(nom, valeurs or {})
+    if nom in PARAMETRES_CALCULES:
+        if operations is None:
+            from donnees import operations as liste_servie
+
+            operations = liste_servie()
+        parametres.update(PARAMETRES_CALCULES[nom](operations, parametres))
+    conditions = [condition for cle, condition in FILTRES.items() if parametres.get(cle)]
+    return base.executer(texte.format(filtres=' AND '.join(conditions) or '1'), parametres)
+
+
+def installer(server):
+    import flask
+
+    from cache_resultats import CacheMesure, ouvrir_cache
+
+    # Base et cache des résultats de la liste courante ; rouverts si elle
+    # change (rechargement.py).
+    etat = {'courant': (None, None, None), 'construction': None}
+    verrou = threading.Lock()
+
+    def construire(liste):
+        try:
+            preparer_base(liste)
+        except Exception as erreur:
+            print('Construction de la base SQL impossible : {!r}'.format(erreur), file=sys.stderr)
+
+    def ouvrir():
+        # Liste, base et cache des résultats ; None tant que la base de la
+        # liste courante n'existe pas : elle est alors construite en
+        # arrière-plan (une fois par liste et par processus), hors de toute
+        # requête. rechargement.py la prépare avant de publier une version.
+        from donnees import operations
+
+        liste = operations()
+        if etat['courant'][0] is not liste:
+            chemin = chemin_base(liste)
+            if not os.path.exists(chemin):
+                with verrou:
+                    construction = etat['construction']
+                    if construction is None or construction[0] is not liste or not construction[1].is_alive():
+                        fil = threading.Thread(target=construire, args=(liste,), daemon=True)
+                        etat['construction'] = liste, fil
+                        fil.start()
+                return None
+            espace = 'sql-' + os.path.splitext(os.path.basename(chemin))[0]
+            etat['courant'] = liste, Base(chemin), CacheMesure(ouvrir_cache(espace))
+        return etat['courant']
+
+    def indisponible():
+        return flask.jsonify(erreur='base SQL en préparation'), 503, {'Retry-After': '10'}
+
+    def repondre(calculer):
+        try:
+            return flask.jsonify(calculer())
+        except TimeoutError as erreur:
+            return flask.jsonify(erreur=str(erreur)), 504
+        except (sqlite3.Error, ValueError) as erreur:
+            return flask.jsonify(erreur=str(erreur)), 400
+
+    @server.route('/sql/<any({}):nom>'.format(', '.join(REQUETES)))
+    def requete_nommee(nom):
+        ouverte = ouvrir()
+        if ouverte is None:
+            return indisponible()
+        liste, base, cache = ouverte
+        valeurs = flask.request.args.to_dict()
+
+        def calculer():
+            parametres_requete(nom, valeurs)
+            cle = hashlib.sha256(json.dumps([nom, valeurs], sort_keys=True).encode()).hexdigest()[:32]
+            return cache.obtenir(cle, lambda: executer_requete(base, nom, valeurs, liste))
+
+        return repondre(calculer)
+
+    @server.route('/sql', methods=['POST'])
+    def requete_libre():
+        jeton = flask.request.headers.get('X-Jeton-SQL', '')
+        if not JETON or not hmac.compare_digest(jeton.encode(), JETON.encode()):
+            flask.abort(403)
+        corps = flask.request.get_json(force=True, silent=True) or {}
+        if not isinstance(corps.get('requete'), str):
+            return flask.jsonify(erreur='champ « requete » manquant'), 400
+        ouverte = ouvrir()
+        if ouverte is None:
+            return indisponible()
+        _, base, _ = ouverte
+
+        def calculer():
+            try:
+                lignes_max = int(corps.get('lignes_max', LIGNES_MAX))
+            except (TypeError, ValueError):
+                raise ValueError('« lignes_max » doit être un entier')
+            return base.executer(corps['requete'], corps.get('parametres') or {}, lignes_max=max(1, min(lignes_max, LIGNES_MAX)))
+
+        return repondre(calculer)
+
+
+def main():
+    from donnees import operations
+
+    parser = argparse.ArgumentParser(description='Interroge la base SQL des opérations.')
+    parser.add_argument('requete', nargs='?', help='requête SELECT libre')
+    parser.add_argument('parametres', nargs='*', metavar='parametre=valeur')
+    parser.add_argument('--nom', choices=sorted(REQUETES), help='requête nommée')
+    parser.add_argument('--duree-max', type=float, default=DUREE_MAX)
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    liste = operations()
+    chemin = preparer_base(liste)
+    print('Base {} ({:.2f} s)'.format(chemin, time.perf_counter() - debut))
+    base = Base(chemin)
+    parametres = dict(parametre.split('=', 1) for parametre in args.parametres)
+    if args.nom:
+        if args.requete:
+            parametres.update([args.requete.split('=', 1)])
+        resultat = executer_requete(base, args.nom, parametres, liste)
+    elif args.requete:
+        resultat = base.executer(args.requete, parametres, args.duree_max)
+    else:
+        return
+    print('\t'.join(resultat['colonnes']))
+    for ligne in resultat['lignes']:
+        print('\t'.join('' if valeur is None else str(valeur) for valeur in ligne))
+    print('{} ligne(s){} en {:.1f} ms'.format(len(resultat['lignes']), ' (tronqué)' if resultat['tronque'] else '', resultat['duree'] * 1000))
+
+
+if __name__ == '__main__':
+    main()
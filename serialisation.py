@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+# Figures compactes : les tableaux numériques des figures (x, y, r, values…)
+# sont encodés en base64 sous forme de tableaux typés (entiers au plus petit
+# type suffisant, flottants en simple précision) et rangés une seule fois
+# dans une table propre à la figure, les autres occurrences n'en gardant
+# qu'une référence ; c'est le cas des séries répétées dans les menus de la
+# figure 5. Le thème plotly (layout.template, plusieurs kilo-octets identiques
+# dans chaque figure) n'est envoyé qu'une fois, dans la page d'accueil.
+# assets/decodage.js reconstitue tableaux typés et thèmes dans le navigateur,
+# avant que le renderer Dash ne transmette les figures à plotly.js.
+
+import base64
+import hashlib
+import json
+
+import numpy as np
+
+# Attributs plotly contenant des tableaux de nombres ; les autres listes
+# (textes, couleurs, intervalles…) sont laissées telles quelles.
+CLES_TABLEAUX = {'x', 'y', 'z', 'r', 'theta', 'values', 'tickvals', 'size'}
+LONGUEUR_MIN = 8
+
+
+def _type_entier(minimum, maximum):
+    for code, type_numpy in (('i1', np.int8), ('i2', np.int16), ('i4', np.int32)):
+        informations = np.iinfo(type_numpy)
+        if informations.min <= minimum and maximum <= informations.max:
+            return code
+    return None
+
+
+def encoder_tableau(valeurs):
+    # None si la liste n'est pas un tableau de nombres (ou trop courte pour
+    # y gagner).
+    if len(valeurs) < LONGUEUR_MIN or not all(type(valeur) in (int, float) for valeur in valeurs):
+        return None
+    code = None
+    if all(type(valeur) is int for valeur in valeurs):
+        code = _type_entier(min(valeurs), max(valeurs))
+    if code is None:
+        code = 'f4'
+    tableau = np.asarray(valeurs, dtype='<' + code)
+    return {'dtype': code, 'bdata': base64.b64encode(tableau.tobytes()).decode('ascii')}
+
+
+def compacter_figure(figure, gabarits=None):
+    """Figure JSON (dictionnaire) dont les tableaux numériques sont encodés.
+
+    Le thème de la figure est remplacé par une référence et ajouté à
+    gabarits, à insérer dans la page avec script_gabarits().
+    """
+    if gabarits is not None and 'template' in figure.get('layout', {}):
+        gabarit = figure['layout']['template']
+        cle = hashlib.sha256(json.dumps(gabarit, sort_keys=True).encode()).hexdigest()[:12]
+        gabarits[cle] = gabarit
+        figure = dict(figure, layout=dict(figure['layout'], template={'_gabarit': cle}))
+    tableaux = []
+    references = {}
+
+    def parcourir(noeud, cle):
+        if isinstance(noeud, dict):
+            return {sous_cle: parcourir(valeur, sous_cle) for sous_cle, valeur in noeud.items()}
+        if isinstance(noeud, list):
+            code = encoder_tableau(noeud) if cle in CLES_TABLEAUX else None
+            if code is None:
+                return [parcourir(element, cle) for element in noeud]
+            identifiant = (code['dtype'], code['bdata'])
+            if identifiant not in references:
+                references[identifiant] = len(tableaux)
+                tableaux.append(code)
+            return {'_ref': references[identifiant]}
+        return noeud
+
+    compacte = parcourir(figure, None)
+    if tableaux:
+        compacte['_tableaux'] = tableaux
+    return compacte
+
+
+def script_gabarits(gabarits):
+    contenu = json.dumps(gabarits, separators=(',', ':')).replace('</', '<\\/')
+    return '<script>window.gabaritsFigures = {};</script>'.format(contenu)
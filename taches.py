@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+# Graphe des tâches de construction : chaque tâche est nommée et déclare les
+# tâches dont elle reçoit les résultats, comme les étapes de pipeline.py
+# déclarent leurs colonnes. Une tâche est lancée dès que ses dépendances
+# sont terminées, sur un pool de threads : les tâches partagent sans copie
+# les colonnes projetées en mémoire, et numpy libère le GIL pendant ses
+# calculs. La durée de chaque tâche est enregistrée comme phase du
+# démarrage (instrumentation.PHASES, exposées sur /metrics).
+
+import concurrent.futures
+import os
+import time
+
+from instrumentation import chemin_phase, phase
+
+# Nombre de threads ; 1 exécute les tâches une à une, dans l'ordre du graphe.
+TACHES_PARALLELES = int(os.environ.get('TACHES_PARALLELES', 0)) or os.cpu_count() or 1
+
+
+def ordonner(taches):
+    """Noms des tâches dans un ordre compatible avec leurs dépendances."""
+    ordre, visitees = [], {}
+
+    def visiter(nom, pile):
+        if visitees.get(nom) == 'faite':
+            return
+        if visitees.get(nom) == 'en cours':
+            raise ValueError('dépendance circulaire : {}'.format(' → '.join(pile + (nom,))))
+        if nom not in taches:
+            raise KeyError('tâche inconnue : {} (requise par {})'.format(nom, pile[-1]))
+        visitees[nom] = 'en cours'
+        for dependance in taches[nom][0]:
+            visiter(dependance, pile + (nom,))
+        visitees[nom] = 'faite'
+        ordre.append(nom)
+
+    for nom in taches:
+        visiter(nom, ())
+    return ordre
+
+
+def executer_taches(taches, paralleles=TACHES_PARALLELES):
+    """Exécute les tâches {nom: (dépendances, fonction)} ; chaque fonction
+    reçoit les résultats de ses dépendances, dans l'ordre déclaré.
+
+    Renvoie les résultats et la durée (en secondes) de chaque tâche.
+    """
+    ordre = ordonner(taches)
+    parent = chemin_phase()
+    resultats, durees = {}, {}
+
+    def lancer(nom):
+        dependances, fonction = taches[nom]
+        debut = time.perf_counter()
+        with phase(nom, parent):
+            resultat = fonction(*(resultats[dependance] for dependance in dependances))
+        durees[nom] = time.perf_counter() - debut
+        return resultat
+
+    if paralleles <= 1:
+        for nom in ordre:
+            resultats[nom] = lancer(nom)
+        return resultats, durees
+
+    restantes = list(ordre)
+    with concurrent.futures.ThreadPoolExecutor(paralleles, thread_name_prefix='tache') as pool:
+        en_cours = {}
+        while restantes or en_cours:
+            pretes = [nom for nom in restantes if all(dependance in resultats for dependance in taches[nom][0])]
+            for nom in pretes:
+                restantes.remove(nom)
+                en_cours[pool.submit(lancer, nom)] = nom
+            terminees, _ = concurrent.futures.wait(en_cours, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in terminees:
+                # Une tâche en échec interrompt la construction : les tâches
+                # déjà lancées se terminent, les autres ne sont pas lancées.
+                resultats[en_cours.pop(future)] = future.result()
+    return resultats, durees
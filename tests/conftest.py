@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+# Listes d'opérations synthétiques (benchmarks/generer_operations.py, graine
+# fixe) écrites une fois par session dans le format du cache des opérations.
+# Les caches relatifs (cache/…) sont écrits dans un dossier temporaire.
+
+import os
+import sys
+
+import pytest
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from benchmarks.generer_operations import generer  # noqa: E402
+from donnees import Operations, ecrire_cache  # noqa: E402
+
+TAILLE = 4000
+GRAINE = 0
+
+
+@pytest.fixture(scope='session', autouse=True)
+def dossier_travail(tmp_path_factory):
+    courant = os.getcwd()
+    dossier = tmp_path_factory.mktemp('travail')
+    os.chdir(dossier)
+    yield dossier
+    os.chdir(courant)
+
+
+@pytest.fixture(scope='session')
+def data():
+    return generer(TAILLE, GRAINE)
+
+
+def liste_operations(data, dossier):
+    ecrire_cache(data.reset_index(drop=True), str(dossier))
+    return Operations(str(dossier))
+
+
+@pytest.fixture(scope='session')
+def operations(data, tmp_path_factory):
+    return liste_operations(data, tmp_path_factory.mktemp('operations') / 'cache')
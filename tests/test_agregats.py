@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from agregats import Cube, construire_cube
+from conftest import liste_operations
+
+
+def _egaux(cube, reference):
+    cube = cube.aligner(reference.axes)
+    for mesure, valeurs in reference.valeurs.items():
+        np.testing.assert_allclose(cube.valeurs[mesure], valeurs, rtol=1e-9, atol=1e-6)
+
+
+def test_ajout_et_retrait_de_partitions(data, operations, tmp_path):
+    # Partitions de tailles et de modalités différentes : les axes sont
+    # réunis avant l'addition.
+    coupure = len(data) // 3
+    premiere = liste_operations(data.iloc[:coupure], tmp_path / 'premiere')
+    seconde = liste_operations(data.iloc[coupure:], tmp_path / 'seconde')
+    complet = construire_cube(operations)
+    cube_premiere, cube_seconde = construire_cube(premiere), construire_cube(seconde)
+
+    _egaux(cube_premiere + cube_seconde, complet)
+    _egaux(complet - cube_seconde, cube_premiere.aligner(complet.axes))
+    # Republication d'une partition : ancienne version retirée, nouvelle
+    # ajoutée.
+    _egaux(complet - cube_seconde + cube_seconde, complet)
+
+
+def test_blocs_et_lignes(operations):
+    lignes = np.flatnonzero(operations.masque('Fonds', 'FSE'))
+    _egaux(construire_cube(operations, taille_bloc=500), construire_cube(operations))
+    _egaux(construire_cube(operations, lignes=lignes, taille_bloc=700), construire_cube(operations, lignes=lignes))
+    serie = construire_cube(operations, lignes=lignes).serie('nombre', 'Fonds')
+    assert serie['FSE'] == len(lignes) and serie.sum() == len(lignes)
+
+
+def test_enregistrement(operations, tmp_path):
+    cube = construire_cube(operations)
+    chemin = str(tmp_path / 'cube.npz')
+    cube.enregistrer(chemin)
+    relu = Cube.charger(chemin)
+    assert relu.axes == cube.axes
+    _egaux(relu, cube)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from conftest import liste_operations
+from entites import COLONNE_CODE_POSTAL, COLONNE_NOM, SIGNATURE_VIDE, normaliser_nom, resoudre, signatures
+
+# (graphie, code postal, bénéficiaire attendu)
+GRAPHIES = [
+    ('Commune de Kerlanmor', '29200', 'kerlanmor'),
+    ('COMMUNE DE KERLANMOR', '29200', 'kerlanmor'),
+    ('Ville de Kerlanmor', '29280', 'kerlanmor'),
+    ('Mairie de Kerlanmor', '29200', 'kerlanmor'),
+    ('Conseil régional Bretagne', '35000', 'bretagne'),
+    ('Région Bretagne', '35711', 'bretagne'),
+    ('REGION BRETAGNE', '35000', 'bretagne'),
+    ('SARL Belvalbourg', '63000', 'belvalbourg'),
+    ('Belvalbourg SARL', '63100', 'belvalbourg'),
+    ('Belvalbourg', '63000', 'belvalbourg'),
+    # Homonymes de départements différents : deux bénéficiaires.
+    ('Commune de Beaumont', '63110', 'beaumont 63'),
+    ('Commune de Beaumont', '24440', 'beaumont 24'),
+    ('Université de Montchateau', '21000', 'montchateau'),
+    ('Univ. Montchateau', '21000', 'montchateau'),
+    # Un nom fait uniquement de signes.
+    ('—', '75001', 'tiret'),
+]
+
+
+@pytest.fixture(scope='module')
+def resolution(data, tmp_path_factory):
+    data = data.iloc[:len(GRAPHIES) * 4].copy()
+    data[COLONNE_NOM] = [graphie for graphie, _, _ in GRAPHIES] * 4
+    data[COLONNE_CODE_POSTAL] = [code for _, code, _ in GRAPHIES] * 4
+    # Opérations sans nom.
+    data.iloc[-2:, data.columns.get_loc(COLONNE_NOM)] = None
+    liste = liste_operations(data, tmp_path_factory.mktemp('entites') / 'cache')
+    return liste, resoudre(liste)
+
+
+def test_graphies_reunies(resolution):
+    _, (entites, noms, graphies, statistiques) = resolution
+    attendus = [attendu for _, _, attendu in GRAPHIES] * 4
+    avec_nom = entites[:-2]
+    assert (entites[-2:] == -1).all()
+    # Deux opérations ont la même entité si et seulement si elles ont le
+    # même bénéficiaire attendu.
+    for i in range(len(avec_nom)):
+        for j in range(len(avec_nom)):
+            assert (avec_nom[i] == avec_nom[j]) == (attendus[i] == attendus[j]), (GRAPHIES[i % len(GRAPHIES)], GRAPHIES[j % len(GRAPHIES)])
+    assert statistiques['entites'] == len(set(attendus)) == len(noms)
+    # « Commune de Beaumont » est une graphie de deux entités.
+    assert graphies[avec_nom[0]] == 4 and graphies.sum() == statistiques['noms'] + 1
+
+
+def test_nom_retenu(resolution):
+    _, (entites, noms, _, _) = resolution
+    # « Univ. Montchateau » perd une opération (nom retiré) : la graphie la
+    # plus fréquente est « Université de Montchateau ».
+    montchateau = entites[[graphie for graphie, _, _ in GRAPHIES].index('Univ. Montchateau')]
+    assert noms[montchateau] == 'Université de Montchateau'
+
+
+def test_normalisation():
+    assert normaliser_nom('Conseil Régional de Bretagne') == normaliser_nom('REGION BRETAGNE')
+    assert normaliser_nom('SARL') == 'sarl'
+    assert normaliser_nom('—') == ''
+
+
+def test_signature_des_noms_vides():
+    resultat = signatures(['commune kerlanmor', '', 'commune kerlanmor'])
+    assert (resultat[1] == SIGNATURE_VIDE).all()
+    np.testing.assert_array_equal(resultat[0], resultat[2])
+    assert not (resultat[0] == SIGNATURE_VIDE).any()
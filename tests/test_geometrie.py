@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from geometrie import contours_regions, simplifier
+from pipeline import REGIONS_PRE_NOTRE
+
+
+def test_contours_livres():
+    # Une région sans contour disparaîtrait de la carte du graphique 7.
+    contours = contours_regions()
+    assert sorted(contours) == sorted(REGIONS_PRE_NOTRE)
+    for anneaux in contours.values():
+        assert anneaux
+        for longitudes, latitudes in anneaux:
+            assert len(longitudes) == len(latitudes) >= 4
+
+
+def test_simplifier():
+    points = np.array([[0, 0], [1, 0.001], [2, 0], [2, 1], [0, 0]], dtype=float)
+    assert simplifier(points, 0.01).tolist() == [[0, 0], [2, 0], [2, 1], [0, 0]]
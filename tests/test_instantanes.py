@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+import sys
+
+from conftest import RACINE
+
+
+def test_figures_identiques_aux_instantanes(tmp_path):
+    # Processus neuf : les caches relatifs du vérificateur ne dépendent pas
+    # des tests précédents.
+    resultat = subprocess.run([sys.executable, os.path.join(RACINE, 'benchmarks', 'verifier_instantanes.py')],
+                              cwd=str(tmp_path), capture_output=True, text=True)
+    assert resultat.returncode == 0, resultat.stdout + resultat.stderr
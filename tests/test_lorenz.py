@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from lorenz import DECILES, NB_POINTS_MAX, TOLERANCE, courbe_lorenz, rang_quantile
+
+
+def test_noeuds_exacts_et_erreur_bornee(operations):
+    montants = np.asarray(operations['Montant UE programmé'], dtype=float)
+    parts_operations, parts_montants, seuils = courbe_lorenz(montants)
+    tries = np.sort(montants[~np.isnan(montants)])
+    cumul = np.concatenate([[0.0], np.cumsum(tries)]) / tries.sum()
+
+    assert parts_operations[0] == 0 and parts_operations[-1] == 1
+    assert len(parts_operations) < NB_POINTS_MAX
+    # Aux nœuds, la courbe simplifiée est la courbe exacte.
+    rangs = np.rint(parts_operations * len(tries)).astype(int)
+    np.testing.assert_allclose(parts_montants, cumul[rangs], atol=1e-12)
+    # Entre les nœuds, l'interpolation reste à moins de la tolérance.
+    interpolee = np.interp(np.arange(len(tries) + 1), rangs, parts_montants)
+    assert np.abs(interpolee - cumul).max() <= TOLERANCE
+    for q in DECILES:
+        assert seuils[q] == tries[rang_quantile(len(tries), q)]
+
+
+def test_montants_absents():
+    parts_operations, parts_montants, seuils = courbe_lorenz([np.nan, np.nan])
+    assert len(parts_operations) == len(parts_montants) == 0 and seuils == {}
+
+
+def test_petite_liste():
+    parts_operations, parts_montants, seuils = courbe_lorenz([3.0, 1.0, np.nan, 2.0])
+    np.testing.assert_allclose(parts_operations, [0, 1 / 3, 2 / 3, 1])
+    np.testing.assert_allclose(parts_montants, [0, 1 / 6, 3 / 6, 1])
+    assert seuils[0.9] == 3.0
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+from pipeline import ANNEES, BORNES_DUREES, operations_en_cours
+
+
+def test_operations_en_cours_par_annee(data, operations):
+    # Référence : chaque opération est comptée une fois par année couverte.
+    attendu = np.zeros((len(BORNES_DUREES) - 1, len(ANNEES)), dtype=int)
+    classes = pd.cut(data['Durée, en mois'], BORNES_DUREES, labels=False)
+    for debut, fin, classe in zip(data["Date de début de l'opération"], data["Date de fin de l'opération"], classes):
+        if pd.isna(debut) or pd.isna(fin) or pd.isna(classe):
+            continue
+        for annee in range(max(debut.year, ANNEES[0]), min(fin.year, ANNEES[-1]) + 1):
+            attendu[int(classe), annee - ANNEES[0]] += 1
+    resultat = operations_en_cours(operations)
+    assert resultat['annees'] == ANNEES
+    np.testing.assert_array_equal(resultat['series'], attendu)
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+from profil_mensuel import PREMIER_MOIS, DERNIER_MOIS, profil_mensuel, repartir
+
+
+def _par_ligne(debuts, fins, montants):
+    # Référence : une ligne par opération et par mois de réalisation.
+    mois = pd.period_range(PREMIER_MOIS, DERNIER_MOIS, freq='M')
+    sommes = pd.Series(0.0, index=mois)
+    for debut, fin, montant in zip(debuts, fins, montants):
+        if pd.isna(debut) or pd.isna(fin) or np.isnan(montant):
+            continue
+        periode = pd.period_range(pd.Period(debut, 'M'), pd.Period(fin, 'M'), freq='M')
+        periode = periode[(periode >= mois[0]) & (periode <= mois[-1])]
+        sommes[periode] += montant
+    return sommes.to_numpy()
+
+
+def test_repartir_egale_une_ligne_par_mois(data):
+    debuts = data["Date de début de l'opération"].to_numpy()
+    fins = data["Date de fin de l'opération"].to_numpy()
+    montants = data['Montant UE par mois'].to_numpy(dtype=float)
+    # Blocs plus petits que la liste : le cumul par blocs est aussi vérifié.
+    np.testing.assert_allclose(repartir(debuts, fins, montants, taille_bloc=512), _par_ligne(debuts, fins, montants), rtol=1e-9)
+
+
+def test_profil_entre_zero_et_un(operations):
+    profil = profil_mensuel(operations)
+    for fonds in ('FEDER', 'FSE'):
+        serie = profil[fonds + '_normalise']
+        assert serie.min() == 0.0
+        assert serie.max() == 1.0
+
+
+def test_profil_des_lignes_retenues(operations):
+    lignes = np.flatnonzero(np.asarray(operations['Durée, en mois']) < 24)
+    profil = profil_mensuel(operations, lignes=lignes)
+    fse = lignes[np.asarray(operations['Fonds'])[lignes] == operations.modalites['Fonds'].code('FSE')]
+    attendu = _par_ligne(operations["Date de début de l'opération"][fse], operations["Date de fin de l'opération"][fse], operations['Montant UE par mois'][fse])
+    np.testing.assert_allclose(profil['FSE_normalise'], (attendu - attendu.min()) / (attendu.max() - attendu.min()), rtol=1e-9, atol=1e-12)
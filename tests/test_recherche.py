@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from conftest import liste_operations
+from recherche import TAILLE_PAGE, mots, ouvrir_index, ouvrir_ordres, rechercher
+
+MONTANT = 'Montant UE programmé'
+
+
+@pytest.fixture(scope='module')
+def liste(data, tmp_path_factory):
+    # Quelques montants manquants : ils restent en dernier dans les deux
+    # sens de tri.
+    data = data.copy()
+    data.loc[data.index[::97], MONTANT] = np.nan
+    return liste_operations(data, tmp_path_factory.mktemp('recherche') / 'cache')
+
+
+def _trouvees(data, texte):
+    # Référence : opérations dont l'intitulé ou le nom contient tous les
+    # mots, le dernier pouvant n'être qu'un début de mot.
+    *entiers, dernier = mots(texte)
+    resultat = []
+    for ligne, (intitule, nom) in enumerate(zip(data['Intitulé du projet'], data['Nom du bénéficiaire'])):
+        presents = set(mots(intitule)) | set(mots(nom))
+        if set(entiers) <= presents and any(mot.startswith(dernier) for mot in presents):
+            resultat.append(ligne)
+    return resultat
+
+
+def _montants(resultat):
+    return [ligne[MONTANT] for ligne in resultat['lignes']]
+
+
+def test_mots_et_prefixe(data, liste):
+    index = ouvrir_index(liste)
+    for texte in ('emploi form', 'recherche innovation', 'Méthanisation'):
+        assert index.rechercher(texte).tolist() == _trouvees(data, texte)
+    assert index.rechercher(' ') is None
+
+
+@pytest.mark.parametrize('descendant', [False, True])
+def test_tri_des_resultats(data, liste, descendant):
+    index, ordres = ouvrir_index(liste), ouvrir_ordres(liste)
+    montants = np.asarray(liste[MONTANT], dtype=float)
+    trouvees = montants[_trouvees(data, 'emploi')]
+    connus = np.sort(trouvees[~np.isnan(trouvees)])
+    attendu = (connus[::-1] if descendant else connus).tolist() + [None] * int(np.isnan(trouvees).sum())
+    pages = []
+    for page in range(-(-len(attendu) // TAILLE_PAGE)):
+        resultat = rechercher(liste, index, 'emploi', page=page, ordres=ordres, tri=(MONTANT, descendant))
+        assert resultat['total'] == len(attendu)
+        pages += _montants(resultat)
+    assert pages == attendu
+
+
+@pytest.mark.parametrize('descendant', [False, True])
+def test_tri_de_la_liste_complete(liste, descendant):
+    index, ordres = ouvrir_index(liste), ouvrir_ordres(liste)
+    montants = np.asarray(liste[MONTANT], dtype=float)
+    connus = np.sort(montants[~np.isnan(montants)])
+    attendu = (connus[::-1] if descendant else connus).tolist() + [None] * int(np.isnan(montants).sum())
+    derniere = (len(attendu) - 1) // TAILLE_PAGE
+    for page in (0, 3, derniere):
+        resultat = rechercher(liste, index, page=page, ordres=ordres, tri=(MONTANT, descendant))
+        assert _montants(resultat) == attendu[page * TAILLE_PAGE:(page + 1) * TAILLE_PAGE]
+
+
+def test_tri_par_nom(data, liste):
+    index, ordres = ouvrir_index(liste), ouvrir_ordres(liste)
+    resultat = rechercher(liste, index, page=2, ordres=ordres, tri=('Nom du bénéficiaire', False))
+    attendu = sorted(data['Nom du bénéficiaire'])[2 * TAILLE_PAGE:3 * TAILLE_PAGE]
+    assert [ligne['Nom du bénéficiaire'] for ligne in resultat['lignes']] == attendu
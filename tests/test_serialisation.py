@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import json
+
+import numpy as np
+from plotly.utils import PlotlyJSONEncoder
+
+from agregats import construire_cube
+from figures import calculer_courbes_lorenz, calculer_pivot, figure_beneficiaires_thematiques, figure_contributions_10m, figure_repartition_montants
+from serialisation import compacter_figure, encoder_tableau
+
+
+def decoder(noeud, gabarits, tableaux=None):
+    # Équivalent de assets/decodage.js.
+    if isinstance(noeud, list):
+        return [decoder(element, gabarits, tableaux) for element in noeud]
+    if not isinstance(noeud, dict):
+        return noeud
+    if tableaux is not None and set(noeud) == {'_ref'}:
+        return tableaux[noeud['_ref']]
+    if set(noeud) == {'_gabarit'}:
+        return gabarits[noeud['_gabarit']]
+    if '_tableaux' in noeud:
+        tableaux = [np.frombuffer(base64.b64decode(code['bdata']), dtype='<' + code['dtype']).tolist() for code in noeud['_tableaux']]
+    return {cle: decoder(valeur, gabarits, tableaux) for cle, valeur in noeud.items() if cle != '_tableaux'}
+
+
+def _proches(obtenu, attendu):
+    if isinstance(attendu, dict):
+        assert set(obtenu) == set(attendu)
+        for cle in attendu:
+            _proches(obtenu[cle], attendu[cle])
+    elif isinstance(attendu, list):
+        assert len(obtenu) == len(attendu)
+        for o, a in zip(obtenu, attendu):
+            _proches(o, a)
+    elif isinstance(attendu, float):
+        # Flottants transmis en simple précision.
+        assert np.isclose(obtenu, attendu, rtol=1e-6, atol=1e-30)
+    else:
+        assert obtenu == attendu
+
+
+def test_aller_retour(operations):
+    cube = construire_cube(operations)
+    figures = [figure_repartition_montants(calculer_courbes_lorenz(operations)),
+               figure_beneficiaires_thematiques(calculer_pivot(cube)), figure_contributions_10m(cube)]
+    gabarits = {}
+    for figure in json.loads(json.dumps(figures, cls=PlotlyJSONEncoder)):
+        compacte = compacter_figure(figure, gabarits)
+        assert '_tableaux' in compacte and compacte['layout']['template'].keys() == {'_gabarit'}
+        _proches(decoder(json.loads(json.dumps(compacte)), gabarits), figure)
+    # Un seul thème pour toutes les figures.
+    assert len(gabarits) == 1
+
+
+def test_types_des_tableaux():
+    assert encoder_tableau(list(range(8)))['dtype'] == 'i1'
+    assert encoder_tableau(list(range(0, 8000, 1000)))['dtype'] == 'i2'
+    assert encoder_tableau([0.5] * 8)['dtype'] == 'f4'
+    assert encoder_tableau(list(range(7))) is None
+    assert encoder_tableau(['a'] * 8) is None
+    assert encoder_tableau([True] * 8) is None
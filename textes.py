@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+partie1_md = '''
+    ## 1. Introduction
+
+    L’ouverture de la nouvelle période de programmation des fonds européens 2021-2027 est un moment propice au bilan de la précédente période 2014-2020. Au cours de cette période, deux fonds ont joué un rôle particulièrement important en matière de politique régionale de l’Union européenne : le Fonds européen de développement régional (FEDER) et le Fonds social européen (FSE).
+
+    Cette politique régionale vise à accroître la cohésion économique, sociale et territoriale entre régions européennes – c’est pourquoi elle est aussi appelée politique de cohésion – et à réduire leurs écarts de développement. Elle se décline en programmes opérationnels régionaux, interrégionaux et nationaux articulés autour de priorités d’investissement définies sur sept ans pour chaque territoire. Ces priorités se répartissent selon des axes thématiques et elles définissent les conditions d’éligibilité des opérations.
+
+    La sélection des projets fait également intervenir des variables telles que la taille, la durée des projets, le montant d’aide ou le type de porteur de projet. La présente analyse des opérations cofinancées par le FEDER et le FSE en France au cours de la période 2014-2020 propose donc de répondre aux questions suivantes :
+    - Quel est le profil des opérations soutenues et quel niveau d’aide reçoivent-elles ?
+    - Qui sont les bénéficiaires des fonds et comment se répartissent-ils ?
+    - Observe-t-on des différences entre régions dans la mise en œuvre des fonds ?
+    - Comment s’articulent le cycle de programmation de sept ans et le calendrier de réalisation des opérations ?
+    
+    En procédant à l’analyse de données agrégées plutôt que par programme et par axe thématique, cette rétrospective propose aux gestionnaires, bénéficiaires et praticiens des fonds européens un éclairage renouvelé sur l’utilisation du FEDER et du FSE en France.
+'''
+
+partie2_md_a = '''
+    La distribution des opérations en fonction des montants d’aides européennes reçues fait apparaître deux catégories de projets :
+
+    - d’une part des projets **« courants »**, qui représentent 90 % du nombre des opérations FEDER et FSE et 30 % des montants programmés ; 
+    - d’autre part des projets **« d’ampleur »**, beaucoup moins nombreux (10 % des opérations) mais qui absorbent la grande majorité des ressources (70 % des fonds FEDER et FSE).
+'''
+
+partie2_md_b = '''
+    Dans le cas du FSE, le seuil d’entrée dans la catégorie des projets « d’ampleur » (séparant les neuvième et dixième déciles) se situe à {seuil_fse} euros tandis qu’il se situe à {seuil_feder} euros pour le FEDER. En effet, les opérations FSE, qui sont liées à l’emploi, la formation et l’inclusion, tendent à être plus courtes (64 % des projets durent moins d’un an) et affichent un coût total moyen de 447 000 euros ainsi qu’un niveau de cofinancement européen de 53 %. En revanche, les opérations FEDER, généralement liées aux infrastructures et équipements, ont des durées plus longues (54 % des projets durent deux à trois ans) et un coût plus élevé (960 000 euros en moyenne) tout en présentant un taux de cofinancement plus faible (40 % en moyenne).
+'''
+
+partie3_md = '''
+    ## 3. Vue d’ensemble des bénéficiaires
+    
+    **Alors que les opérations FSE se concentrent sur trois thématiques (emploi, formation et inclusion) et associent des catégories variées de porteurs de projet, le FEDER cible des domaines plus nombreux mais bénéficie d’abord aux collectivités territoriales et aux établissements publics.**
+
+    Les opérations cofinancées par le FSE dans les domaines de l’emploi et de l’insertion font intervenir une gamme diversifiée d’acteurs : établissements publics, associations, départements, missions emploi et insertion, État et régions. Elles se distinguent du domaine de la formation où 90 % des montants sont mobilisés par les régions, l’État ainsi que les établissements d'enseignement et organismes de formation.
+
+    Concernant le FEDER, 74 % des cofinancements viennent soutenir les actions des collectivités territoriales (régions, départements et secteur communal) ainsi que celles des établissements publics, y compris les établissements de recherche et d’enseignement supérieur.
+'''
+
+partie4_md = '''
+    ## 4. Qui sont les porteurs de projets « courants » et de projets « d’ampleur » ?
+
+    Les opérations bénéficiant d’une contribution du FSE inférieure à {seuil_fse} euros (projets « courants ») sont le plus souvent portées par des associations, le secteur communal (dont les CCAS) et les missions emploi et insertion (missions locales, PLIE, maisons de l’emploi etc.). En revanche, les projets « d’ampleur » sont d’abord portés par les établissements d’enseignement et organismes de formation suivis par les régions et Pôle Emploi.
+
+    Les organismes de formation sont également de nature différente suivant le profil des opérations : il s’agit principalement des GRETA, CFA et GIP de formation pour les projets « courants » et des OPCA de formation professionnelle pour les projets « d’ampleur ».
+
+    Concernant le FEDER, la catégorie des projets « d’ampleur » (avec une contribution européenne supérieure à {seuil_feder} euros) révèle une plus forte présence des collectivités territoriales et de leurs groupements : secteur communal (communes, intercommunalités, syndicats mixtes), départements et régions pour les actions d’aménagement du territoire.
+'''
+
+partie5_md = '''
+    ## 5. État et collectivités territoriales : des actions complémentaires ?
+
+    **La nature des interventions des collectivités territoriales et de l’État, qui représentent 41 % des montants programmés, suggère une complémentarité entre leurs actions. Cette complémentarité est d’ordre géographique pour les actions de formation mobilisant le FSE, entre mise en œuvre nationale, régionale ou infrarégionale, et thématique dans le cadre du FEDER.**
+
+    Le financement de la formation apparaît comme une priorité centrale des régions et de l’État, principales autorités de gestion des programmes opérationnels. Les régions mettent ainsi très largement en œuvre les opérations FSE dans ce domaine, essentiellement au titre des mesures liées à l'apprentissage tout au long de la vie prévues par les programmes opérationnels régionaux.
+
+    Parmi les opérations conduites par l’État, sont présentes les mesures liées à l’emploi et à la formation financées dans le cadre du programme opérationnel national « Initiative pour l’emploi des jeunes » ainsi que les mesures d’assistance technique liées à la gestion du programme opérationnel national FSE.
+
+    Si les départements et les communes font usage du FSE à des niveaux équivalents pour leurs politiques d’accompagnement à l’emploi et d’inclusion active, c’est sur les investissements en infrastructures que leurs domaines d’intervention se distinguent. Les communes ont en effet largement recours aux cofinancements FEDER en matière de transport urbain, d’infrastructures multimodales et d’environnement tandis que les départements mobilisent davantage ce fonds pour la rénovation thermique des bâtiments et l’aménagement numérique.
+'''
+
+partie5_md_focus_assos = '''
+    ### Focus : les associations
+
+    Les structures associatives jouent un rôle de premier plan dans les actions dédiées à l’inclusion active cofinancées par le FSE, notamment en faveur de l’intégration des jeunes et des personnes éloignées de l’emploi. Elles sont également présentes, à un degré moindre, dans les actions de protection de l’environnement et de la biodiversité ainsi que dans la réalisation d’infrastructures vertes.
+'''
+
+partie5_md_focus_entreprises = '''
+    ### Focus : le soutien à l’investissement des entreprises
+
+    Tous axes programmatiques confondus, le soutien à l’investissement des entreprises, qui représente 11 % des cofinancements FEDER hors instruments financiers, porte majoritairement sur les investissements génériques des PME (outil de production, bâtiments, et dans une moindre mesure adaptation des processus de production) et la production de biomasse-énergie (unités de méthanisation, chaufferies bois).
+'''
+
+partie6_md = '''
+    ## 6. Quelles particularités outre-mer ?
+
+    **Selon qu’elles sont conduites outre-mer ou en métropole, les actions de renforcement de la cohésion économique, sociale et territoriale soutenues par le FEDER et le FSE présentent des différences qui se traduisent notamment par le cofinancement d’acteurs différents.**
+
+    Dans les cinq régions et départements d’outre-mer, régions dites « moins développées » [[1]](#note1), l’État et les établissements publics portent une part significative des cofinancements européens (respectivement 8 et 10 %, contre 0 et 3 % en métropole). Dans le cas de l’État, il s’agit d’une part des mesures d’assistance technique à la gestion des fonds européens, et de l’autre des actions relatives au Service militaire adapté (SMA), un dispositif d’insertion destiné aux jeunes. De leur côté, les établissements publics mettent en œuvre des mesures relatives à l’emploi et à l’inclusion de plus grande ampleur qu’en métropole, ainsi que d’importantes opérations d’aménagement concernant notamment les infrastructures portuaires et le logement.
+    
+    Les entreprises en outre-mer bénéficient également de davantage de financements européens, en raison de l’existence de mesures de compensation des surcoûts de l’ultrapériphéricité. En revanche, les conseils régionaux et établissements d’enseignement supérieur et de recherche y occupent une place moindre que dans les régions métropolitaines dites « en transition » et « plus développées ».
+'''
+
+partie6_md_note = '''
+    [[1]](#renvoi_partie6) En 2014-2020, régions moins développées : Guadeloupe, Guyane, Martinique, Mayotte, La Réunion ; régions en transition : Auvergne, Basse-Normandie, Corse, Franche-Comté, Languedoc-Roussillon, Limousin, Lorraine, Nord-Pas-de-Calais, Picardie, Poitou-Charentes ; régions plus développées : Alsace, Aquitaine, Bourgogne, Bretagne, Centre, Champagne-Ardenne, Haute-Normandie, Île-de-France, Midi-Pyrénées, Pays de la Loire, Provence-Alpes-Côte d’Azur, Rhône-Alpes.
+'''
+
+partie7_md = '''
+    ## 7. Des stratégies d’emploi des fonds différentes selon les régions
+
+    Les stratégies de sélection des opérations par les Conseils régionaux, autorités de gestion de la plupart des programmes opérationnels, se sont traduites par un ciblage des investissements qui a pu bénéficier à certaines catégories de bénéficiaires.
+
+    Ainsi, deux régions [[2]](#note2) se distinguent par une concentration relativement élevée des fonds : l’Île-de-France, où le Conseil régional reçoit près de la moitié des cofinancements et notamment pour la mise en place d’instruments financiers, et la Bretagne, où les établissements de recherche et d’enseignement supérieur portent une large part (47 %) des projets « courants » tandis que le FSE y a été mis en œuvre par des contrats de formation professionnelle de grande ampleur.
+
+    Ce schéma se retrouve pour les régions présentant une concentration plutôt élevée des fonds, due soit aux opérations effectuées par le Conseil régional (Alsace, Haute-Normandie, Limousin, Picardie, Provence-Alpes-Côte d’Azur), soit à la présence plus forte d’une certaine catégorie de porteurs de projets « courants » (le secteur communal en Corse, les entreprises en Martinique).
+'''
+
+partie7_md_note = '''
+    [[2]](#renvoi_partie7) L’organisation territoriale retenue est celle en vigueur lors de la définition des programmes opérationnels 2014-2020, soit avant la Loi n° 2015-29 du 16 janvier 2015 relative à la délimitation des régions, aux élections régionales et départementales et modifiant le calendrier électoral. La mesure de la concentration utilise l’indice de Herfindahl-Hirschman appliqué à 13 catégories de bénéficiaires et n’inclut pas les programmes opérationnels nationaux et interrégionaux.
+'''
+
+partie8_md = '''
+    ## 8. Les opérations de très grande envergure
+
+    **Hors instruments financiers, une centaine d’opérations présentent une contribution européenne supérieure à 10 millions d’euros. Elles représentent 0,3 % des opérations mais 19,4 % des contributions FEDER et FSE.**
+
+    Sont concernés en premier lieu les contrats de formation professionnelle portés par les Conseils régionaux et, dans une moindre mesure, certains organismes de formation et d’accompagnement des jeunes. Viennent ensuite les opérations relatives à l’emploi avec la mise en place de la Garantie Jeunes, les dispositifs d’accompagnement de Pôle Emploi et les aides à la mobilité.
+    
+    Les opérations en matière de transport (Nouvelle Route du Littoral à la Réunion, transports en commun en site propre) et d’aménagement numérique (création de réseaux très haut débit) ont également mobilisé d’importants financements FEDER par opération.
+'''
+
+partie9_md = '''
+    ## 9. Les instruments financiers
+
+    **Une partie des financements FEDER a été allouée à la mise en place d’une soixantaine d’instruments financiers, c’est-à-dire des dispositifs d’aides remboursables représentant un total de plus de 354 millions d’euros.**
+
+    Ces instruments sont principalement à destination des PME, et notamment des entreprises en création et/ou innovantes. Ils comprennent des instruments de participation (intervention en fonds propres et quasi-fonds propres), de prêt et de garantie, ainsi que des dotations à des fonds de fonds permettant d’abonder plusieurs instruments financiers. Ils sont essentiellement gérés par les Conseils régionaux (73 %) et BPI France (18 %).
+'''
+
+partie10_md = '''
+    ## 10. Le rythme de mise en œuvre
+
+    **La réalisation des opérations a connu une montée en puissance progressive avec un pic des contributions européennes à la mi-parcours, c’est-à-dire fin 2017.**
+
+    Cependant, les opérations FEDER et FSE ont suivi deux tendances distinctes : après une brusque augmentation des contributions européennes en 2015, le FSE a conservé de 2016 à 2019 un rythme stable de réalisation des opérations [[3]](#note3) ; la réalisation des opérations FEDER a quant à elle connu une croissance sensible et régulière jusqu’en 2017, avant de se stabiliser en 2018 et 2019.
+    
+    Près de la moitié (49 %) des opérations FEDER et FSE ont démarré avant la fin 2016 et 86 % avant la fin 2018, avec un pic de mise en œuvre en 2017. Ce pic a été suivi d’un rapide recul de la mise en œuvre des opérations de courte durée, en majorité cofinancées par le FSE (dès 2016 pour les opérations de moins de 24 mois et à partir de 2017 pour les opérations de moins de 12 mois).
+'''
+
+partie10_md_note = '''
+    [[3]](#renvoi_partie10) La mise en œuvre des opérations FEDER et FSE s’appuie ici sur les montants de financement programmés et les dates de début et de fin de réalisation des opérations. Elle n’intègre donc pas les variations relatives aux dates de programmation des opérations ainsi qu’aux dates et montants de paiement effectif.
+'''
+
+partie11_md = '''
+    ## 11. Perspectives
+
+    L’approche agrégée des bénéficiaires et allocations du FEDER et du FSE suggère que la mobilisation des fonds européens en France donne lieu à deux réalités. D’une part, ces dispositifs de financement d’une relative complexité ont été utilisés pour une très large majorité d’opérations ayant représenté moins d’un tiers des fonds programmés. D’autre part, ont été mises en place avec le FEDER et le FSE des opérations de grande échelle où les acteurs publics jouent un rôle prépondérant. Cette double réalité interroge plusieurs dimensions de la mise en œuvre des fonds européens :
+
+    - **Identification claire des bénéficiaires** – l’évaluation des programmes européens, instruments de politique socioéconomique, pourrait être enrichie d’une analyse approfondie des catégories de bénéficiaires directs et indirects des financements, essentielle à l’appréhension de la pertinence, cohérence, effectivité, efficacité et efficience de l’action publique ;
+    - **Distribution des montants et distribution du risque d’erreur** – les débats sur la simplification des fonds européens pourraient davantage intégrer la question de la distribution du risque de manquement à la légalité et à la régularité de l’utilisation des fonds, en fonction des types d’opérations et des montants engagés, permettant ainsi de développer des procédures d’attribution, de gestion et de contrôle basées sur l’estimation quantifiée de ce risque ;
+    - **Valeur ajoutée européenne** – la prise en compte systématique des domaines d’intervention tels que définis par l’Annexe I du Règlement portant dispositions communes permettrait de mieux rendre compte de la relation entre types d’opérations cofinancées, performance des programmes et impact socioéconomique des fonds européens.
+'''
+
+partie12_md = '''
+    ## 12. Note méthodologique
+
+    L’analyse repose sur les données relatives à 38 532 opérations menées dans le cadre de 38 Programmes opérationnels FEDER, FSE et IEJ 2014-2020. Elles ont été extraites le 01/12/2020 et sont issues des listes d’opérations programmées publiées au 29/07/2020 par l’Agence nationale de la cohésion des territoires (16 411 opérations), au 01/12/2020 par la Région Nouvelle-Aquitaine (2 292 opérations), au 06/07/2020 par la Région Normandie (864 opérations), au 30/06/2020 par la Région Bretagne (529 opérations) et au 30/07/2020 par la Délégation générale à l’emploi et à la formation professionnelle (18 436 opérations). Ne sont donc pas incluses les opérations cofinancées au titre des programmes de coopération territoriale européenne (INTERREG). Les montants considérés représentent 83,2 % des fonds FEDER et FSE-IEJ alloués à la France pour 2014-2020, la période de programmation n’étant pas clôturée à la date de l’analyse et les jeux de données publiés d’ayant donc pas un caractère définitif.
+
+    Une version PDF de ce document peut être téléchargée en cliquant [ici](https://novi-advisory.eu/wp-content/uploads/2021/03/analyse-projets-feder-fse-2014-2020.pdf).
+'''